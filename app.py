@@ -4,13 +4,167 @@ This is the main entry point for the web application.
 NAME: Xiaoti Hu
 SEMESTER: 2023 Spring
 '''
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, render_template, request, jsonify, url_for
+import atexit
 import csv
+import functools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from web_scraper import FlightsData
+from output_manager import OutputManager
+from driver_pool import DriverPool
+from rate_limiter import RateLimiter
+from hedged_search import HedgedSearch
+from search_jobs import SearchJob, SearchJobManager, QueueFullError
+from result_cache import ResultCache, make_cache_key
+from fare_store import FareStore
+from single_flight import SingleFlight
+from batch_search import BatchSearch, flexible_date_pairs, weekend_date_pairs
+from flight_model import FlightTable
+from metrics import MetricsRegistry
 from datetime import datetime
 
 app = Flask(__name__, template_folder='templates')
 
+# Default settings, each one can be overridden by an environment variable
+# prefixed with FLIGHTSEARCH_ (e.g. FLIGHTSEARCH_DRIVER_POOL_SIZE=4)
+app.config.update(
+    DRIVER_POOL_SIZE=2,
+    DRIVER_MAX_USES=50,
+    DRIVER_POOL_PREWARM=False,
+    BROWSER_PROFILE="default",
+    EXTRACTION="snapshot",
+    RATE_LIMIT_INTERVAL=5.0,
+    RATE_LIMIT_JITTER=3.0,
+    RESULTS_TIMEOUT=60.0,
+    RESULTS_SETTLE_TIME=2.0,
+    DIRECT_SEARCH=True,
+    SEARCH_DEADLINE=180.0,
+    SEARCH_RETRIES=1,
+    SEARCH_RETRY_BACKOFF=2.0,
+    HEDGE_PERCENTILE=None,
+    HEDGE_MIN_SAMPLES=20,
+    JOB_WORKERS=2,
+    JOB_QUEUE_SIZE=20,
+    JOB_TTL=600,
+    CACHE_TTL=900,
+    CACHE_MAX_ENTRIES=256,
+    CACHE_MAX_BYTES=None,
+    CACHE_DIR=None,
+    BATCH_MAX_CONCURRENCY=2,
+    BATCH_MAX_DATES=31,
+    EXPORT_CSV=True,
+    EXPORT_FORMAT="csv",
+    OUTPUT_DIR="exports",
+    OUTPUT_MAX_BYTES=None,
+    OUTPUT_MAX_AGE=None,
+    OUTPUT_CLEANUP_INTERVAL=300,
+    FARE_STORE_PATH="fares.db",
+    STREAM_KEEPALIVE=15.0,
+    TRACE_LOG=None,
+)
+app.config.from_prefixed_env("FLIGHTSEARCH")
+
+# Warmed-up Chrome sessions shared by every search, closed with the process
+driver_pool = DriverPool(functools.partial(FlightsData.setup_driver, app.config['BROWSER_PROFILE'],
+                                           capture_network=app.config['EXTRACTION'] == "network"),
+                         size=app.config['DRIVER_POOL_SIZE'],
+                         max_uses=app.config['DRIVER_MAX_USES'])
+atexit.register(driver_pool.shutdown)
+if app.config['DRIVER_POOL_PREWARM']:
+    threading.Thread(target=driver_pool.warm, daemon=True).start()
+
+# Politeness pacing between searches against the airline website
+rate_limiter = RateLimiter(app.config['RATE_LIMIT_INTERVAL'], app.config['RATE_LIMIT_JITTER'])
+
+# Every scrape bounded by SEARCH_DEADLINE, transient failures retried with
+# backoff, and with HEDGE_PERCENTILE (e.g. 0.95) a scrape slower than that
+# percentile of the recent ones raced by a second attempt
+scrape_runner = HedgedSearch(deadline=app.config['SEARCH_DEADLINE'],
+                             retries=app.config['SEARCH_RETRIES'],
+                             backoff=app.config['SEARCH_RETRY_BACKOFF'],
+                             hedge_percentile=app.config['HEDGE_PERCENTILE'],
+                             min_samples=app.config['HEDGE_MIN_SAMPLES'])
+atexit.register(scrape_runner.shutdown)
+
+# Recent search results, so repeated searches do not start a browser
+result_cache = ResultCache(ttl=app.config['CACHE_TTL'],
+                           max_entries=app.config['CACHE_MAX_ENTRIES'],
+                           max_bytes=app.config['CACHE_MAX_BYTES'],
+                           directory=app.config['CACHE_DIR'])
+
+# History of every scraped fare, queried by the /fares endpoints
+fare_store = FareStore(app.config['FARE_STORE_PATH'])
+atexit.register(fare_store.close)
+
+# Identical searches running at the same time share one scrape
+inflight_searches = SingleFlight()
+
+# Optional export of each scrape (EXPORT_FORMAT), written off the request path
+# to a file of its own under OUTPUT_DIR, kept within the output quotas
+output_manager = OutputManager(app.config['OUTPUT_DIR'],
+                               max_bytes=app.config['OUTPUT_MAX_BYTES'],
+                               max_age=app.config['OUTPUT_MAX_AGE'],
+                               cleanup_interval=app.config['OUTPUT_CLEANUP_INTERVAL'])
+if app.config['OUTPUT_MAX_BYTES'] is not None or app.config['OUTPUT_MAX_AGE'] is not None:
+    output_manager.start_cleanup()
+    atexit.register(output_manager.stop)
+export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flight-export")
+atexit.register(export_executor.shutdown)
+
+# Counters and timings of the searches and requests, exposed on /metrics
+metrics = MetricsRegistry()
+searches_total = metrics.counter("flightsearch_searches_total", "Searches requested, cached or not")
+search_failures_total = metrics.counter("flightsearch_search_failures_total", "Searches that raised an error")
+cache_hits_total = metrics.counter("flightsearch_cache_hits_total", "Searches answered from the result cache")
+cache_misses_total = metrics.counter("flightsearch_cache_misses_total", "Searches not found in the result cache")
+scrapes_total = metrics.counter("flightsearch_scrapes_total", "Scrapes of the website, by outcome", ("outcome",))
+export_failures_total = metrics.counter("flightsearch_export_failures_total", "Exports of a scrape that failed")
+cards_extracted_total = metrics.counter("flightsearch_cards_extracted_total", "Flight cards extracted by scrapes")
+scrape_seconds = metrics.histogram("flightsearch_scrape_seconds", "Duration of a whole scrape")
+phase_seconds = metrics.histogram("flightsearch_phase_seconds",
+                                  "Duration of each phase of a scrape (driver, page load, form, results, "
+                                  "extraction, export)", ("phase",))
+index_phase_seconds = metrics.histogram("flightsearch_index_phase_seconds",
+                                        "Duration of each phase of a search page request", ("phase",))
+request_seconds = metrics.histogram("flightsearch_request_seconds", "Duration of HTTP requests",
+                                    ("endpoint", "status"))
+metrics.gauge("flightsearch_cache_entries", "Searches held in the result cache",
+              lambda: result_cache.stats()["entries"])
+metrics.counter_func("flightsearch_coalesced_searches_total", "Searches that shared a scrape already running",
+                     lambda: inflight_searches.coalesced)
+metrics.gauge("flightsearch_drivers", "Chrome sessions of the driver pool", lambda: {
+    ("live",): driver_pool.stats()["live"], ("idle",): driver_pool.stats()["idle"]}, ("state",))
+metrics.counter_func("flightsearch_scrape_attempts_total", "Extra scrape attempts, by reason (retry, hedge, hedge won)",
+                     lambda: {("retry",): scrape_runner.stats()["retried"],
+                              ("hedge",): scrape_runner.stats()["hedged"],
+                              ("hedge_won",): scrape_runner.stats()["hedge_wins"]}, ("reason",))
+metrics.gauge("flightsearch_search_jobs", "Known search jobs, by status",
+              lambda: {(status,): count for status, count in search_jobs.stats().items()}, ("status",))
+
+# Optional trace of each scrape (route, outcome, cards and phase timings),
+# one JSON line per scrape appended to TRACE_LOG
+trace_logger = logging.getLogger("flightsearch.trace")
+if app.config['TRACE_LOG']:
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+    trace_logger.addHandler(logging.FileHandler(app.config['TRACE_LOG']))
+
+# Columns of the results table: (header, key in the flights dictionary)
+FLIGHT_COLUMNS = [
+    ("Flight Numbers", "flight_numbers"),
+    ("Departure Time", "departure_time"),
+    ("Arrival Time", "arrival_time"),
+    ("Duration", "duration"),
+    ("Stops", "stops"),
+    ("Basic Economy", "basic_economy_price"),
+    ("Main Cabin", "main_cabin_price"),
+    ("First Class", "first_class_price"),
+]
+
 def read_csv(file_path):
     """
     Read CSV file and return its data as a list of rows.
@@ -33,6 +187,316 @@ def read_csv(file_path):
 
     return flight_options
 
+def read_search_form(form):
+    """
+    Read the search fields submitted by the client.
+
+    args: form: request.form (or a dict parsed from a JSON body)
+    return: dict of keyword arguments for search_flights
+    raise: KeyError if a field is missing
+    """
+    return {
+        "depart": form['departure'],
+        "arrive": form['arrival'],
+        "departure_date": form['departure_date'],
+        "return_date": form['return_date'],
+    }
+
+# Columns the results can be sorted by: query value -> FlightTable column
+SORT_COLUMNS = {
+    "departure_time": "departure_minutes",
+    "arrival_time": "arrival_minutes",
+    "duration": "duration_minutes",
+    "stops": "stops",
+    "price": "main_cabin_cents",
+    "basic_economy_price": "basic_economy_cents",
+    "main_cabin_price": "main_cabin_cents",
+    "first_class_price": "first_class_cents",
+}
+
+# Cabins a price filter can apply to: query value -> FlightTable column
+CABIN_COLUMNS = {
+    "basic_economy": "basic_economy_cents",
+    "main_cabin": "main_cabin_cents",
+    "first_class": "first_class_cents",
+}
+
+def sorts_or_filters(args):
+    """
+    Tell whether a request asks for its flights to be sorted or filtered.
+    Without it, the flights are shown as scraped.
+
+    args: args: request.args (or request.form)
+    return: bool
+    """
+    return any(args.get(field) for field in ('sort', 'max_stops', 'max_price'))
+
+def sort_and_filter(table, args):
+    """
+    Sort and filter flights by the `sort`, `order` (asc/desc), `cabin`
+    (basic_economy/main_cabin/first_class, default main_cabin), `max_price`
+    (in dollars, for that cabin; flights without a fare in it are dropped)
+    and `max_stops` parameters.
+
+    args: table: FlightTable
+          args: request.args (or request.form)
+    return: FlightTable
+    raise: ValueError for an unknown sort column or cabin, or an invalid number
+    """
+    cabin = args.get('cabin') or 'main_cabin'
+    if cabin not in CABIN_COLUMNS:
+        raise ValueError(f"Unknown cabin {cabin}, use one of: {', '.join(CABIN_COLUMNS)}")
+    max_price = args.get('max_price')
+    if max_price:
+        table = table.filter(CABIN_COLUMNS[cabin], high=round(float(max_price) * 100))
+    max_stops = args.get('max_stops')
+    if max_stops:
+        table = table.filter("stops", high=int(max_stops))
+    sort = args.get('sort')
+    if sort:
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}, use one of: {', '.join(SORT_COLUMNS)}")
+        table = table.sort_by(SORT_COLUMNS[sort], reverse=args.get('order') == 'desc')
+    return table
+
+def flights_table(flights_dict):
+    """
+    Turn the scraped flights into the rows of the results table, one row per flight.
+
+    args: flights_dict: dict of flights, as built by FlightsData.page_scrape
+    return: tuple (flight_headers, flight_options)
+    """
+    flight_headers = ["#"] + [header for header, _ in FLIGHT_COLUMNS]
+    flight_options = []
+    for flight_id, flight in flights_dict.items():
+        row = [flight_id]
+        for _, key in FLIGHT_COLUMNS:
+            value = flight.get(key, "N/A")
+            row.append(", ".join(value) if isinstance(value, list) else value)
+        flight_options.append(row)
+    return flight_headers, flight_options
+
+def search_flights(depart, arrive, departure_date, return_date, on_event=None):
+    """
+    Return the flights for one search, from the result cache when a fresh
+    result exists, otherwise by scraping the website. Identical searches
+    submitted while a scrape is running wait for that scrape.
+
+    args: depart, arrive: airport codes
+          departure_date, return_date: dates in YYYY-MM-DD format (as sent by the form)
+          on_event: optional callback receiving the phase and flight events of the
+                    scrape (see FlightsData), not called for cached or shared results
+    return: dict of flights, as built by FlightsData.page_scrape
+    """
+    searches_total.inc()
+    key = make_cache_key(depart, arrive, departure_date, return_date)
+    result = result_cache.get(key)
+    if result is not None:
+        cache_hits_total.inc()
+        return result
+    cache_misses_total.inc()
+    try:
+        return inflight_searches.do(key, scrape_and_cache, key,
+                                    depart, arrive, departure_date, return_date, on_event)
+    except Exception:
+        search_failures_total.inc()
+        raise
+
+def scrape_and_cache(key, depart, arrive, departure_date, return_date, on_event=None):
+    """
+    Scrape flights for one search and store the result in the cache.
+
+    args: key: the cache key of the search, other args as in scrape_flights
+    return: dict of flights, as built by FlightsData.page_scrape
+    """
+    result = scrape_flights(depart, arrive, departure_date, return_date, on_event)
+    result_cache.set(key, result)
+    return result
+
+def format_form_date(date):
+    """
+    Convert a date from the form format (YYYY-MM-DD) to the FlightsData format (MM/DD/YYYY).
+
+    args: date: date string, or None
+    return: formatted date string, or None
+    """
+    if not date:
+        return None
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%m/%d/%Y")
+
+def make_flights_data(depart, arrive, departure_date, return_date, on_event=None, deadline=None):
+    """
+    Create a FlightsData for one search, sharing the app's driver pool and rate limiter.
+
+    args: depart, arrive: airport codes
+          departure_date, return_date: dates in YYYY-MM-DD format (as sent by the form)
+          on_event: optional callback for the search events
+          deadline: optional seconds the search may take
+    return: FlightsData
+    """
+    # Parse and format the dates to fit FlightsData class
+    return FlightsData(depart, arrive, format_form_date(departure_date), format_form_date(return_date),
+                       driver_pool=driver_pool, rate_limiter=rate_limiter,
+                       results_timeout=app.config['RESULTS_TIMEOUT'],
+                       settle_time=app.config['RESULTS_SETTLE_TIME'],
+                       direct_search=app.config['DIRECT_SEARCH'],
+                       extraction=app.config['EXTRACTION'],
+                       on_event=on_event, deadline=deadline)
+
+def scrape_flights(depart, arrive, departure_date, return_date, on_event=None):
+    """
+    Scrape flights for one search, keep them in memory and record them in
+    the fare history. When EXPORT_CSV is on, the flights are also written
+    in the background, in EXPORT_FORMAT. The scrape runs through the
+    scrape runner: within SEARCH_DEADLINE, retried and possibly hedged.
+
+    args: depart, arrive: airport codes
+          departure_date, return_date: dates in YYYY-MM-DD format (as sent by the form)
+          on_event: optional callback for the search events
+    return: dict of flights, as built by FlightsData.page_scrape
+    """
+    # Call the web_scrape function to retrieve flight data
+    start = time.perf_counter()
+    attempts = []
+
+    def new_attempt(deadline, hedge):
+        # only the first attempt reports its progress: a retry or a hedge would
+        # stream the same phases and flights again, from flight 1
+        attempts.append(make_flights_data(depart, arrive, departure_date, return_date,
+                                          on_event=None if attempts else on_event, deadline=deadline))
+        return attempts[-1]
+
+    try:
+        flights_data = scrape_runner.run(new_attempt)
+    except Exception as e:
+        if attempts:
+            record_scrape(attempts[-1], time.perf_counter() - start, error=e)
+        raise
+    record_scrape(flights_data, time.perf_counter() - start)
+    flights_dict = flights_data.flights_dict
+
+    try:
+        fare_store.record(depart, arrive, departure_date, return_date, flights_dict)
+    except Exception as e:
+        # losing history must not fail the search
+        logging.error(f"Could not record the fares of {depart}-{arrive}: {e}")
+
+    if app.config['EXPORT_CSV']:
+        export_executor.submit(export_scrape, flights_dict, depart, arrive,
+                               departure_date, return_date, app.config['EXPORT_FORMAT'])
+
+    return flights_dict
+
+def export_scrape(flights_dict, depart, arrive, departure_date, return_date, file_format):
+    """
+    Export the flights of a scrape through the output manager, timed as the `export` phase.
+    It runs in the background, so a failure is logged and counted here.
+
+    args: flights_dict: dict of flights, as built by FlightsData.page_scrape
+          other args as in OutputManager.export
+    return: the path written
+    raise: the error of the export, once logged
+    """
+    with phase_seconds.time(phase="export"):
+        try:
+            return output_manager.export(flights_dict, depart, arrive, departure_date, return_date, file_format)
+        except Exception as e:
+            export_failures_total.inc()
+            logging.error(f"Could not export the flights of {depart}-{arrive} to {file_format}: {e}")
+            raise
+
+def record_scrape(flights_data, seconds, error=None):
+    """
+    Record the metrics of one scrape, and its trace when TRACE_LOG is set.
+
+    args: flights_data: the FlightsData that ran the scrape
+          seconds: duration of the whole scrape, driver startup included
+          error: the exception raised by the scrape, if it failed
+    """
+    cards = len(flights_data.flights_dict) if error is None else 0
+    scrapes_total.inc(outcome="failed" if error else "done")
+    cards_extracted_total.inc(cards)
+    scrape_seconds.observe(seconds)
+    for phase, phase_time in flights_data.timings.items():
+        phase_seconds.observe(phase_time, phase=phase)
+
+    if not app.config['TRACE_LOG']:
+        return
+    trace_logger.info(json.dumps({
+        "time": time.time(),
+        "depart": flights_data.depart,
+        "arrive": flights_data.arrive,
+        "departure_date": flights_data.departure_date,
+        "return_date": flights_data.return_date,
+        "outcome": "failed" if error else "done",
+        "error": str(error) if error else None,
+        "cards": cards,
+        "seconds": round(seconds, 3),
+        "phases": {phase: round(phase_time, 3) for phase, phase_time in flights_data.timings.items()},
+    }))
+
+def run_batch_search(depart, arrive, date_pairs, progress):
+    """
+    Search one route for several date pairs at once.
+
+    args: depart, arrive: airport codes
+          date_pairs: list of (departure_date, return_date) in YYYY-MM-DD format
+          progress: dict updated with the status of each date pair
+    return: BatchResult with the date-tagged flights, failures and progress
+    """
+    def report(pair, status, error):
+        progress[BatchSearch.pair_label(pair)] = status
+
+    return batch_search.run(depart, arrive, date_pairs, progress=report)
+
+def read_batch_form(form):
+    """
+    Read a batch search request. The date pairs come from one of:
+    `dates` (list of [departure_date, return_date]), `month` (YYYY-MM, every
+    weekend), or `departure_date`/`return_date` with `flex_days` (± days).
+
+    args: form: dict parsed from the JSON body (or request.form)
+    return: dict of keyword arguments for run_batch_search
+    raise: KeyError if a field is missing, ValueError if a field is invalid
+    """
+    if form.get('dates'):
+        date_pairs = [(pair[0], pair[1] if len(pair) > 1 else None) for pair in form['dates']]
+        for pair in date_pairs:
+            for date in pair:
+                if date:
+                    datetime.strptime(date, "%Y-%m-%d")
+    elif form.get('month'):
+        month = datetime.strptime(form['month'], "%Y-%m")
+        date_pairs = weekend_date_pairs(month.year, month.month)
+    else:
+        flex_days = int(form.get('flex_days', 3))
+        # checked before the pairs are built, a large value would build millions of them
+        if not 0 <= flex_days <= (app.config['BATCH_MAX_DATES'] - 1) // 2:
+            raise ValueError(f"flex_days must be between 0 and {(app.config['BATCH_MAX_DATES'] - 1) // 2}")
+        date_pairs = flexible_date_pairs(form['departure_date'], form.get('return_date'), flex_days)
+
+    if not 0 < len(date_pairs) <= app.config['BATCH_MAX_DATES']:
+        raise ValueError(f"A batch must have between 1 and {app.config['BATCH_MAX_DATES']} date pairs")
+    return {"depart": form['departure'], "arrive": form['arrival'], "date_pairs": date_pairs}
+
+# Background workers running the searches submitted to /search
+search_jobs = SearchJobManager(search_flights,
+                               max_workers=app.config['JOB_WORKERS'],
+                               max_queue=app.config['JOB_QUEUE_SIZE'],
+                               job_ttl=app.config['JOB_TTL'],
+                               stream_events=True)
+atexit.register(search_jobs.shutdown)
+
+# Date fan-out of batch searches, capped globally by BATCH_MAX_CONCURRENCY
+batch_search = BatchSearch(search_flights, max_concurrency=app.config['BATCH_MAX_CONCURRENCY'])
+atexit.register(batch_search.shutdown)
+batch_jobs = SearchJobManager(run_batch_search,
+                              max_workers=app.config['JOB_WORKERS'],
+                              max_queue=app.config['JOB_QUEUE_SIZE'],
+                              job_ttl=app.config['JOB_TTL'],
+                              report_progress=True)
+atexit.register(batch_jobs.shutdown)
+
 @app.route('/', methods=['GET', 'POST'])
 def index ():
     """
@@ -49,28 +513,14 @@ def index ():
     # Process form data if the request method is POST
     if request.method == 'POST':
         try:
-            # request data from client
-            depart = request.form['departure']
-            arrive = request.form['arrival']
-            departure_date = request.form['departure_date']
-            return_date = request.form['return_date']
-
-            # Parse and format the dates to fit FlightsData class
-            formatted_departure_date = datetime.strptime(departure_date, "%Y-%m-%d").strftime("%m/%d/%Y")
-            formatted_return_date = datetime.strptime(return_date, "%Y-%m-%d").strftime("%m/%d/%Y")
-            # check point
-            ## print(f"Received form data: {depart}, {arrive}, {formatted_departure_date}, {departure_date}, {return_date}")
-
-            # Call the web_scrape function to retrieve flight data
-            flights_data = FlightsData(depart, arrive, formatted_departure_date, formatted_return_date)
-            csv_file = flights_data.run()
-            # Read the CSV file and store the flight data in a list
-            flight_options = read_csv(csv_file)
-
-            # Get the header from the CSV file
-            with open(csv_file, newline='') as csvfile:
-                flight_headers = next(csv.reader(csvfile, delimiter=','))
-            # print(f"Flight options: {flight_options}")
+            # request data from client and retrieve flight data
+            with index_phase_seconds.time(phase="search"):
+                flights_dict = search_flights(**read_search_form(request.form))
+            with index_phase_seconds.time(phase="sort_filter"):
+                if sorts_or_filters(request.form):
+                    flights_dict = sort_and_filter(FlightTable.from_flights_dict(flights_dict),
+                                                   request.form).to_flights_dict()
+                flight_headers, flight_options = flights_table(flights_dict)
 
         # exception condition
         except Exception as e:
@@ -80,7 +530,254 @@ def index ():
             return render_template('error.html', error_message=str(e))
 
     # Render the main page with flight data (if available)
-    return render_template('index.html', flight_options=flight_options, flight_headers=flight_headers)
+    with index_phase_seconds.time(phase="render"):
+        return render_template('index.html', flight_options=flight_options, flight_headers=flight_headers)
+
+@app.before_request
+def start_request_timer():
+    """
+    Note when the request started, for the request_seconds histogram.
+    """
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    """
+    Record the duration of the request (a streamed response is only timed
+    until the stream starts).
+    """
+    start = g.get('request_start')
+    if start is not None:
+        request_seconds.observe(time.perf_counter() - start,
+                                endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Expose the counters, histograms and gauges in the Prometheus text format.
+    """
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/search', methods=['POST'])
+def submit_search():
+    """
+    Enqueue a search and return its job id right away (202 Accepted).
+    Accepts the same fields as the index form, as form data or JSON.
+    """
+    form = request.get_json(silent=True) or request.form
+    try:
+        params = read_search_form(form)
+        # validate the dates now, rather than failing later in a worker
+        for field in ("departure_date", "return_date"):
+            datetime.strptime(params[field], "%Y-%m-%d")
+    except KeyError as e:
+        return jsonify(error=f"Missing field: {e.args[0]}"), 400
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    return submit_job(search_jobs, params, 'search_status', 'search_results')
+
+@app.route('/search/<job_id>', methods=['GET'])
+def search_status(job_id):
+    """
+    Report the status of a search job.
+    """
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job"), 404
+    return jsonify(job.to_dict())
+
+@app.route('/search/<job_id>/stream', methods=['GET'])
+def search_stream(job_id):
+    """
+    Stream the progress of a search job as Server-Sent Events: a `headers`
+    event with the table headers, `phase` events as the search goes through
+    page load, form fill, submit and results grid, one `flight` event (with
+    its table row) per flight as soon as it is scraped, and `status` events,
+    the last one reporting the job done or failed. Cached results produce no
+    flight events, the client reads them from the results URL.
+    """
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job"), 404
+    return Response(stream_events(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_events(job):
+    """
+    Generate the Server-Sent Events of a search job, see search_stream.
+
+    args: job: the SearchJob to follow
+    return: generator of event strings
+    """
+    flight_headers, _ = flights_table({})
+    yield format_event("headers", {"flight_headers": flight_headers})
+    seen = 0
+    while True:
+        events = job.wait_events(seen, timeout=app.config['STREAM_KEEPALIVE'])
+        if not events:
+            # comment line, keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            continue
+        seen += len(events)
+        for event, data in events:
+            if event == "flight":
+                _, rows = flights_table({data["flight_id"]: data["flight"]})
+                data = dict(data, row=rows[0])
+            yield format_event(event, data)
+            if event == "status" and data["status"] in (SearchJob.DONE, SearchJob.FAILED):
+                return
+
+def format_event(event, data):
+    """
+    Format one Server-Sent Event.
+
+    args: event: the event name
+          data: the event data, sent as JSON
+    return: str
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/search/<job_id>/results', methods=['GET'])
+def search_results(job_id):
+    """
+    Return the flight table of a finished search job.
+    Responds 202 while the job is still queued or running.
+    """
+    job, response = finished_job(search_jobs, job_id)
+    if job is None:
+        return response
+
+    flights_dict = job.result
+    if sorts_or_filters(request.args):
+        try:
+            flights_dict = sort_and_filter(FlightTable.from_flights_dict(flights_dict), request.args).to_flights_dict()
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+
+    flight_headers, flight_options = flights_table(flights_dict)
+    return jsonify(job_id=job.id, flights=list(flights_dict.values()),
+                   flight_headers=flight_headers, flight_options=flight_options)
+
+@app.route('/search/batch', methods=['POST'])
+def submit_batch_search():
+    """
+    Enqueue a search of one route over several date pairs (see read_batch_form)
+    and return its job id right away (202 Accepted).
+    """
+    form = request.get_json(silent=True) or request.form
+    try:
+        params = read_batch_form(form)
+    except KeyError as e:
+        return jsonify(error=f"Missing field: {e.args[0]}"), 400
+    except (ValueError, TypeError, IndexError) as e:
+        return jsonify(error=str(e)), 400
+
+    return submit_job(batch_jobs, params, 'batch_search_status', 'batch_search_results')
+
+@app.route('/search/batch/<job_id>', methods=['GET'])
+def batch_search_status(job_id):
+    """
+    Report the status of a batch search job, including the status of each date pair.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job"), 404
+    return jsonify(job.to_dict())
+
+@app.route('/search/batch/<job_id>/results', methods=['GET'])
+def batch_search_results(job_id):
+    """
+    Return the merged, date-tagged flights of a finished batch search job,
+    optionally sorted and filtered (see sort_and_filter).
+    Responds 202 while the job is still queued or running.
+    """
+    job, response = finished_job(batch_jobs, job_id)
+    if job is None:
+        return response
+
+    try:
+        flights = sort_and_filter(job.result.flights, request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    result = job.result.to_dict()
+    result["flights"] = [flight.to_dict() for flight in flights]
+    return jsonify(job_id=job.id, **result)
+
+@app.route('/fares/history', methods=['GET'])
+def fare_history():
+    """
+    Return the cheapest fare of each past scrape of a route and departure
+    date, from the fare history (no scrape). Query parameters: `departure`,
+    `arrival`, `departure_date`, and optionally `return_date` and `cabin`.
+    """
+    try:
+        history = fare_store.price_history(request.args['departure'], request.args['arrival'],
+                                           request.args['departure_date'], request.args.get('return_date'),
+                                           request.args.get('cabin', 'main_cabin'))
+    except KeyError as e:
+        return jsonify(error=f"Missing field: {e.args[0]}"), 400
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(history=history)
+
+@app.route('/fares/cheapest', methods=['GET'])
+def cheapest_fare():
+    """
+    Return the cheapest fare ever scraped for a route, from the fare history
+    (no scrape). Query parameters: `departure`, `arrival`, and optionally
+    `departure_date` and `cabin`. Responds 404 when no fare was recorded.
+    """
+    try:
+        flight = fare_store.cheapest_fare(request.args['departure'], request.args['arrival'],
+                                          request.args.get('departure_date'),
+                                          request.args.get('cabin', 'main_cabin'))
+    except KeyError as e:
+        return jsonify(error=f"Missing field: {e.args[0]}"), 400
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if flight is None:
+        return jsonify(error="No fare recorded for this route"), 404
+    return jsonify(flight=flight)
+
+def submit_job(manager, params, status_endpoint, results_endpoint):
+    """
+    Enqueue a job and build the 202 response pointing to its status and results.
+
+    args: manager: the SearchJobManager to submit to
+          params: keyword arguments of the job
+          status_endpoint, results_endpoint: names of the routes reporting on the job
+    return: Flask response
+    """
+    try:
+        job = manager.submit(**params)
+    except QueueFullError as e:
+        return jsonify(error=str(e)), 503
+
+    response = job.to_dict()
+    response["status_url"] = url_for(status_endpoint, job_id=job.id)
+    response["results_url"] = url_for(results_endpoint, job_id=job.id)
+    if manager.stream_events:
+        response["stream_url"] = url_for('search_stream', job_id=job.id)
+    return jsonify(response), 202
+
+def finished_job(manager, job_id):
+    """
+    Look up a job whose results are requested.
+
+    args: manager: the SearchJobManager owning the job
+          job_id: id of the job
+    return: tuple (job, None) if the job is done, otherwise (None, error response)
+    """
+    job = manager.get(job_id)
+    if job is None:
+        return None, (jsonify(error="Unknown or expired job"), 404)
+    if job.status == SearchJob.FAILED:
+        return None, (jsonify(job.to_dict()), 500)
+    if job.status != SearchJob.DONE:
+        return None, (jsonify(job.to_dict()), 202)
+    return job, None
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,290 @@
+'''
+This Python file is a command-line batch runner: it reads a file of
+route/date jobs (CSV or JSON Lines), scrapes them in parallel through
+FlightsData, and streams one JSON line per finished job to an output file.
+
+Usage:
+    python batch_runner.py jobs.csv --output results.jsonl --parallelism 4 --retries 2 --timeout 180
+    python batch_runner.py jobs.jsonl --fare-store fares.db --min-interval 5 --jitter 3
+
+Each job needs `depart`, `arrive` and `departure_date`, and may have
+`return_date` and `trip_type`. Dates are YYYY-MM-DD or MM/DD/YYYY; a job
+with another date fails at once, without retries.
+
+Functions:
+    read_jobs
+    to_flights_data_date
+    main
+
+Classes:
+    BatchRunner
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from rate_limiter import RateLimiter
+from result_cache import normalize_date
+
+
+def read_jobs(path, file_format=None):
+    """
+    Reads the jobs of a CSV (with a header row) or JSON Lines file.
+
+    Args:
+        path (str): The jobs file.
+        file_format (str, optional): "csv" or "jsonl". Defaults to the file extension.
+
+    Returns: list: One dict per job.
+    """
+    if file_format is None:
+        file_format = "jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".json") else "csv"
+
+    with open(path, newline='') as file:
+        if file_format == "csv":
+            jobs = [dict(row) for row in csv.DictReader(file)]
+        else:
+            jobs = [json.loads(line) for line in file if line.strip()]
+
+    for number, job in enumerate(jobs, start=1):
+        for field in ("depart", "arrive", "departure_date"):
+            if not job.get(field):
+                raise ValueError(f"Job {number} in {path} has no '{field}'")
+    return jobs
+
+
+def to_flights_data_date(date):
+    """
+    Converts a job date to the MM/DD/YYYY format FlightsData expects.
+
+    Args: date (str or None): Date in YYYY-MM-DD or MM/DD/YYYY format.
+
+    Returns: str or None
+    """
+    if not date:
+        return None
+    return datetime.strptime(normalize_date(date), "%Y-%m-%d").strftime("%m/%d/%Y")
+
+
+class BatchRunner:
+    """
+    Runs jobs on `parallelism` workers sharing one driver pool and one rate
+    limiter, retrying failed jobs with exponential backoff and failing
+    attempts that run longer than the per-job timeout.
+    """
+
+    def __init__(self, sink, parallelism=2, retries=1, timeout=None, backoff=5.0, flights_data_factory=None,
+                 fare_store=None, browser_profile="default", rate_limiter=None):
+        """
+        Args:
+            sink (file): Text file the JSON result lines are written to.
+            parallelism (int, optional): Jobs scraped at the same time. Defaults to 2.
+            retries (int, optional): Extra attempts for a failed job. Defaults to 1.
+            timeout (float, optional): Seconds an attempt may take, waits for the rate limiter
+                            and a free driver included. Defaults to None (no limit).
+            backoff (float, optional): Seconds before the first retry, doubled for each retry. Defaults to 5.
+            flights_data_factory (callable, optional): Called with (depart, arrive, departure_date,
+                            return_date, trip_type, deadline=timeout), returns a FlightsData.
+                            Defaults to FlightsData with a driver pool of `parallelism` Chrome sessions
+                            and the rate limiter.
+            fare_store (FareStore, optional): Fare history each successful job is recorded in.
+                            Defaults to None.
+            browser_profile (str, optional): The FlightsData.setup_driver profile of the default
+                            driver pool. Defaults to "default".
+            rate_limiter (RateLimiter, optional): Paces the searches of the default factory across
+                            the workers. Defaults to the pacing of the web app (5 seconds plus up to
+                            3 seconds of jitter).
+        """
+        self.sink = sink
+        self.parallelism = parallelism
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.fare_store = fare_store
+        self.browser_profile = browser_profile
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(5.0, 3.0)
+        self._driver_pool = None
+        if flights_data_factory is None:
+            flights_data_factory = self._default_factory
+        self._flights_data_factory = flights_data_factory
+        self._pool_lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+        self.succeeded = 0
+        self.failed = 0
+
+    def _default_factory(self, depart, arrive, departure_date, return_date, trip_type, deadline=None):
+        """
+        Creates a FlightsData borrowing drivers from a pool, and paced by a
+        rate limiter, shared by the workers.
+        """
+        from driver_pool import DriverPool
+        from web_scraper import FlightsData
+
+        with self._pool_lock:
+            if self._driver_pool is None:
+                self._driver_pool = DriverPool(lambda: FlightsData.setup_driver(self.browser_profile),
+                                               size=self.parallelism)
+        return FlightsData(depart, arrive, departure_date, return_date, trip_type,
+                           driver_pool=self._driver_pool, rate_limiter=self.rate_limiter, deadline=deadline)
+
+    def run(self, jobs):
+        """
+        Runs every job and streams each outcome to the sink as soon as it finishes.
+
+        Args: jobs (list): Job dicts, as returned by read_jobs().
+
+        Returns: bool: True if every job succeeded.
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="batch-runner") as executor:
+                for _ in executor.map(self.run_job, jobs):
+                    pass
+        finally:
+            if self._driver_pool is not None:
+                self._driver_pool.shutdown()
+        return self.failed == 0
+
+    def run_job(self, job):
+        """
+        Runs one job with retries and writes its outcome to the sink. A job
+        whose dates cannot be read fails at once with 0 attempts.
+
+        Args: job (dict): The job.
+
+        Returns: dict: The outcome written to the sink.
+        """
+        start = time.monotonic()
+        try:
+            departure_date = to_flights_data_date(job["departure_date"])
+            return_date = to_flights_data_date(job.get("return_date"))
+        except (ValueError, AttributeError) as e:
+            # a bad date fails the same way on every attempt, so it is not retried
+            outcome = {"job": job, "status": "failed", "attempts": 0,
+                       "elapsed": round(time.monotonic() - start, 3), "error": str(e)}
+            self._write(outcome, succeeded=False)
+            return outcome
+
+        error = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                flights = self._attempt(job, departure_date, return_date)
+                self._record(job, flights)
+                outcome = {"job": job, "status": "done", "attempts": attempt,
+                           "elapsed": round(time.monotonic() - start, 3), "flights": flights}
+                self._write(outcome, succeeded=True)
+                return outcome
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logging.warning(f"Job {job['depart']}-{job['arrive']} {job['departure_date']} "
+                                f"attempt {attempt} failed: {error}")
+                if attempt <= self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        outcome = {"job": job, "status": "failed", "attempts": self.retries + 1,
+                   "elapsed": round(time.monotonic() - start, 3), "error": error}
+        self._write(outcome, succeeded=False)
+        return outcome
+
+    def _attempt(self, job, departure_date, return_date):
+        """
+        Scrapes one job once. The timeout is the deadline of the search:
+        every wait of the scrape is cut to what is left of it, and the
+        scrape fails with a TimeoutError instead of hanging.
+
+        Args:
+            job (dict): The job.
+            departure_date (str): Its departure date, in MM/DD/YYYY format.
+            return_date (str or None): Its return date, in MM/DD/YYYY format.
+
+        Returns: list: The scraped flights.
+        """
+        flights_data = self._flights_data_factory(
+            job["depart"], job["arrive"], departure_date, return_date,
+            job.get("trip_type") or "round trip", deadline=self.timeout or None)
+        return list(flights_data.search().values())
+
+    def _record(self, job, flights):
+        """
+        Records the flights of a job in the fare history, if any. A storage
+        error is logged and does not fail the job.
+        """
+        if self.fare_store is None:
+            return
+        try:
+            self.fare_store.record(job["depart"], job["arrive"], job["departure_date"],
+                                   job.get("return_date"), flights)
+        except Exception as e:
+            logging.error(f"Could not record the fares of job {job['depart']}-{job['arrive']}: {e}")
+
+    def _write(self, outcome, succeeded):
+        """
+        Writes one outcome as a JSON line and flushes it right away.
+        """
+        with self._sink_lock:
+            if succeeded:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self.sink.write(json.dumps(outcome) + "\n")
+            self.sink.flush()
+
+
+def main(argv=None):
+    """
+    Parses the command line and runs the batch.
+
+    Returns: int: The exit code (0 when every job succeeded).
+    """
+    parser = argparse.ArgumentParser(description="Scrape a file of route/date jobs in parallel.")
+    parser.add_argument("jobs", help="CSV (with header) or JSON Lines file of jobs")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="format of the jobs file (default: from extension)")
+    parser.add_argument("--output", default="-", help="JSON Lines file for the results (default: stdout)")
+    parser.add_argument("--parallelism", type=int, default=2, help="jobs scraped at the same time")
+    parser.add_argument("--retries", type=int, default=1, help="extra attempts for a failed job")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds an attempt may take, waits included")
+    parser.add_argument("--backoff", type=float, default=5.0, help="seconds before the first retry")
+    parser.add_argument("--min-interval", type=float, default=5.0, help="minimum seconds between two searches")
+    parser.add_argument("--jitter", type=float, default=3.0, help="maximum random seconds added to the interval")
+    parser.add_argument("--fare-store", help="SQLite file to also record the scraped fares in")
+    parser.add_argument("--profile", choices=("default", "lean"), default="default",
+                        help="Chrome profile (lean: headless, no images, fonts or trackers)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    jobs = read_jobs(args.jobs, args.format)
+
+    fare_store = None
+    if args.fare_store:
+        from fare_store import FareStore
+        fare_store = FareStore(args.fare_store)
+
+    sink = sys.stdout if args.output == "-" else open(args.output, "a")
+    try:
+        runner = BatchRunner(sink, parallelism=args.parallelism, retries=args.retries,
+                             timeout=args.timeout, backoff=args.backoff, fare_store=fare_store,
+                             browser_profile=args.profile,
+                             rate_limiter=RateLimiter(args.min_interval, args.jitter))
+        all_succeeded = runner.run(jobs)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+        if fare_store is not None:
+            fare_store.close()
+
+    logging.info(f"{runner.succeeded} jobs succeeded, {runner.failed} failed")
+    return 0 if all_succeeded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+'''
+This Python file runs flexible-date searches: one route searched for a set
+or range of date pairs, concurrently, with the results merged into one
+date-tagged list.
+
+Functions:
+    flexible_date_pairs
+    weekend_date_pairs
+
+Classes:
+    BatchResult
+    BatchSearch
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import calendar
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from flight_model import Flight, FlightTable
+
+# date format used by the batch API (the format sent by the search form)
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def flexible_date_pairs(departure_date, return_date=None, days=3):
+    """
+    Builds the date pairs of a "± days" search: the trip is shifted by
+    -days..+days, keeping the same length of stay.
+
+    Args:
+        departure_date (str): The departure date in YYYY-MM-DD format.
+        return_date (str, optional): The return date in YYYY-MM-DD format. Defaults to None (one way).
+        days (int, optional): Maximum shift in days. Defaults to 3.
+
+    Returns: list: (departure_date, return_date) tuples in date order.
+    """
+    departure = datetime.strptime(departure_date, DATE_FORMAT).date()
+    stay = None
+    if return_date:
+        stay = datetime.strptime(return_date, DATE_FORMAT).date() - departure
+
+    pairs = []
+    for shift in range(-days, days + 1):
+        leave = departure + timedelta(days=shift)
+        back = leave + stay if stay is not None else None
+        pairs.append((leave.strftime(DATE_FORMAT), back.strftime(DATE_FORMAT) if back else None))
+    return pairs
+
+
+def weekend_date_pairs(year, month, depart_weekday=calendar.FRIDAY, return_weekday=calendar.SUNDAY):
+    """
+    Builds the date pairs of every weekend trip leaving in a month.
+
+    Args:
+        year (int): The year.
+        month (int): The month (1-12).
+        depart_weekday (int, optional): Weekday to leave on. Defaults to Friday.
+        return_weekday (int, optional): Weekday to come back on. Defaults to Sunday.
+
+    Returns: list: (departure_date, return_date) tuples in date order.
+    """
+    stay = (return_weekday - depart_weekday) % 7 or 7
+    pairs = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        leave = date(year, month, day)
+        if leave.weekday() == depart_weekday:
+            back = leave + timedelta(days=stay)
+            pairs.append((leave.strftime(DATE_FORMAT), back.strftime(DATE_FORMAT)))
+    return pairs
+
+
+class BatchResult:
+    """
+    The merged outcome of a batch: every flight tagged with its dates (in a
+    columnar FlightTable), the failed date pairs, and the status of each date pair.
+    """
+
+    def __init__(self, depart, arrive, date_pairs):
+        """
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            date_pairs (list): The (departure_date, return_date) tuples searched.
+        """
+        self.depart = depart
+        self.arrive = arrive
+        self.date_pairs = list(date_pairs)
+        self.flights = FlightTable()
+        self.failures = {}
+        self.progress = {pair: "queued" for pair in self.date_pairs}
+
+    def to_dict(self):
+        """
+        Returns: dict: The batch result for JSON responses (date pairs are written "departure/return").
+        """
+        label = BatchSearch.pair_label
+        return {
+            "depart": self.depart,
+            "arrive": self.arrive,
+            "flights": [flight.to_dict() for flight in self.flights],
+            "failures": {label(pair): error for pair, error in self.failures.items()},
+            "progress": {label(pair): status for pair, status in self.progress.items()},
+        }
+
+
+class BatchSearch:
+    """
+    Fans the date pairs of a route out over a shared, bounded set of worker
+    threads. All batches run through the same executor, so `max_concurrency`
+    is a global cap on simultaneous scrapes.
+    """
+
+    def __init__(self, search_func, max_concurrency=2):
+        """
+        Args:
+            search_func (callable): Called with (depart, arrive, departure_date, return_date),
+                                    returns the flights dictionary of one search.
+            max_concurrency (int, optional): Scrapes running at the same time. Defaults to 2.
+        """
+        self._search_func = search_func
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-search")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pair_label(pair):
+        """
+        Returns: str: A date pair written as "departure/return" (or just "departure" one way).
+        """
+        departure_date, return_date = pair
+        return f"{departure_date}/{return_date}" if return_date else departure_date
+
+    def run(self, depart, arrive, date_pairs, progress=None):
+        """
+        Searches every date pair and waits for all of them.
+
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            date_pairs (list): (departure_date, return_date) tuples.
+            progress (callable, optional): Called with (date_pair, status, error) whenever a
+                                           date pair starts, finishes or fails.
+
+        Returns: BatchResult: The merged results, in date order.
+        """
+        result = BatchResult(depart, arrive, date_pairs)
+        per_pair = {}
+        futures = [self._executor.submit(self._search_pair, result, per_pair, pair, progress)
+                   for pair in result.date_pairs]
+        for future in futures:
+            future.result()
+
+        # merge in the order the date pairs were given, not completion order
+        for pair in result.date_pairs:
+            result.flights.extend(per_pair.get(pair, []))
+        return result
+
+    def shutdown(self, wait=False):
+        """
+        Stops the workers.
+
+        Args: wait (bool, optional): Wait for running scrapes to finish. Defaults to False.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _search_pair(self, result, per_pair, pair, progress):
+        """
+        Runs the search of one date pair and records its outcome in the batch result.
+        """
+        departure_date, return_date = pair
+        self._report(result, pair, "running", None, progress)
+        try:
+            flights_dict = self._search_func(result.depart, result.arrive, departure_date, return_date)
+        except Exception as e:
+            logging.error(f"Batch search {result.depart}-{result.arrive} {self.pair_label(pair)} failed: {e}")
+            with self._lock:
+                result.failures[pair] = str(e)
+            self._report(result, pair, "failed", str(e), progress)
+            return
+
+        flights = []
+        for flight in flights_dict.values():
+            record = Flight.from_dict(flight)
+            record.departure_date = departure_date
+            record.return_date = return_date
+            flights.append(record)
+        with self._lock:
+            per_pair[pair] = flights
+        self._report(result, pair, "done", None, progress)
+
+    def _report(self, result, pair, status, error, progress):
+        """
+        Updates the status of a date pair and notifies the progress callback.
+        """
+        with self._lock:
+            result.progress[pair] = status
+        if progress is not None:
+            try:
+                progress(pair, status, error)
+            except Exception as e:
+                logging.warning(f"Batch progress callback failed: {e}")
@@ -0,0 +1,283 @@
+'''
+This Python file benchmarks the hot paths of the pipeline on synthetic
+results pages (or recorded ones) of configurable size, without Chrome or
+the network: parsing (without the parsed-page memo), extraction, price processing, CSV export and read,
+and rendering of index.html. Each benchmark reports its wall time, peak
+memory and throughput as JSON, which can be compared with a previous run.
+With --startup, the cold start of the web app is measured too: importing
+app and answering the first GET, each in a fresh interpreter.
+
+Usage:
+    python benchmarks.py --sizes 10 100 1000 10000 --output bench.json
+    python benchmarks.py --startup --only import_app first_get
+    python benchmarks.py --output new.json --compare bench.json --threshold 0.2
+    python benchmarks.py --fixtures snapshots/jfk-sfo
+
+Functions:
+    measure
+    measure_startup
+    benchmarks_for_page
+    run_suite
+    compare
+    main
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from replay import ReplayDriver, load_snapshots, synthetic_results_page
+from web_scraper import (FlightsData, DataExport, RESULTS_GRID_SELECTOR, PRICE_CELL_SELECTOR,
+                         PRICE_SELECTOR)
+
+# sizes (flight cards per page) benchmarked by default
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+# Run in a fresh interpreter: seconds to import the web app, then to answer its first GET /
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/')
+print(json.dumps({"import_app": imported - start, "first_get": time.perf_counter() - imported}))
+"""
+
+
+def measure(func, repeat=3):
+    """
+    Times a function: `repeat` timed calls, then one more call under
+    tracemalloc for the peak memory (tracing slows the call down, so it is
+    not timed).
+
+    Args:
+        func (callable): The code to measure, called without arguments.
+        repeat (int, optional): Number of timed calls. Defaults to 3.
+
+    Returns: dict: wall_min and wall_median (seconds) and peak_bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"wall_min": min(times), "wall_median": statistics.median(times), "peak_bytes": peak}
+
+
+def measure_startup(repeat=3):
+    """
+    Times the cold start of the web app in `repeat` fresh interpreters:
+    importing app (import_app), then answering the first GET / with its
+    template compilation (first_get).
+
+    Args: repeat (int, optional): Number of interpreters started. Defaults to 3.
+
+    Returns: list: One result per measure, in the format of run_suite's results.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=directory,
+                                 capture_output=True, text=True, check=True)
+        runs.append(json.loads(process.stdout.splitlines()[-1]))
+
+    results = []
+    for name in ("import_app", "first_get"):
+        times = [run[name] for run in runs]
+        results.append({"wall_min": min(times), "wall_median": statistics.median(times), "peak_bytes": None,
+                        "name": name, "page": "startup", "cards": 0, "repeat": repeat, "ops_per_sec": None})
+    return results
+
+
+def benchmarks_for_page(page, directory):
+    """
+    Builds the benchmarks of one results page.
+
+    Args:
+        page (str): The results page HTML.
+        directory (str): Where the export benchmarks write their files.
+
+    Returns: list: (name, callable) pairs.
+    """
+    # imported here, so the web app is only set up when the suite runs
+    from flask import render_template
+    from app import app, flights_table, read_csv
+
+    driver = ReplayDriver([page])
+    flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", driver_factory=lambda: driver)
+    cards = driver.find_elements("css selector", RESULTS_GRID_SELECTOR)
+    price_lists = [card.find_elements("css selector", f"{PRICE_CELL_SELECTOR} {PRICE_SELECTOR}")
+                   for card in cards]
+    flights_dict = flights_data.page_scrape_snapshot()
+    csv_path = os.path.join(directory, "flights.csv")
+    DataExport(csv_path, flights_dict).export_to_csv()
+    flight_headers, flight_options = flights_table(flights_dict)
+
+    def render_index():
+        with app.test_request_context('/'):
+            render_template('index.html', flight_options=flight_options, flight_headers=flight_headers)
+
+    def fresh_snapshot(func):
+        # forget the parsed page, so each call parses a new snapshot
+        def call():
+            flights_data.parsed_page = None
+            return func()
+        return call
+
+    return [
+        ("parse_page", fresh_snapshot(flights_data.parse_page)),
+        ("extract_info", fresh_snapshot(lambda: flights_data.extract_info("flt-times-sm"))),
+        ("page_scrape_snapshot", fresh_snapshot(flights_data.page_scrape_snapshot)),
+        # page_scrape reads ReplayElement stubs here, not a live browser: this
+        # times the per-card parsing, none of the WebDriver round trips
+        ("page_scrape_replay_stub", lambda: flights_data.page_scrape(cards)),
+        ("process_prices", lambda: [flights_data.process_prices(prices) for prices in price_lists]),
+        ("export_to_csv", DataExport(csv_path, flights_dict).export_to_csv),
+        ("read_csv", lambda: read_csv(csv_path)),
+        ("render_index", render_index),
+    ]
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=3, fixtures=None, only=None, seed=0, startup=False):
+    """
+    Runs every benchmark on a synthetic page of each size, and on the
+    recorded pages of a fixtures directory.
+
+    Args:
+        sizes (iterable, optional): Flight cards per synthetic page. Defaults to DEFAULT_SIZES.
+        repeat (int, optional): Timed calls per benchmark. Defaults to 3.
+        fixtures (str, optional): A directory of recorded pages (see replay.py). Defaults to None.
+        only (iterable, optional): Names of the benchmarks to run. Defaults to None (all).
+        seed (int, optional): Seed of the synthetic pages. Defaults to 0.
+        startup (bool, optional): Also measure the cold start of the web app
+                                  (see measure_startup). Defaults to False.
+
+    Returns: dict: The run metadata and one result per benchmark and page.
+    """
+    pages = [(f"synthetic-{size}", synthetic_results_page(size, seed)) for size in sizes]
+    if fixtures:
+        pages += [(f"{os.path.basename(os.path.normpath(fixtures))}-{number}", page)
+                  for number, page in enumerate(load_snapshots(fixtures), start=1)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for page_name, page in pages:
+            benchmarks = benchmarks_for_page(page, directory)
+            cards = len(ReplayDriver([page]).find_elements("css selector", RESULTS_GRID_SELECTOR))
+            for name, func in benchmarks:
+                if only and name not in only:
+                    continue
+                result = measure(func, repeat)
+                result.update({
+                    "name": name,
+                    "page": page_name,
+                    "cards": cards,
+                    "repeat": repeat,
+                    # flight cards handled per second
+                    "ops_per_sec": cards / result["wall_median"] if result["wall_median"] else None,
+                })
+                results.append(result)
+
+    if startup:
+        results += [result for result in measure_startup(repeat) if not only or result["name"] in only]
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.time(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Compares two runs benchmark by benchmark.
+
+    Args:
+        baseline (dict): A previous run_suite() result.
+        current (dict): The new run_suite() result.
+        threshold (float, optional): Relative slowdown of the median wall time
+                                     counted as a regression. Defaults to 0.2 (20%).
+
+    Returns: list: One dict per benchmark present in both runs, with the name,
+                   page, both medians, the ratio and a `regression` flag.
+    """
+    before = {(result["name"], result["page"]): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        previous = before.get((result["name"], result["page"]))
+        if previous is None:
+            continue
+        ratio = result["wall_median"] / previous["wall_median"] if previous["wall_median"] else None
+        comparison.append({
+            "name": result["name"],
+            "page": result["page"],
+            "baseline_median": previous["wall_median"],
+            "current_median": result["wall_median"],
+            "ratio": ratio,
+            "regression": ratio is not None and ratio > 1 + threshold,
+        })
+    return comparison
+
+
+def main(argv=None):
+    """
+    Parses the command line, runs the suite and prints or writes the results.
+
+    Returns: int: The exit code (1 if a regression was found by --compare).
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the parse, extract, export and render paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="flight cards per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3, help="timed calls per benchmark")
+    parser.add_argument("--fixtures", help="directory of recorded pages to benchmark too")
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument("--startup", action="store_true", help="also measure importing app and the first GET")
+    parser.add_argument("--output", default="-", help="JSON file for the results (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    run = run_suite(args.sizes, args.repeat, args.fixtures, args.only, startup=args.startup)
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as file:
+            run["comparison"] = compare(json.load(file), run, args.threshold)
+        regressions = [entry for entry in run["comparison"] if entry["regression"]]
+        for entry in regressions:
+            print(f"Regression: {entry['name']} on {entry['page']} is {entry['ratio']:.2f}x slower",
+                  file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(run, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+'''
+This Python file keeps a bounded pool of warmed-up Selenium WebDriver
+sessions, so each flight search borrows a browser instead of launching
+and tearing down its own Chrome.
+
+Classes:
+    DriverPool
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+# Selenium's own page load timeout, restored when a driver comes back
+DEFAULT_PAGE_LOAD_TIMEOUT = 300
+
+
+class DriverPool:
+    """
+    A thread-safe pool of reusable WebDriver sessions.
+
+    Drivers are created on demand up to `size`, handed out one search at a
+    time, reset (tabs, cookies, storage, navigation) when they come back,
+    and recycled after `max_uses` searches or as soon as they crash.
+    """
+
+    def __init__(self, driver_factory, size=2, max_uses=50):
+        """
+        Initializes the pool. No browser is started until a driver is
+        requested or warm() is called.
+
+        Args:
+            driver_factory (callable): Returns a new WebDriver when called.
+            size (int, optional): Maximum number of live drivers. Defaults to 2.
+            max_uses (int, optional): Number of searches a driver serves before
+                                      it is replaced. Defaults to 50.
+        """
+        if size < 1:
+            raise ValueError("'size' must be at least 1.")
+        self._driver_factory = driver_factory
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = deque()
+        self._uses = {}
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def warm(self, count=None):
+        """
+        Starts idle drivers ahead of time so the first searches do not pay
+        the browser launch cost.
+
+        Args:
+            count (int, optional): Number of drivers to start. Defaults to the pool size.
+        """
+        count = self.size if count is None else min(count, self.size)
+        drivers = []
+        try:
+            for _ in range(count):
+                with self._condition:
+                    if self._closed or self._created >= count:
+                        break
+                drivers.append(self.acquire(timeout=0))
+        except TimeoutError:
+            pass
+        finally:
+            for driver in drivers:
+                self._give_back(driver)
+
+    def acquire(self, timeout=None):
+        """
+        Takes a driver out of the pool, starting a new one if the pool is
+        not full yet, or waiting for one to be released otherwise.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free driver.
+                                       Defaults to None (wait forever).
+
+        Returns: A WebDriver that belongs to the caller until release().
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The driver pool has been shut down.")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No WebDriver became available in time.")
+                self._condition.wait(remaining)
+
+        # launch the browser outside the lock, it takes a few seconds
+        try:
+            driver = self._driver_factory()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def release(self, driver, discard=False):
+        """
+        Returns a driver to the pool. The driver is quit instead of reused
+        when it is discarded, worn out, fails to reset, or the pool is closed.
+
+        Args:
+            driver (WebDriver): A driver obtained from acquire().
+            discard (bool, optional): Force the driver to be replaced. Defaults to False.
+        """
+        with self._condition:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            worn_out = self._uses[id(driver)] >= self.max_uses
+        if discard or worn_out or not self.reset_driver(driver):
+            self._destroy(driver)
+        else:
+            self._give_back(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Context manager that borrows a driver for the duration of a search.
+        A driver that raised a WebDriverException is treated as crashed.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free driver.
+
+        Yields: WebDriver
+        """
+        driver = self.acquire(timeout)
+        crashed = False
+        try:
+            yield driver
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            self.release(driver, discard=crashed)
+
+    @staticmethod
+    def reset_driver(driver):
+        """
+        Clears the state one search leaves behind: extra tabs, cookies,
+        web storage, the current page, a page load timeout shortened to a
+        search deadline and unread performance log entries.
+
+        Args: driver (WebDriver): The driver to reset.
+
+        Returns: bool: True if the driver is healthy and ready for reuse.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except WebDriverException:
+                # pages such as about:blank have no storage to clear
+                pass
+            driver.delete_all_cookies()
+            driver.set_page_load_timeout(DEFAULT_PAGE_LOAD_TIMEOUT)
+            driver.get("about:blank")
+            try:
+                driver.get_log("performance")
+            except (WebDriverException, AttributeError):
+                # only drivers started with performance logging keep this log
+                pass
+            return True
+        except Exception as e:
+            logging.warning(f"Discarding WebDriver that failed to reset: {e}")
+            return False
+
+    def shutdown(self):
+        """
+        Quits every idle driver and closes the pool. Drivers that are still
+        in use are quit when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        for driver in idle:
+            self._destroy(driver)
+
+    def stats(self):
+        """
+        Returns: dict: The pool size, live drivers, and idle drivers.
+        """
+        with self._condition:
+            return {"size": self.size, "live": self._created, "idle": len(self._idle)}
+
+    def _give_back(self, driver):
+        """
+        Puts a healthy driver back on the idle list (or quits it if the pool is closed).
+        """
+        with self._condition:
+            if not self._closed:
+                self._idle.append(driver)
+                self._condition.notify()
+                return
+        self._destroy(driver)
+
+    def _destroy(self, driver):
+        """
+        Quits a driver and frees its slot in the pool.
+        """
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error while quitting WebDriver: {e}")
+        with self._condition:
+            self._uses.pop(id(driver), None)
+            self._created -= 1
+            self._condition.notify()
@@ -0,0 +1,415 @@
+'''
+This Python file holds the export engine: a registry of streaming writers
+that append flights to a file one at a time (CSV, JSON Lines) or in row
+groups (Parquet and Arrow, when pyarrow is installed), without building a
+DataFrame first. Every writer takes the same flight records: Flight
+objects, or flight dictionaries as built by FlightsData.page_scrape.
+
+Functions:
+    atomic_path
+    register_exporter
+    get_exporter
+    exporter_for_path
+    open_writer
+    export_flights
+
+Classes:
+    FlightWriter
+    CsvWriter
+    JsonLinesWriter
+    ArrowBatchWriter
+    ParquetWriter
+    ArrowWriter
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import csv
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+from flight_model import MISSING, Flight, FlightTable
+
+# name -> writer class, filled by register_exporter
+EXPORTERS = {}
+
+# columns of the text formats, in the scraped (display text) format
+TEXT_COLUMNS = ("flight_numbers", "departure_time", "arrival_time", "duration", "stops",
+                "basic_economy_price", "main_cabin_price", "first_class_price", "fare_classes",
+                "departure_date", "return_date")
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Context manager yielding a temporary path next to `path`. When the block
+    succeeds the temporary file is renamed to `path` in one step, otherwise
+    it is deleted and `path` is left untouched.
+
+    Args: path (str): The final file path.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def register_exporter(name, writer_class):
+    """
+    Registers a writer class under a format name.
+
+    Args:
+        name (str): The format name, e.g. "csv".
+        writer_class (type): A FlightWriter subclass.
+    """
+    EXPORTERS[name] = writer_class
+
+
+def get_exporter(name):
+    """
+    Args: name (str): A registered format name.
+
+    Returns: type: The writer class of the format.
+
+    Raises: ValueError: If the format is unknown.
+    """
+    try:
+        return EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown export format {name}, use one of: {', '.join(EXPORTERS)}") from None
+
+
+def exporter_for_path(path):
+    """
+    Args: path (str): An output file name.
+
+    Returns: str: The name of the format whose extension matches the file name.
+
+    Raises: ValueError: If no registered format uses that extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for name, writer_class in EXPORTERS.items():
+        if extension in writer_class.EXTENSIONS:
+            return name
+    raise ValueError(f"No export format for the file extension '{extension}'")
+
+
+def open_writer(path, file_format=None, append=False, context=None):
+    """
+    Opens a writer for a file.
+
+    Args:
+        path (str): The output file.
+        file_format (str, optional): A registered format name. Defaults to the file extension.
+        append (bool, optional): Add to an existing file instead of replacing it. Defaults to False.
+        context (dict, optional): Constant columns written with every flight,
+                                  e.g. {"depart": "JFK", "arrive": "SFO"}. Defaults to None.
+
+    Returns: FlightWriter
+    """
+    writer_class = get_exporter(file_format or exporter_for_path(path))
+    return writer_class(path, append=append, context=context)
+
+
+def export_flights(flights, path, file_format=None, append=False, context=None):
+    """
+    Writes flights to a file, one at a time. A new file is written to a
+    temporary file renamed into place at the end, so readers never see it
+    half-written.
+
+    Args:
+        flights: A FlightTable, an iterable of Flight records or flight
+                 dictionaries, or a flights dictionary as built by page_scrape.
+        path (str): The output file.
+        file_format, append, context: As in open_writer.
+
+    Returns: str: The path of the file written.
+    """
+    file_format = file_format or exporter_for_path(path)
+    if append:
+        with open_writer(path, file_format, append, context) as writer:
+            writer.write_many(flights)
+        return path
+    with atomic_path(path) as tmp_path:
+        with open_writer(tmp_path, file_format, context=context) as writer:
+            writer.write_many(flights)
+    return path
+
+
+class FlightWriter:
+    """
+    Base class of the streaming writers. Subclasses implement _write_row,
+    and may override _open and close. Writers are context managers.
+    """
+
+    # file extensions of the format, the first one is the default
+    EXTENSIONS = ()
+
+    def __init__(self, path, append=False, context=None):
+        """
+        Args:
+            path (str): The output file.
+            append (bool, optional): Add to an existing file instead of replacing it. Defaults to False.
+            context (dict, optional): Constant columns written with every flight. Defaults to None.
+        """
+        self.path = path
+        self.append = append
+        self.context = dict(context or {})
+        self.rows_written = 0
+        self._open()
+
+    @staticmethod
+    def as_flight(flight):
+        """
+        Args: flight (Flight or dict): A flight record or a scraped flight dictionary.
+
+        Returns: Flight
+        """
+        return flight if isinstance(flight, Flight) else Flight.from_dict(flight)
+
+    def write(self, flight):
+        """
+        Writes one flight.
+
+        Args: flight (Flight or dict): A flight record or a scraped flight dictionary.
+        """
+        self._write_row(self.as_flight(flight))
+        self.rows_written += 1
+
+    def write_many(self, flights):
+        """
+        Writes several flights.
+
+        Args: flights: A FlightTable, an iterable of flights, or a flights dictionary (its values are written).
+        """
+        if isinstance(flights, dict):
+            flights = flights.values()
+        for flight in flights:
+            self.write(flight)
+
+    def text_row(self, flight):
+        """
+        Args: flight (Flight): The flight.
+
+        Returns: dict: The context columns followed by the flight in display text.
+        """
+        values = flight.to_dict()
+        row = dict(self.context)
+        for column in TEXT_COLUMNS:
+            row[column] = values.get(column)
+        return row
+
+    def _open(self):
+        """
+        Opens the output file.
+        """
+
+    def _write_row(self, flight):
+        """
+        Writes one Flight record.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Flushes and closes the output file.
+        """
+
+    def __enter__(self):
+        """
+        Returns: FlightWriter: The writer itself.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes the writer, also when an exception was raised.
+        """
+        self.close()
+
+
+class CsvWriter(FlightWriter):
+    """
+    Writes one CSV row per flight. The header row is only written when the
+    file is new or empty, so appending several scrapes gives one table.
+    Lists (flight numbers, fare classes) are joined with ", ". The file is
+    UTF-8 with a byte order mark, so Excel opens it with the right encoding.
+    """
+
+    EXTENSIONS = (".csv",)
+
+    def _open(self):
+        """
+        Opens the file and writes the header row if it is empty.
+        """
+        self._file = open(self.path, "a" if self.append else "w", newline='', encoding='utf-8-sig')
+        fieldnames = list(self.context) + list(TEXT_COLUMNS)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def _write_row(self, flight):
+        """
+        Writes one CSV row.
+        """
+        row = self.text_row(flight)
+        for column, value in row.items():
+            if isinstance(value, list):
+                row[column] = ", ".join(value)
+        self._writer.writerow(row)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self._file.close()
+
+
+class JsonLinesWriter(FlightWriter):
+    """
+    Writes one JSON object per line and per flight.
+    """
+
+    EXTENSIONS = (".jsonl", ".ndjson")
+
+    def _open(self):
+        """
+        Opens the file.
+        """
+        self._file = open(self.path, "a" if self.append else "w", encoding='utf-8')
+
+    def _write_row(self, flight):
+        """
+        Writes one JSON line.
+        """
+        self._file.write(json.dumps(self.text_row(flight)) + "\n")
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self._file.close()
+
+
+class ArrowBatchWriter(FlightWriter):
+    """
+    Base class of the pyarrow writers. Flights are buffered in a FlightTable
+    and written as one record batch every `batch_size` flights, with the
+    parsed numeric columns (minutes, cents) rather than display text, so
+    analytics read typed columns directly. These formats cannot be appended
+    to, a new file is always written.
+    """
+
+    # flights buffered before a record batch is written
+    batch_size = 4096
+
+    def _open(self):
+        """
+        Builds the schema and opens the file.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+            ValueError: If appending was requested.
+        """
+        # pyarrow is optional, and imported on first use as it takes longer than the rest of the app
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(f"Exporting to {self.path} requires pyarrow (pip install pyarrow)")
+        if self.append:
+            raise ValueError(f"{type(self).__name__} cannot append to an existing file")
+        columns = [pyarrow.field(name, pyarrow.string()) for name in self.context]
+        columns.append(pyarrow.field("flight_numbers", pyarrow.list_(pyarrow.string())))
+        columns += [pyarrow.field(name, pyarrow.int64()) for name in FlightTable.NUMERIC_COLUMNS]
+        columns += [pyarrow.field(name, pyarrow.string()) for name in ("departure_date", "return_date")]
+        self.schema = pyarrow.schema(columns)
+        self._buffer = FlightTable()
+        self._writer = self._open_file()
+
+    def _open_file(self):
+        """
+        Returns: The pyarrow writer of the output file.
+        """
+        raise NotImplementedError
+
+    def _write_row(self, flight):
+        """
+        Buffers one flight, writing a record batch when the buffer is full.
+        """
+        self._buffer.append(flight)
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Writes the buffered flights as one record batch.
+        """
+        if not len(self._buffer):
+            return
+        import pyarrow
+        size = len(self._buffer)
+        arrays = [pyarrow.array([value] * size, pyarrow.string()) for value in self.context.values()]
+        arrays.append(pyarrow.array([list(numbers) for numbers in self._buffer.column("flight_numbers")],
+                                    pyarrow.list_(pyarrow.string())))
+        for name in FlightTable.NUMERIC_COLUMNS:
+            column = self._buffer.column(name)
+            # MISSING becomes a null
+            arrays.append(pyarrow.array(column, pyarrow.int64(), mask=[value == MISSING for value in column]))
+        for name in ("departure_date", "return_date"):
+            arrays.append(pyarrow.array(self._buffer.column(name), pyarrow.string()))
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self._buffer = FlightTable()
+
+    def close(self):
+        """
+        Writes the last record batch and closes the file.
+        """
+        self._flush()
+        self._writer.close()
+
+
+class ParquetWriter(ArrowBatchWriter):
+    """
+    Writes a Parquet file, one row group per record batch.
+    """
+
+    EXTENSIONS = (".parquet",)
+
+    def _open_file(self):
+        """
+        Returns: pyarrow.parquet.ParquetWriter
+        """
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(self.path, self.schema)
+
+
+class ArrowWriter(ArrowBatchWriter):
+    """
+    Writes an Arrow IPC (Feather v2) file.
+    """
+
+    EXTENSIONS = (".arrow", ".feather")
+
+    def _open_file(self):
+        """
+        Returns: pyarrow.ipc.RecordBatchFileWriter
+        """
+        import pyarrow.ipc
+        return pyarrow.ipc.new_file(self.path, self.schema)
+
+
+register_exporter("csv", CsvWriter)
+register_exporter("jsonl", JsonLinesWriter)
+register_exporter("parquet", ParquetWriter)
+register_exporter("arrow", ArrowWriter)
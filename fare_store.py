@@ -0,0 +1,215 @@
+'''
+This Python file keeps the history of every scraped fare in an embedded
+SQLite database, indexed by route, departure date and scrape time, so
+price trends and the cheapest observed fares are answered from disk
+instead of a fresh scrape.
+
+Classes:
+    FareStore
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import sqlite3
+import threading
+import time
+
+from flight_model import Flight, format_price
+from result_cache import normalize_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fares (
+    depart TEXT NOT NULL,
+    arrive TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    return_date TEXT NOT NULL,
+    scrape_time REAL NOT NULL,
+    flight_numbers TEXT NOT NULL,
+    departure_minutes INTEGER,
+    arrival_minutes INTEGER,
+    duration_minutes INTEGER,
+    stops INTEGER,
+    basic_economy_cents INTEGER,
+    main_cabin_cents INTEGER,
+    first_class_cents INTEGER
+);
+CREATE INDEX IF NOT EXISTS fares_route_date_time ON fares (depart, arrive, departure_date, scrape_time);
+"""
+
+# columns of a flight, in the order of the fares table
+FLIGHT_COLUMNS = ("flight_numbers", "departure_minutes", "arrival_minutes", "duration_minutes", "stops",
+                  "basic_economy_cents", "main_cabin_cents", "first_class_cents")
+
+# cabin name accepted by the queries -> price column
+CABIN_COLUMNS = {
+    "basic_economy": "basic_economy_cents",
+    "main_cabin": "main_cabin_cents",
+    "first_class": "first_class_cents",
+}
+
+
+class FareStore:
+    """
+    A SQLite store of scraped flights. Each flight row carries its route,
+    dates (YYYY-MM-DD, "" for a one-way return) and scrape time. One
+    connection is shared by all threads behind a lock, and it is only
+    opened on first use.
+    """
+
+    def __init__(self, path="fares.db", batch_size=500):
+        """
+        Args:
+            path (str, optional): The database file, or ":memory:". Defaults to "fares.db".
+            batch_size (int, optional): Rows sent to SQLite per executemany call. Defaults to 500.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Returns: sqlite3.Connection: The shared connection, created with the schema on first use.
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    @staticmethod
+    def cabin_column(cabin):
+        """
+        Args: cabin (str): "basic_economy", "main_cabin" or "first_class".
+
+        Returns: str: The price column of the cabin.
+
+        Raises: ValueError: If the cabin is unknown.
+        """
+        if cabin not in CABIN_COLUMNS:
+            raise ValueError(f"Unknown cabin {cabin}, use one of: {', '.join(CABIN_COLUMNS)}")
+        return CABIN_COLUMNS[cabin]
+
+    def record(self, depart, arrive, departure_date, return_date, flights, scrape_time=None):
+        """
+        Stores the flights of one scrape in a single transaction.
+
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            departure_date (str): The departure date (YYYY-MM-DD or MM/DD/YYYY).
+            return_date (str or None): The return date (YYYY-MM-DD or MM/DD/YYYY).
+            flights: A FlightTable, an iterable of Flight records or flight
+                     dictionaries, or a flights dictionary as built by page_scrape.
+            scrape_time (float, optional): When the flights were scraped. Defaults to now.
+
+        Returns: int: The number of flights stored.
+        """
+        if isinstance(flights, dict):
+            flights = flights.values()
+        route = (depart.strip().upper(), arrive.strip().upper(),
+                 normalize_date(departure_date), normalize_date(return_date),
+                 time.time() if scrape_time is None else scrape_time)
+        rows = []
+        for flight in flights:
+            if not isinstance(flight, Flight):
+                flight = Flight.from_dict(flight)
+            rows.append(route + (", ".join(flight.flight_numbers),) +
+                        tuple(getattr(flight, column) for column in FLIGHT_COLUMNS[1:]))
+
+        placeholders = ", ".join("?" * len(rows[0])) if rows else ""
+        with self._lock:
+            connection = self._connect()
+            # one transaction for the whole scrape, rolled back on error
+            with connection:
+                for start in range(0, len(rows), self.batch_size):
+                    connection.executemany(f"INSERT INTO fares VALUES ({placeholders})",
+                                           rows[start:start + self.batch_size])
+        return len(rows)
+
+    def price_history(self, depart, arrive, departure_date, return_date=None, cabin="main_cabin"):
+        """
+        The cheapest fare of a cabin at each scrape of a route and dates,
+        oldest first.
+
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            departure_date (str): The departure date.
+            return_date (str, optional): The return date. Defaults to None (any return date).
+            cabin (str, optional): The cabin. Defaults to "main_cabin".
+
+        Returns: list: One dict per scrape with scrape_time, return_date, min_cents,
+                       min_price (display text) and flights (number of flights with a fare).
+        """
+        column = self.cabin_column(cabin)
+        query = (f"SELECT scrape_time, return_date, MIN({column}) AS min_cents, COUNT(*) AS flights "
+                 f"FROM fares WHERE depart = ? AND arrive = ? AND departure_date = ? AND {column} IS NOT NULL")
+        params = [depart.strip().upper(), arrive.strip().upper(), normalize_date(departure_date)]
+        if return_date is not None:
+            query += " AND return_date = ?"
+            params.append(normalize_date(return_date))
+        query += " GROUP BY scrape_time, return_date ORDER BY scrape_time"
+
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [dict(row, min_price=format_price(row["min_cents"])) for row in rows]
+
+    def cheapest_fare(self, depart, arrive, departure_date=None, cabin="main_cabin", since=None):
+        """
+        The cheapest fare of a cabin ever observed on a route.
+
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            departure_date (str, optional): Only flights leaving that day. Defaults to None (any day).
+            cabin (str, optional): The cabin. Defaults to "main_cabin".
+            since (float, optional): Only scrapes from that time on. Defaults to None (all history).
+
+        Returns: dict or None: The flight (as Flight.to_dict) with its departure_date,
+                               return_date and scrape_time, or None if no fare was seen.
+        """
+        column = self.cabin_column(cabin)
+        query = f"SELECT * FROM fares WHERE depart = ? AND arrive = ? AND {column} IS NOT NULL"
+        params = [depart.strip().upper(), arrive.strip().upper()]
+        if departure_date is not None:
+            query += " AND departure_date = ?"
+            params.append(normalize_date(departure_date))
+        if since is not None:
+            query += " AND scrape_time >= ?"
+            params.append(since)
+        query += f" ORDER BY {column}, scrape_time DESC LIMIT 1"
+
+        with self._lock:
+            row = self._connect().execute(query, params).fetchone()
+        if row is None:
+            return None
+        flight = Flight(row["flight_numbers"].split(", "),
+                        *(row[column] for column in FLIGHT_COLUMNS[1:4]),
+                        basic_economy_cents=row["basic_economy_cents"],
+                        main_cabin_cents=row["main_cabin_cents"],
+                        first_class_cents=row["first_class_cents"],
+                        departure_date=row["departure_date"],
+                        return_date=row["return_date"] or None,
+                        stops=row["stops"])
+        return dict(flight.to_dict(), scrape_time=row["scrape_time"])
+
+    def stats(self):
+        """
+        Returns: dict: The number of stored flights, scrapes and routes.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT depart || arrive || departure_date || scrape_time), "
+                "COUNT(DISTINCT depart || '-' || arrive) FROM fares").fetchone()
+        return {"flights": row[0], "scrapes": row[1], "routes": row[2]}
+
+    def close(self):
+        """
+        Closes the database connection, it is reopened on next use.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
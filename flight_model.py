@@ -0,0 +1,367 @@
+'''
+This Python file holds the typed flight model: the text scraped from the
+website ("6:00 AM", "5h 5m", "$1,129", "N/A") is parsed once into numbers,
+stored in a compact Flight record, and collected in a columnar FlightTable
+that sorts and filters without building a dictionary per row.
+
+Functions:
+    parse_time
+    parse_duration
+    parse_price
+    format_time
+    format_duration
+    format_price
+
+Classes:
+    Flight
+    FlightTable
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import re
+from array import array
+
+# stored in integer columns in place of a missing value (e.g. "N/A" price)
+MISSING = -1
+
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*([AaPp][Mm])?")
+DURATION_PATTERN = re.compile(r"(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?", re.IGNORECASE)
+PRICE_PATTERN = re.compile(r"(\d[\d,]*)(?:\.(\d{1,2}))?")
+
+
+def parse_time(text):
+    """
+    Parses a clock time such as "6:00 AM", "11:59 pm" or "18:05".
+
+    Args: text (str): The time shown on a flight card.
+
+    Returns: int or None: Minutes since midnight, or None if there is no time.
+    """
+    match = TIME_PATTERN.search(text or "")
+    if match is None:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        hours = hours % 12 + (12 if meridiem.upper() == "PM" else 0)
+    return hours * 60 + minutes
+
+
+def parse_duration(text):
+    """
+    Parses a flight duration such as "5h 5m", "45m" or "12h".
+
+    Args: text (str): The duration shown on a flight card.
+
+    Returns: int or None: The duration in minutes, or None if there is no duration.
+    """
+    match = DURATION_PATTERN.search((text or "").strip())
+    if match is None or not any(match.groups()):
+        return None
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def parse_price(text):
+    """
+    Parses a fare such as "$1,129", "$179.50" or "N/A".
+
+    Args: text (str): The price shown on a flight card.
+
+    Returns: int or None: The price in cents, or None if the fare is not available.
+    """
+    match = PRICE_PATTERN.search(text or "")
+    if match is None:
+        return None
+    dollars = int(match.group(1).replace(",", ""))
+    cents = int((match.group(2) or "0").ljust(2, "0"))
+    return dollars * 100 + cents
+
+
+def format_time(minutes):
+    """
+    Args: minutes (int or None): Minutes since midnight.
+
+    Returns: str: The time as "6:00 AM", or "N/A".
+    """
+    if minutes is None:
+        return "N/A"
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    return f"{(hours - 1) % 12 + 1}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def format_duration(minutes):
+    """
+    Args: minutes (int or None): A duration in minutes.
+
+    Returns: str: The duration as "5h 5m", or "N/A".
+    """
+    if minutes is None:
+        return "N/A"
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def format_price(cents):
+    """
+    Args: cents (int or None): A price in cents.
+
+    Returns: str: The price as "$1,129" (or "$179.50"), or "N/A".
+    """
+    if cents is None:
+        return "N/A"
+    dollars, cents = divmod(cents, 100)
+    return f"${dollars:,}" if cents == 0 else f"${dollars:,}.{cents:02d}"
+
+
+class Flight:
+    """
+    One flight with parsed numeric fields. Times are minutes since midnight,
+    durations are minutes, prices are cents, and missing values are None.
+    """
+
+    __slots__ = ("flight_numbers", "departure_minutes", "arrival_minutes", "duration_minutes",
+                 "basic_economy_cents", "main_cabin_cents", "first_class_cents",
+                 "departure_date", "return_date", "stops")
+
+    # (price attribute, name shown to users) of each cabin
+    CABINS = (
+        ("basic_economy_cents", "Basic Economy"),
+        ("main_cabin_cents", "Main Cabin"),
+        ("first_class_cents", "First Class"),
+    )
+
+    def __init__(self, flight_numbers, departure_minutes, arrival_minutes, duration_minutes,
+                 basic_economy_cents=None, main_cabin_cents=None, first_class_cents=None,
+                 departure_date=None, return_date=None, stops=None):
+        """
+        Args:
+            flight_numbers (tuple): The flight numbers (more than one for connections).
+            departure_minutes (int): Departure time in minutes since midnight.
+            arrival_minutes (int): Arrival time in minutes since midnight.
+            duration_minutes (int): Duration in minutes.
+            basic_economy_cents (int, optional): Basic economy fare in cents.
+            main_cabin_cents (int, optional): Main cabin fare in cents.
+            first_class_cents (int, optional): First class fare in cents.
+            departure_date (str, optional): Departure date, for batch (multi-date) results.
+            return_date (str, optional): Return date, for batch (multi-date) results.
+            stops (int, optional): Number of stops. Defaults to one less than the number of flight numbers.
+        """
+        self.flight_numbers = tuple(flight_numbers)
+        self.departure_minutes = departure_minutes
+        self.arrival_minutes = arrival_minutes
+        self.duration_minutes = duration_minutes
+        self.basic_economy_cents = basic_economy_cents
+        self.main_cabin_cents = main_cabin_cents
+        self.first_class_cents = first_class_cents
+        self.departure_date = departure_date
+        self.return_date = return_date
+        if stops is None:
+            stops = max(len(self.flight_numbers) - 1, 0)
+        self.stops = stops
+
+    @property
+    def fare_classes(self):
+        """
+        Returns: list: The names of the cabins with an available fare.
+        """
+        return [name for attribute, name in Flight.CABINS if getattr(self, attribute) is not None]
+
+    @classmethod
+    def from_dict(cls, flight):
+        """
+        Parses one flight of the dictionary built by FlightsData.page_scrape.
+
+        Args: flight (dict): The scraped flight.
+
+        Returns: Flight
+        """
+        return cls(flight.get("flight_numbers", ()),
+                   parse_time(flight.get("departure_time")),
+                   parse_time(flight.get("arrival_time")),
+                   parse_duration(flight.get("duration")),
+                   parse_price(flight.get("basic_economy_price")),
+                   parse_price(flight.get("main_cabin_price")),
+                   parse_price(flight.get("first_class_price")),
+                   flight.get("departure_date"),
+                   flight.get("return_date"),
+                   flight.get("stops"))
+
+    def to_dict(self):
+        """
+        Returns: dict: The flight in the scraped (display text) format.
+        """
+        flight = {
+            "flight_numbers": list(self.flight_numbers),
+            "departure_time": format_time(self.departure_minutes),
+            "arrival_time": format_time(self.arrival_minutes),
+            "duration": format_duration(self.duration_minutes),
+            "stops": self.stops,
+            "basic_economy_price": format_price(self.basic_economy_cents),
+            "main_cabin_price": format_price(self.main_cabin_cents),
+            "first_class_price": format_price(self.first_class_cents),
+            "fare_classes": self.fare_classes,
+        }
+        if self.departure_date is not None:
+            flight["departure_date"] = self.departure_date
+            flight["return_date"] = self.return_date
+        return flight
+
+    def __eq__(self, other):
+        """
+        Flights are equal when every field is equal.
+        """
+        if not isinstance(other, Flight):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in Flight.__slots__)
+
+    def __repr__(self):
+        """
+        Returns: str: A short description of the flight, for debugging.
+        """
+        return (f"Flight({'/'.join(self.flight_numbers)}, {format_time(self.departure_minutes)}"
+                f"-{format_time(self.arrival_minutes)}, {format_price(self.main_cabin_cents)})")
+
+
+class FlightTable:
+    """
+    A columnar collection of flights: each numeric field is one compact
+    integer array (MISSING marks a missing value), so sorting and filtering
+    only touch the columns involved and never build a dict per row.
+    """
+
+    # numeric columns, each stored in an array of signed 64-bit integers
+    NUMERIC_COLUMNS = ("departure_minutes", "arrival_minutes", "duration_minutes",
+                       "basic_economy_cents", "main_cabin_cents", "first_class_cents", "stops")
+    # other columns, stored in plain lists
+    OBJECT_COLUMNS = ("flight_numbers", "departure_date", "return_date")
+
+    def __init__(self, flights=()):
+        """
+        Args: flights (iterable, optional): Flight records to store. Defaults to none.
+        """
+        self._columns = {name: array("q") for name in self.NUMERIC_COLUMNS}
+        self._columns.update({name: [] for name in self.OBJECT_COLUMNS})
+        for flight in flights:
+            self.append(flight)
+
+    @classmethod
+    def from_flights_dict(cls, flights_dict):
+        """
+        Args: flights_dict (dict): Flights as built by FlightsData.page_scrape.
+
+        Returns: FlightTable
+        """
+        return cls(Flight.from_dict(flight) for flight in flights_dict.values())
+
+    def to_flights_dict(self):
+        """
+        Returns: dict: The flights in the page_scrape format, numbered from 1.
+        """
+        return {index: flight.to_dict() for index, flight in enumerate(self, start=1)}
+
+    def append(self, flight):
+        """
+        Adds a flight at the end of the table.
+
+        Args: flight (Flight): The flight to add.
+        """
+        for name in self.NUMERIC_COLUMNS:
+            value = getattr(flight, name)
+            self._columns[name].append(MISSING if value is None else value)
+        for name in self.OBJECT_COLUMNS:
+            self._columns[name].append(getattr(flight, name))
+
+    def extend(self, flights):
+        """
+        Args: flights (iterable): Flight records to add at the end of the table.
+        """
+        for flight in flights:
+            self.append(flight)
+
+    def column(self, name):
+        """
+        Args: name (str): A column name (a Flight attribute).
+
+        Returns: array or list: The column itself (MISSING marks missing numbers).
+        """
+        return self._columns[name]
+
+    def __len__(self):
+        """
+        Returns: int: The number of flights.
+        """
+        return len(self._columns["flight_numbers"])
+
+    def __getitem__(self, index):
+        """
+        Returns: Flight: The flight at a row index.
+        """
+        values = {}
+        for name in self.NUMERIC_COLUMNS:
+            value = self._columns[name][index]
+            values[name] = None if value == MISSING else value
+        for name in self.OBJECT_COLUMNS:
+            values[name] = self._columns[name][index]
+        return Flight(**values)
+
+    def __iter__(self):
+        """
+        Yields: Flight: Each flight, in table order.
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, indices):
+        """
+        Builds a new table from some rows, column by column.
+
+        Args: indices (iterable): Row indices, in the order wanted.
+
+        Returns: FlightTable
+        """
+        indices = list(indices)
+        table = FlightTable()
+        for name in self.NUMERIC_COLUMNS:
+            column = self._columns[name]
+            table._columns[name] = array("q", (column[i] for i in indices))
+        for name in self.OBJECT_COLUMNS:
+            column = self._columns[name]
+            table._columns[name] = [column[i] for i in indices]
+        return table
+
+    def sort_by(self, name, reverse=False):
+        """
+        Sorts the flights by one column. Missing values always come last.
+
+        Args:
+            name (str): The column to sort by.
+            reverse (bool, optional): Sort in descending order. Defaults to False.
+
+        Returns: FlightTable: A new, sorted table.
+        """
+        column = self._columns[name]
+        present = [i for i in range(len(column)) if column[i] not in (MISSING, None)]
+        missing = [i for i in range(len(column)) if column[i] in (MISSING, None)]
+        present.sort(key=column.__getitem__, reverse=reverse)
+        return self.take(present + missing)
+
+    def filter(self, name, low=None, high=None):
+        """
+        Keeps the flights whose numeric column is within [low, high].
+        Flights missing that value are dropped when a bound is given.
+
+        Args:
+            name (str): A numeric column.
+            low (int, optional): Smallest value kept. Defaults to None (no lower bound).
+            high (int, optional): Largest value kept. Defaults to None (no upper bound).
+
+        Returns: FlightTable: A new table with the matching flights.
+        """
+        if low is None and high is None:
+            return self.take(range(len(self)))
+        column = self._columns[name]
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        return self.take(i for i in range(len(column))
+                         if column[i] != MISSING and low <= column[i] <= high)
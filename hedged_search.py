@@ -0,0 +1,203 @@
+'''
+This Python file bounds the tail latency of scrapes. Each search gets one
+deadline budget shared by all its attempts; a transient failure (a
+WebDriver error or a timeout) is retried with exponential backoff while
+budget is left; and an attempt still running past a percentile of the
+recent scrape latencies is hedged with a second attempt, the first one to
+finish wins and the other is cancelled.
+
+Classes:
+    LatencyTracker
+    HedgedSearch
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from selenium.common.exceptions import WebDriverException
+
+
+class LatencyTracker:
+    """
+    The latencies of the most recent successful scrapes, for percentiles.
+    """
+
+    def __init__(self, window=200):
+        """
+        Args: window (int, optional): Number of latencies kept. Defaults to 200.
+        """
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Adds the latency of a scrape.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, fraction):
+        """
+        Args: fraction (float): The percentile as a fraction, e.g. 0.95.
+
+        Returns: float or None: The latency below which that fraction of the
+                 recent scrapes finished (nearest rank), or None without any.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[max(math.ceil(fraction * len(latencies)) - 1, 0)]
+
+    def __len__(self):
+        """
+        Returns: int: The number of latencies kept.
+        """
+        with self._lock:
+            return len(self._latencies)
+
+
+class HedgedSearch:
+    """
+    Runs FlightsData searches within a deadline, with backoff retries and
+    optional hedging. Attempts run on worker threads; a hedge needs a second
+    driver from the pool and goes through the rate limiter like any search.
+    """
+
+    # failures worth another attempt, anything else is raised at once
+    TRANSIENT_ERRORS = (WebDriverException, TimeoutError)
+
+    def __init__(self, deadline=None, retries=1, backoff=2.0, hedge_percentile=None, min_samples=20,
+                 max_workers=8, window=200):
+        """
+        Args:
+            deadline (float, optional): Seconds a search may take, all attempts included.
+                                        Defaults to None (no deadline).
+            retries (int, optional): Extra attempts after a transient failure. Defaults to 1.
+            backoff (float, optional): Seconds before the first retry, doubled for each retry. Defaults to 2.
+            hedge_percentile (float, optional): Start a second attempt when the first runs longer than
+                                                this percentile of recent latencies (e.g. 0.95).
+                                                Defaults to None (no hedging).
+            min_samples (int, optional): Latencies needed before hedging starts. Defaults to 20.
+            max_workers (int, optional): Attempts running at the same time, across searches. Defaults to 8.
+            window (int, optional): Recent latencies the percentile is computed on. Defaults to 200.
+        """
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-attempt")
+
+    def hedge_delay(self):
+        """
+        Returns: float or None: Seconds after which an attempt is hedged, or None
+                 when hedging is off or too few latencies were recorded.
+        """
+        if self.hedge_percentile is None or len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def run(self, make_attempt):
+        """
+        Runs one search.
+
+        Args:
+            make_attempt (callable): Called with (deadline, hedge): the seconds left for the
+                                     attempt (None without deadline) and whether it is a hedge;
+                                     returns a new FlightsData whose search() is run.
+
+        Returns: FlightsData: The attempt that succeeded, its flights in flights_dict.
+
+        Raises: The error of the last attempt, or TimeoutError when the deadline passed.
+        """
+        deadline_at = None if self.deadline is None else time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            try:
+                return self._hedged_attempt(make_attempt, deadline_at)
+            except self.TRANSIENT_ERRORS as e:
+                delay = self.backoff * 2 ** attempt
+                if attempt == self.retries or (deadline_at is not None and
+                                               time.monotonic() + delay >= deadline_at):
+                    raise
+                logging.warning(f"Search attempt {attempt + 1} failed, retrying in {delay} seconds: {e}")
+                with self._lock:
+                    self.retried += 1
+                time.sleep(delay)
+
+    def _hedged_attempt(self, make_attempt, deadline_at):
+        """
+        Runs one attempt, hedged with a second one once it is slower than the
+        hedge delay, and returns the first to succeed.
+        """
+        started = time.monotonic()
+        primary = make_attempt(self._time_left(deadline_at), False)
+        attempts = {self._executor.submit(primary.search): primary}
+
+        delay = self.hedge_delay()
+        if delay is not None:
+            left = self._time_left(deadline_at)
+            done, _ = wait(attempts, timeout=delay if left is None else min(delay, left))
+            if not done and (deadline_at is None or time.monotonic() < deadline_at):
+                hedge = make_attempt(self._time_left(deadline_at), True)
+                attempts[self._executor.submit(hedge.search)] = hedge
+                with self._lock:
+                    self.hedged += 1
+                logging.info(f"Search slower than {delay:.1f} seconds, started a hedged attempt")
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=self._time_left(deadline_at), return_when=FIRST_COMPLETED)
+            if not done:
+                error = TimeoutError(f"Search exceeded its {self.deadline} second deadline")
+                break
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None:
+                for future in pending:
+                    attempts[future].cancel()
+                self.latencies.record(time.monotonic() - started)
+                if attempts[winner] is not primary:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return attempts[winner]
+            error = next(iter(done)).exception()
+
+        for future in pending:
+            attempts[future].cancel()
+        raise error
+
+    @staticmethod
+    def _time_left(deadline_at):
+        """
+        Returns: float or None: Seconds left before deadline_at (at least 0), or None without deadline.
+        """
+        return None if deadline_at is None else max(deadline_at - time.monotonic(), 0)
+
+    def stats(self):
+        """
+        Returns: dict: Retries, hedged attempts and hedges that won, and the current hedge delay.
+        """
+        with self._lock:
+            return {"retried": self.retried, "hedged": self.hedged, "hedge_wins": self.hedge_wins,
+                    "hedge_delay": self.hedge_delay()}
+
+    def shutdown(self, wait=False):
+        """
+        Stops the worker threads.
+
+        Args: wait (bool, optional): Wait for running attempts to finish. Defaults to False.
+        """
+        self._executor.shutdown(wait=wait)
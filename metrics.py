@@ -0,0 +1,252 @@
+'''
+This Python file holds a small metrics registry: counters, histograms and
+gauges with labels, rendered in the Prometheus text exposition format for
+the /metrics endpoint. It has no dependency, so the app runs without a
+Prometheus client library.
+
+Classes:
+    Counter
+    Histogram
+    Gauge
+    CounterFunc
+    MetricsRegistry
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# default histogram buckets in seconds, from a fast cached search to a slow scrape
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def format_labels(names, values, extra=()):
+    """
+    Returns: str: Labels written as {name="value",...}, or "" without labels.
+    """
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    """
+    Returns: str: A sample value as Prometheus expects it.
+    """
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count, one per combination of label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        """
+        Args:
+            name (str): The metric name.
+            help_text (str): The description shown in the exposition.
+            labelnames (tuple, optional): Names of the labels. Defaults to none.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Adds to the count of the given label values.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Returns: The current count of the given label values.
+        """
+        with self._lock:
+            return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        """
+        Returns: list: (suffix, labels, value) of every sample.
+        """
+        with self._lock:
+            return [("", format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    Observations counted in cumulative buckets, with their sum and count,
+    one set per combination of label values.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): The metric name.
+            help_text (str): The description shown in the exposition.
+            labelnames (tuple, optional): Names of the labels. Defaults to none.
+            buckets (tuple, optional): Upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Records one observation for the given label values.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager observing the seconds spent in its block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        """
+        Returns: int: The number of observations of the given label values.
+        """
+        with self._lock:
+            state = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+            return state[2] if state else 0
+
+    def samples(self):
+        """
+        Returns: list: (suffix, labels, value) of every sample.
+        """
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = format_labels(self.labelnames, key, [("le", format_value(bound))])
+                    samples.append(("_bucket", labels, cumulative))
+                samples.append(("_sum", format_labels(self.labelnames, key), total))
+                samples.append(("_count", format_labels(self.labelnames, key), count))
+        return samples
+
+
+class Gauge:
+    """
+    A value read when the metrics are rendered, e.g. the size of a pool.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func, labelnames=()):
+        """
+        Args:
+            name (str): The metric name.
+            help_text (str): The description shown in the exposition.
+            func (callable): Returns the value, or with labels a dict {label values tuple: value}.
+            labelnames (tuple, optional): Names of the labels. Defaults to none.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._func = func
+
+    def samples(self):
+        """
+        Returns: list: (suffix, labels, value) of every sample.
+        """
+        value = self._func()
+        if not self.labelnames:
+            return [("", "", value)]
+        return [("", format_labels(self.labelnames, key), item) for key, item in sorted(value.items())]
+
+
+class CounterFunc(Gauge):
+    """
+    A count kept by another object (e.g. the coalesced calls of SingleFlight),
+    read when the metrics are rendered and exposed as a counter.
+    """
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    """
+    The metrics of a process, rendered together by render().
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        """
+        Registers a metric, or returns the one already registered under its name.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        """
+        Returns: Counter: A new (or the existing) counter.
+        """
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Returns: Histogram: A new (or the existing) histogram.
+        """
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, func, labelnames=()):
+        """
+        Returns: Gauge: A new (or the existing) gauge.
+        """
+        return self._register(Gauge(name, help_text, func, labelnames))
+
+    def counter_func(self, name, help_text, func, labelnames=()):
+        """
+        Returns: CounterFunc: A new (or the existing) counter read from func.
+        """
+        return self._register(CounterFunc(name, help_text, func, labelnames))
+
+    def render(self):
+        """
+        Returns: str: Every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+'''
+This Python file is the network-capture extraction backend of the scraper:
+the results page loads its flights over XHR before rendering them, so
+instead of reading the rendered cards, the results payload is taken from
+Chrome's performance log (Network.responseReceived, then the DevTools
+Network.getResponseBody command) and mapped straight into the flights
+dictionary built by page_scrape.
+
+The driver must be started with performance logging
+(FlightsData.setup_driver(capture_network=True)).
+
+The payload is expected to hold one entry per itinerary in `slices`:
+    {"slices": [{"segments": [{"flight": {"carrierCode": "AA", "flightNumber": "2"}}, ...],
+                 "departureDateTime": "2023-05-10T06:00:00.000-04:00",
+                 "arrivalDateTime": "2023-05-10T09:05:00.000-07:00",
+                 "durationInMinutes": 365, "stops": 0,
+                 "pricingDetail": [{"productType": "COACH", "productAvailable": true,
+                                    "perPassengerDisplayTotal": {"amount": 179.0}}, ...]}, ...]}
+
+Functions:
+    results_responses
+    response_payload
+    wait_for_payload
+    flights_from_payload
+    clock_minutes
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import base64
+import json
+import logging
+import math
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from flight_model import Flight
+
+# Path of the XHR returning the flights of a search
+RESULTS_API_PATTERN = "/booking/api/search/itinerary"
+
+# productType of a fare in the payload -> price attribute of a Flight
+PRODUCT_CABINS = {
+    "BASIC_ECONOMY": "basic_economy_cents",
+    "COACH": "main_cabin_cents",
+    "MAIN": "main_cabin_cents",
+    "FIRST": "first_class_cents",
+}
+
+
+def results_responses(log_entries, url_pattern=RESULTS_API_PATTERN):
+    """
+    Finds the responses of the results XHR in performance log entries.
+
+    Args:
+        log_entries (list): Entries of driver.get_log("performance").
+        url_pattern (str, optional): Part of the URL of the results XHR. Defaults to RESULTS_API_PATTERN.
+
+    Returns: list: The DevTools request ids of the matching responses, in order.
+    """
+    request_ids = []
+    for entry in log_entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get("method") != "Network.responseReceived":
+            continue
+        params = message.get("params", {})
+        if url_pattern in params.get("response", {}).get("url", ""):
+            request_ids.append(params["requestId"])
+    return request_ids
+
+
+def response_payload(driver, request_id):
+    """
+    Args:
+        driver (WebDriver): A Chrome driver.
+        request_id (str): The DevTools request id of a response.
+
+    Returns: dict or None: The JSON body of the response, or None if it is not
+             (or no longer) available or is not JSON.
+    """
+    try:
+        response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+    except WebDriverException:
+        # not finished loading yet, or already evicted from Chrome's buffer
+        return None
+    body = response.get("body", "")
+    if response.get("base64Encoded"):
+        body = base64.b64decode(body).decode("utf-8", errors="replace")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def wait_for_payload(driver, timeout, url_pattern=RESULTS_API_PATTERN, poll_frequency=0.5, rendered=None):
+    """
+    Waits for the results XHR and returns its body. Reading the performance
+    log drains it, so the matching request ids are kept between polls until
+    their body can be read.
+
+    Args:
+        driver (WebDriver): A Chrome driver started with performance logging.
+        timeout (float): Seconds to wait for the payload.
+        url_pattern (str, optional): Part of the URL of the results XHR. Defaults to RESULTS_API_PATTERN.
+        poll_frequency (float, optional): Seconds between two reads of the log. Defaults to 0.5.
+        rendered (callable, optional): Called with the driver, true once the results are on the page.
+                                       The results are rendered from the XHR, so if none matched by
+                                       then (e.g. the pattern is out of date), waiting stops.
+                                       Defaults to None (wait for the timeout).
+
+    Returns: dict or None: The latest results payload, or None if none was captured
+             (or the driver has no performance log).
+    """
+    deadline = time.monotonic() + timeout
+    pending = []
+    while True:
+        try:
+            pending += results_responses(driver.get_log("performance"), url_pattern)
+        except (WebDriverException, AttributeError) as e:
+            logging.warning(f"No performance log to capture the results from: {e}")
+            return None
+        # the latest response is the most complete (e.g. after a filter or a reload)
+        for request_id in reversed(pending):
+            payload = response_payload(driver, request_id)
+            if payload is not None:
+                return payload
+        if not pending and rendered is not None and rendered(driver):
+            logging.warning(f"Results rendered without a response matching {url_pattern}")
+            return None
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_frequency)
+
+
+def clock_minutes(date_time):
+    """
+    Args: date_time (str): An ISO date time such as "2023-05-10T06:00:00.000-04:00".
+
+    Returns: int: Minutes since midnight, in the local time of the airport.
+    """
+    hours, minutes = date_time.split("T", 1)[1][:5].split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def flights_from_payload(payload):
+    """
+    Maps a results payload to the flights dictionary built by page_scrape.
+    Fares are rounded up to whole dollars, as shown on the flight cards.
+
+    Args: payload (dict): The JSON body of the results XHR.
+
+    Returns: dict: The flights, numbered from 1 in the order of the payload.
+
+    Raises: ValueError: If the payload does not have the expected shape.
+    """
+    flights_dict = {}
+    try:
+        for flight_id, itinerary in enumerate(payload["slices"], start=1):
+            flight_numbers = [f"{segment['flight']['carrierCode']} {segment['flight']['flightNumber']}"
+                              for segment in itinerary["segments"]]
+            cents = {}
+            for fare in itinerary.get("pricingDetail", []):
+                attribute = PRODUCT_CABINS.get(fare.get("productType"))
+                if attribute is None or not fare.get("productAvailable", True):
+                    continue
+                price = math.ceil(float(fare["perPassengerDisplayTotal"]["amount"])) * 100
+                cents[attribute] = min(price, cents.get(attribute, price))
+            flight = Flight(flight_numbers, clock_minutes(itinerary["departureDateTime"]),
+                            clock_minutes(itinerary["arrivalDateTime"]), itinerary.get("durationInMinutes"),
+                            stops=itinerary.get("stops"), **cents)
+            flights_dict[flight_id] = flight.to_dict()
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"Unexpected results payload: {e!r}") from e
+    return flights_dict
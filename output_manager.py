@@ -0,0 +1,172 @@
+'''
+This Python file manages the exported files on disk: each search is written
+to its own path derived from its route and dates, through a temporary file
+renamed into place, so concurrent searches never overwrite each other and a
+reader never sees a half-written file. The directory is kept within a size
+and age quota by a background cleanup.
+
+Classes:
+    OutputManager
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import logging
+import os
+import threading
+import time
+
+from exporters import export_flights, get_exporter
+from result_cache import make_cache_key
+
+# temporary files older than this are left over by a crash and removed by cleanup
+STALE_TEMP_SECONDS = 3600
+
+
+class OutputManager:
+    """
+    Writes exported searches under one directory, at paths derived from the
+    search (e.g. JFKtoSFO_2023-05-10_2023-05-15.csv): the same search
+    replaces its previous file, different searches never collide. Files
+    older than `max_age` are deleted, then the oldest files until the
+    directory fits in `max_bytes`.
+    """
+
+    def __init__(self, directory="exports", max_bytes=None, max_age=None, cleanup_interval=300):
+        """
+        Args:
+            directory (str, optional): The output directory, created on the first export. Defaults to "exports".
+            max_bytes (int, optional): Maximum total size of the files. Defaults to None (no limit).
+            max_age (float, optional): Seconds a file is kept. Defaults to None (no limit).
+            cleanup_interval (float, optional): Seconds between background cleanups. Defaults to 300.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.cleanup_interval = cleanup_interval
+        self.removed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def path_for(self, depart, arrive, departure_date, return_date=None, file_format="csv"):
+        """
+        Args:
+            depart (str): The departure airport.
+            arrive (str): The arrival airport.
+            departure_date (str): The departure date (YYYY-MM-DD or MM/DD/YYYY).
+            return_date (str, optional): The return date. Defaults to None (one way).
+            file_format (str, optional): A format registered in exporters. Defaults to "csv".
+
+        Returns: str: The output path of the search.
+        """
+        depart, arrive, departure_date, return_date, _ = make_cache_key(depart, arrive, departure_date, return_date)
+        dates = f"{departure_date}_{return_date}" if return_date else departure_date
+        # airport codes come from user input, keep only safe characters
+        route = "".join(c for c in f"{depart}to{arrive}" if c.isalnum())
+        extension = get_exporter(file_format).EXTENSIONS[0]
+        return os.path.join(self.directory, f"{route}_{dates}{extension}")
+
+    def export(self, flights, depart, arrive, departure_date, return_date=None, file_format="csv"):
+        """
+        Writes the flights of a search atomically to its path.
+
+        Args:
+            flights: The flights, in any form accepted by exporters.export_flights.
+            depart, arrive, departure_date, return_date, file_format: As in path_for.
+
+        Returns: str: The path written.
+        """
+        path = self.path_for(depart, arrive, departure_date, return_date, file_format)
+        os.makedirs(self.directory, exist_ok=True)
+        export_flights(flights, path, file_format, context={"depart": depart, "arrive": arrive})
+        return path
+
+    def files(self):
+        """
+        Returns: list: (modified time, size, path) of each finished file, oldest first.
+        """
+        files = []
+        if not os.path.isdir(self.directory):
+            return files
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(files)
+
+    def cleanup(self):
+        """
+        Deletes the files past the age quota, then the oldest files until the
+        size quota is met, and temporary files left over by a crash.
+
+        Returns: int: The number of files deleted.
+        """
+        with self._lock:
+            now = time.time()
+            to_remove = []
+            if not os.path.isdir(self.directory):
+                return 0
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith(".") and entry.name.endswith(".tmp") and \
+                        now - entry.stat().st_mtime > STALE_TEMP_SECONDS:
+                    to_remove.append(entry.path)
+
+            files = self.files()
+            if self.max_age is not None:
+                to_remove += [path for mtime, _, path in files if now - mtime > self.max_age]
+                files = [file for file in files if now - file[0] <= self.max_age]
+            if self.max_bytes is not None:
+                total = sum(size for _, size, _ in files)
+                for _, size, path in files:
+                    if total <= self.max_bytes:
+                        break
+                    to_remove.append(path)
+                    total -= size
+
+            removed = 0
+            for path in to_remove:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self.removed += removed
+            return removed
+
+    def start_cleanup(self):
+        """
+        Starts the background thread running cleanup() every cleanup_interval seconds.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._cleanup_loop, name="output-cleanup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background cleanup.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """
+        Returns: dict: The number and total size of the files, and the files deleted so far.
+        """
+        files = self.files()
+        return {"files": len(files), "bytes": sum(size for _, size, _ in files), "removed": self.removed}
+
+    def _cleanup_loop(self):
+        """
+        Runs cleanup() until stop() is called.
+        """
+        while not self._stop.wait(self.cleanup_interval):
+            try:
+                self.cleanup()
+            except OSError as e:
+                logging.warning(f"Output cleanup failed: {e}")
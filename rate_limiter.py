@@ -0,0 +1,58 @@
+'''
+This Python file paces searches against the airline website, so politeness
+delays are applied once per search instead of being slept inside every
+form field and page load.
+
+Classes:
+    RateLimiter
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    A thread-safe limiter that spaces out the start of searches by a minimum
+    interval plus a random jitter (to mimic human pacing).
+    """
+
+    def __init__(self, min_interval=0.0, jitter=0.0):
+        """
+        Initializes the RateLimiter.
+
+        Args:
+            min_interval (float, optional): Minimum seconds between two searches. Defaults to 0.
+            jitter (float, optional): Maximum random seconds added to each interval. Defaults to 0.
+        """
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the caller is allowed to start its search.
+
+        Args: timeout (float, optional): Maximum seconds to wait. Defaults to None (wait for the slot).
+
+        Returns: float: The number of seconds the caller waited.
+
+        Raises: TimeoutError: If the next slot is further away than the timeout
+                (no slot is reserved then).
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if timeout is not None and slot - now > timeout:
+                raise TimeoutError(f"The next search slot is {slot - now:.1f} seconds away")
+            # reserve the slot, so concurrent callers queue up behind each other
+            self._next_slot = slot + self.min_interval + random.uniform(0, self.jitter)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
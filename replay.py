@@ -0,0 +1,389 @@
+'''
+This Python file is the offline backend of the scraper: it records the
+page_source snapshots of live result pages and replays them through a
+WebDriver stand-in, so FlightsData can run its whole search (form fill,
+results wait, scrolling, extraction) without Chrome or the network. It
+also generates synthetic results pages of any size for benchmarks.
+
+Functions:
+    save_snapshots
+    load_snapshots
+    synthetic_card
+    synthetic_page
+    synthetic_results_page
+    clock
+    css_selector
+
+Classes:
+    RecordingDriver
+    ReplayElement
+    ReplayDriver
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import glob
+import os
+import random
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+# file name pattern of the recorded snapshots, in the order they were taken
+SNAPSHOT_PATTERN = "page_{:04d}.html"
+
+
+def save_snapshots(pages, directory):
+    """
+    Saves page sources as numbered HTML files.
+
+    Args:
+        pages (list): The page sources, in order.
+        directory (str): The snapshot directory, created if needed.
+
+    Returns: list: The paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for number, page in enumerate(pages, start=1):
+        path = os.path.join(directory, SNAPSHOT_PATTERN.format(number))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(page)
+        paths.append(path)
+    return paths
+
+
+def load_snapshots(directory):
+    """
+    Args: directory (str): A directory written by save_snapshots or RecordingDriver.
+
+    Returns: list: The page sources, in the order they were recorded.
+
+    Raises: FileNotFoundError: If the directory holds no snapshot.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "page_*.html")))
+    if not paths:
+        raise FileNotFoundError(f"No recorded page in {directory}")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            pages.append(file.read())
+    return pages
+
+
+def synthetic_card(flight_numbers, departure_time, arrival_time, duration, prices):
+    """
+    Builds the HTML of one flight card with the markup of the American Airlines results grid.
+
+    Args:
+        flight_numbers (list): The flight numbers.
+        departure_time, arrival_time, duration (str): As shown on the card.
+        prices (list): The fares shown on the card (2 or 3).
+
+    Returns: str: The card HTML.
+    """
+    numbers = "".join(f'<span class="connecting-flt-details flight-number">{number}</span>'
+                      for number in flight_numbers)
+    price_spans = "".join(f'<span class="per-pax-amount ng-star-inserted">{price}</span>' for price in prices)
+    return (
+        '<div>'
+        f'<div class="cell large-3 origin"><div class="flt-times-sm"> {departure_time} </div></div>'
+        f'<div class="cell large-3 destination"><div class="flt-times-sm">{arrival_time}</div></div>'
+        f'<div class="cell large-4 pad-left-sm"><div class="duration">{duration}</div></div>'
+        f'{numbers}'
+        f'<app-choose-flights-price-desktop>{price_spans}</app-choose-flights-price-desktop>'
+        '</div>'
+    )
+
+
+def synthetic_page(cards):
+    """
+    Builds a results page with the markup of the American Airlines results grid.
+
+    Args: cards (list): The HTML of the flight cards, see synthetic_card.
+
+    Returns: str: The page HTML.
+    """
+    return (
+        '<html><body><div id="aa-content"><div><app-results-grid-desktop><div><virtual-scroller>'
+        '<div class="scrollable-content"><div class="results-grid-container">'
+        + "".join(cards) +
+        '</div></div></virtual-scroller></div></app-results-grid-desktop></div></div></body></html>'
+    )
+
+
+def synthetic_results_page(count, seed=0):
+    """
+    Builds a results page with `count` random but reproducible flight cards,
+    one or two legs each, with two or three fares.
+
+    Args:
+        count (int): Number of flight cards.
+        seed (int, optional): Seed of the random flights. Defaults to 0.
+
+    Returns: str: The page HTML.
+    """
+    rng = random.Random(seed)
+    cards = []
+    for _ in range(count):
+        legs = rng.choice((1, 1, 2))
+        numbers = [f"AA {rng.randint(1, 2999)}" for _ in range(legs)]
+        departure = rng.randint(5 * 60, 22 * 60)
+        duration = rng.randint(60, 12 * 60)
+        arrival = (departure + duration) % (24 * 60)
+        main_cabin = rng.randint(90, 900)
+        prices = [f"${main_cabin:,}", f"${main_cabin * 3:,}"]
+        if rng.random() < 0.7:
+            prices.insert(0, f"${main_cabin - rng.randint(20, 60):,}")
+        cards.append(synthetic_card(numbers, clock(departure), clock(arrival),
+                                    f"{duration // 60}h {duration % 60}m", prices))
+    return synthetic_page(cards)
+
+
+def clock(minutes):
+    """
+    Returns: str: Minutes since midnight written as on the website, e.g. "6:05 PM".
+    """
+    hours, minutes = divmod(minutes, 60)
+    return f"{(hours - 1) % 12 + 1}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+class RecordingDriver:
+    """
+    Wraps a live WebDriver and saves every new page_source it returns, so a
+    search can be replayed later with ReplayDriver. Everything else is
+    passed through to the wrapped driver.
+    """
+
+    def __init__(self, driver, directory):
+        """
+        Args:
+            driver (WebDriver): The live driver.
+            directory (str): Where the snapshots are saved (created if needed).
+        """
+        self._driver = driver
+        self._directory = directory
+        self._last_page = None
+        self.recorded = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def page_source(self):
+        """
+        Returns: str: The live page source, saved when it changed since the last snapshot.
+        """
+        page = self._driver.page_source
+        if page != self._last_page:
+            self._last_page = page
+            self.recorded += 1
+            path = os.path.join(self._directory, SNAPSHOT_PATTERN.format(self.recorded))
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(page)
+        return page
+
+    def __getattr__(self, name):
+        """
+        Delegates every other attribute to the wrapped driver.
+        """
+        return getattr(self._driver, name)
+
+
+class ReplayElement:
+    """
+    A WebElement stand-in backed by a parsed HTML tag. It answers the
+    lookups used by FlightsData, and accepts (and remembers) form input.
+    """
+
+    def __init__(self, tag, driver):
+        """
+        Args:
+            tag (Tag): The BeautifulSoup tag of the element.
+            driver (ReplayDriver): The driver the element belongs to.
+        """
+        self._tag = tag
+        self._driver = driver
+
+    @property
+    def text(self):
+        """
+        Returns: str: The text of the element, whitespace collapsed like WebDriver.
+        """
+        return " ".join(self._tag.get_text(" ").split())
+
+    def find_element(self, by=By.ID, value=None):
+        """
+        Returns: ReplayElement: The first matching descendant.
+
+        Raises: NoSuchElementException: If nothing matches.
+        """
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element matches {by}={value}")
+        return elements[0]
+
+    def find_elements(self, by=By.ID, value=None):
+        """
+        Returns: list: The matching descendants.
+        """
+        return [ReplayElement(tag, self._driver) for tag in self._tag.select(css_selector(by, value))]
+
+    def get_attribute(self, name):
+        """
+        Returns: str or None: The attribute value (class lists are joined with spaces).
+        """
+        value = self._tag.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+    def is_displayed(self):
+        """
+        Returns: bool: Always True, recorded pages have no layout.
+        """
+        return True
+
+    def is_enabled(self):
+        """
+        Returns: bool: Always True.
+        """
+        return True
+
+    def click(self):
+        """
+        Clicking has no effect on a recorded page.
+        """
+
+    def clear(self):
+        """
+        Clears the value typed into the element.
+        """
+        self._driver.form_values[self._tag.get("id")] = ""
+
+    def send_keys(self, *values):
+        """
+        Types into the element, the value is kept in the driver's form_values.
+        """
+        element_id = self._tag.get("id")
+        self._driver.form_values[element_id] = self._driver.form_values.get(element_id, "") + "".join(values)
+
+
+def css_selector(by, value):
+    """
+    Converts a Selenium locator to a CSS selector.
+
+    Returns: str
+    """
+    if by == By.CSS_SELECTOR:
+        return value
+    if by == By.ID:
+        return f'[id="{value}"]'
+    if by == By.CLASS_NAME:
+        return f".{value}"
+    if by == By.TAG_NAME:
+        return value
+    raise ValueError(f"ReplayDriver does not support locating by {by}")
+
+
+class ReplayDriver:
+    """
+    A WebDriver stand-in serving recorded page sources. The first page is
+    the results page right after the search; each scroll of the results
+    list (SCROLL_SCRIPT) moves to the next recorded page and reports the end
+    of the list on the last one. Form fields are always found, whatever the
+    page, and the values typed into them are kept in `form_values`.
+    """
+
+    def __init__(self, pages):
+        """
+        Args: pages (list): The page sources, in the order they were recorded.
+        """
+        if not pages:
+            raise ValueError("ReplayDriver needs at least one page")
+        self.pages = list(pages)
+        self.index = 0
+        self.current_url = None
+        self.form_values = {}
+        self.quit_called = False
+        self.page_load_timeout = None
+        self._parsed = {}
+
+    @classmethod
+    def from_directory(cls, directory):
+        """
+        Args: directory (str): A directory of recorded snapshots.
+
+        Returns: ReplayDriver
+        """
+        return cls(load_snapshots(directory))
+
+    @property
+    def page_source(self):
+        """
+        Returns: str: The current recorded page.
+        """
+        return self.pages[self.index]
+
+    def _soup(self):
+        """
+        Returns: BeautifulSoup: The current page, parsed once.
+        """
+        if self.index not in self._parsed:
+            self._parsed[self.index] = BeautifulSoup(self.pages[self.index], "html.parser")
+        return self._parsed[self.index]
+
+    def get(self, url):
+        """
+        "Navigates" to a URL: the replay starts again from the first page.
+        """
+        self.current_url = url
+        self.index = 0
+
+    def find_element(self, by=By.ID, value=None):
+        """
+        Returns: ReplayElement: The first matching element. Form fields
+                 (located by id, or a "#id" CSS selector) are made up when the page has none.
+
+        Raises: NoSuchElementException: If nothing matches.
+        """
+        elements = self.find_elements(by, value)
+        if elements:
+            return elements[0]
+        if by == By.CSS_SELECTOR and value.startswith("#") and " " not in value:
+            by, value = By.ID, value[1:].replace("\\", "")
+        if by == By.ID:
+            tag = BeautifulSoup("<input>", "html.parser").input
+            tag["id"] = value
+            return ReplayElement(tag, self)
+        raise NoSuchElementException(f"No element matches {by}={value}")
+
+    def find_elements(self, by=By.ID, value=None):
+        """
+        Returns: list: The matching elements of the current page.
+        """
+        return [ReplayElement(tag, self) for tag in self._soup().select(css_selector(by, value))]
+
+    def execute_script(self, script, *args):
+        """
+        Runs the scroll script of the results list by moving to the next page.
+
+        Returns: bool or None: For a scroll, True if the last page was already shown.
+        """
+        if "scrollTop" not in script:
+            # e.g. scrollIntoView of a form field
+            return None
+        if self.index == len(self.pages) - 1:
+            return True
+        self.index += 1
+        return False
+
+    def set_page_load_timeout(self, timeout):
+        """
+        Page loads are instant on recorded pages, the timeout is only kept.
+        """
+        self.page_load_timeout = timeout
+
+    def quit(self):
+        """
+        Marks the driver as quit.
+        """
+        self.quit_called = True
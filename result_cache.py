@@ -0,0 +1,231 @@
+'''
+This Python file caches search results by route and dates, so repeated
+searches are answered from memory (or disk) without starting a browser.
+
+Functions:
+    normalize_date
+    make_cache_key
+
+Classes:
+    ResultCache
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# date formats accepted in a cache key (form input and FlightsData input)
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+
+def normalize_date(date):
+    """
+    Converts a date in one of DATE_FORMATS to YYYY-MM-DD.
+
+    Args: date (str or None): The date to normalize.
+
+    Returns: str: The ISO date, or "" when no date is given.
+    """
+    if not date:
+        return ""
+    date = date.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognized date: {date}")
+
+
+def make_cache_key(depart, arrive, departure_date, return_date=None, trip_type="round trip"):
+    """
+    Builds a normalized key for a search, so "jfk" / "2023-05-10" and
+    "JFK" / "05/10/2023" share one cache entry.
+
+    Args:
+        depart (str): The departure airport.
+        arrive (str): The arrival airport.
+        departure_date (str): The departure date.
+        return_date (str, optional): The return date. Defaults to None.
+        trip_type (str, optional): The type of trip. Defaults to "round trip".
+
+    Returns: tuple: The cache key.
+    """
+    return (depart.strip().upper(), arrive.strip().upper(),
+            normalize_date(departure_date), normalize_date(return_date),
+            " ".join(trip_type.lower().split()))
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache with a freshness TTL, bounded by number of
+    entries and (optionally) by the pickled size of the cached values.
+    When a directory is given, entries are also stored on disk and loaded
+    again after a restart.
+    """
+
+    def __init__(self, ttl=900, max_entries=256, max_bytes=None, directory=None):
+        """
+        Args:
+            ttl (float, optional): Seconds a result stays fresh. Defaults to 900.
+            max_entries (int, optional): Maximum number of cached searches. Defaults to 256.
+            max_bytes (int, optional): Maximum total size of the cached values. Defaults to None (no limit).
+            directory (str, optional): Directory for the on-disk backend. Defaults to None (memory only).
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        # key -> (stored_at, size, value), ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_from_disk()
+
+    def get(self, key):
+        """
+        Args: key (tuple): A key from make_cache_key().
+
+        Returns: The cached value, or None on a miss or a stale entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self.expirations += 1
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Caches a value, evicting the least recently used entries if needed.
+
+        Args:
+            key (tuple): A key from make_cache_key().
+            value: A picklable search result.
+        """
+        data = pickle.dumps(value)
+        stored_at = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (stored_at, len(data), value)
+            self._bytes += len(data)
+            if self.directory:
+                self._write_file(key, stored_at, data)
+            self._enforce_bounds()
+
+    def clear(self):
+        """
+        Removes every entry (from memory and disk).
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        """
+        Returns: dict: Hit/miss/eviction/expiration counters and current usage.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _is_fresh(self, stored_at):
+        """
+        Returns: bool: True if an entry stored at `stored_at` is younger than the TTL.
+        """
+        return time.time() - stored_at < self.ttl
+
+    def _enforce_bounds(self):
+        """
+        Evicts least recently used entries until both bounds are respected.
+        """
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        """
+        Drops an entry from memory and disk.
+        """
+        stored_at, size, value = self._entries.pop(key)
+        self._bytes -= size
+        if self.directory:
+            try:
+                os.remove(self._file_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _file_path(self, key):
+        """
+        Returns: str: The on-disk path of an entry.
+        """
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pickle")
+
+    def _write_file(self, key, stored_at, data):
+        """
+        Writes an entry to disk atomically (temporary file, then rename).
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump((key, stored_at, data), file)
+            os.replace(tmp_path, self._file_path(key))
+        except OSError as e:
+            logging.warning(f"Could not write cache entry to disk: {e}")
+
+    def _load_from_disk(self):
+        """
+        Loads the fresh entries left by a previous process, oldest first,
+        and deletes the stale or unreadable ones.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                path = os.path.join(self.directory, name)
+                files.append((os.path.getmtime(path), path))
+
+        for _, path in sorted(files):
+            try:
+                with open(path, "rb") as file:
+                    key, stored_at, data = pickle.load(file)
+                value = pickle.loads(data)
+            except Exception as e:
+                logging.warning(f"Dropping unreadable cache file {path}: {e}")
+                os.remove(path)
+                continue
+            if not self._is_fresh(stored_at):
+                os.remove(path)
+                continue
+            self._entries[key] = (stored_at, len(data), value)
+            self._bytes += len(data)
+        self._enforce_bounds()
@@ -0,0 +1,215 @@
+'''
+This Python file runs flight searches as background jobs, so a web request
+only enqueues a search and returns a job id instead of holding a worker
+for the whole scrape.
+
+Classes:
+    QueueFullError
+    SearchJob
+    SearchJobManager
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(RuntimeError):
+    """
+    Raised when a search is submitted while the job queue is full.
+    """
+
+
+class SearchJob:
+    """
+    The state of one queued flight search.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, params):
+        """
+        Args: params (dict): Keyword arguments for the search function.
+        """
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = SearchJob.QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # progress reported by the search function, e.g. per date of a batch
+        self.progress = {}
+        # (event, data) pairs streamed by the search function, see emit()
+        self.events = []
+        self._events_changed = threading.Condition()
+
+    @property
+    def finished(self):
+        """
+        Returns: bool: True if the job is done or failed.
+        """
+        return self.status in (SearchJob.DONE, SearchJob.FAILED)
+
+    def to_dict(self):
+        """
+        Returns: dict: The job status (without its result) for JSON responses.
+        """
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "error": self.error,
+            "progress": dict(self.progress),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def emit(self, event, data=None):
+        """
+        Records an event of the running search (e.g. a phase or a scraped
+        flight) and wakes up the readers waiting in wait_events().
+
+        Args:
+            event (str): The event name.
+            data (dict, optional): The event data, JSON serializable. Defaults to None.
+        """
+        with self._events_changed:
+            self.events.append((event, data))
+            self._events_changed.notify_all()
+
+    def wait_events(self, start, timeout=None):
+        """
+        Waits until the job has events after `start`. The last event of a
+        job is a "status" event reporting it done or failed.
+
+        Args:
+            start (int): Number of events the reader has already seen.
+            timeout (float, optional): Maximum seconds to wait. Defaults to None (no limit).
+
+        Returns: list: The new (event, data) pairs, empty if the wait timed out.
+        """
+        with self._events_changed:
+            self._events_changed.wait_for(lambda: len(self.events) > start, timeout)
+            return self.events[start:]
+
+
+class SearchJobManager:
+    """
+    Runs searches on a bounded pool of worker threads. Waiting jobs are
+    limited by `max_queue` and finished jobs are forgotten after `job_ttl` seconds.
+    """
+
+    def __init__(self, search_func, max_workers=2, max_queue=20, job_ttl=600, report_progress=False,
+                 stream_events=False):
+        """
+        Args:
+            search_func (callable): Runs one search, called with a job's params as keyword arguments.
+            max_workers (int, optional): Searches running at the same time. Defaults to 2.
+            max_queue (int, optional): Searches allowed to wait for a worker. Defaults to 20.
+            job_ttl (float, optional): Seconds a finished job is kept. Defaults to 600.
+            report_progress (bool, optional): Pass the job's progress dictionary to the search
+                                              function as a `progress` keyword argument. Defaults to False.
+            stream_events (bool, optional): Pass the job's emit() method to the search function
+                                            as an `on_event` keyword argument. Defaults to False.
+        """
+        self._search_func = search_func
+        self.report_progress = report_progress
+        self.stream_events = stream_events
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-job")
+
+    def submit(self, **params):
+        """
+        Enqueues a search.
+
+        Args: **params: Keyword arguments for the search function.
+
+        Returns: SearchJob: The new job.
+
+        Raises: QueueFullError: If `max_queue` jobs are already waiting.
+        """
+        self.purge_expired()
+        job = SearchJob(params)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == SearchJob.QUEUED)
+            if queued >= self.max_queue:
+                raise QueueFullError(f"Too many searches waiting ({queued}), please try again later.")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """
+        Args: job_id (str): The id returned by submit().
+
+        Returns: SearchJob or None if the job is unknown or expired.
+        """
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def purge_expired(self):
+        """
+        Forgets finished jobs older than the TTL.
+        """
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self):
+        """
+        Returns: dict: The number of known jobs in each status.
+        """
+        with self._lock:
+            counts = {status: 0 for status in (SearchJob.QUEUED, SearchJob.RUNNING, SearchJob.DONE, SearchJob.FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait=False):
+        """
+        Stops the workers. Jobs still waiting in the queue are cancelled.
+
+        Args: wait (bool, optional): Wait for running searches to finish. Defaults to False.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job):
+        """
+        Runs one job on a worker thread and records its outcome.
+        """
+        job.status = SearchJob.RUNNING
+        job.started_at = time.time()
+        job.emit("status", job.to_dict())
+        kwargs = dict(job.params)
+        if self.report_progress:
+            kwargs["progress"] = job.progress
+        if self.stream_events:
+            kwargs["on_event"] = job.emit
+        try:
+            job.result = self._search_func(**kwargs)
+            job.status = SearchJob.DONE
+        except Exception as e:
+            logging.error(e, exc_info=True)
+            job.error = str(e)
+            job.status = SearchJob.FAILED
+        finally:
+            job.finished_at = time.time()
+            job.emit("status", job.to_dict())
@@ -0,0 +1,92 @@
+'''
+This Python file coalesces identical concurrent searches: while a search
+for a key is running, callers asking for the same key wait for it and
+share its result instead of starting their own browser.
+
+Classes:
+    SingleFlight
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+
+import threading
+
+
+class _Call:
+    """
+    One in-flight call and the callers waiting on it.
+    """
+
+    def __init__(self):
+        """
+        Initializes a call that has not finished yet.
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    A thread-safe request coalescer (similar to Go's singleflight).
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty group of in-flight calls.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        # number of callers that shared another caller's result
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) unless a call for the same key is already
+        running, in which case waits for that call and returns its result.
+
+        Args:
+            key: Hashable key identifying identical calls.
+            func (callable): The function to run.
+
+        Returns: The result of the (shared) call.
+
+        Raises: Whatever the shared call raised, in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            # e.g. KeyboardInterrupt or SystemExit too, followers must not get None as the result
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """
+        Returns: int: The number of distinct keys currently running.
+        """
+        with self._lock:
+            return len(self._calls)
@@ -1,7 +1,7 @@
 """
 This is test app.py using the pytest framework and Flask-Testing extension.
 This test suite includes tests for the read_csv function,
-as well as the GET request to the index route.
+the GET request to the index route, and the search job, stream, batch and fare history routes.
 
 To successful run it, please install packages below:
 pip install blinker
@@ -17,8 +17,9 @@ SEMESTER: 2023 Spring
 
 import os
 import tempfile
+import time
 import pytest
-from app import app, read_csv
+from app import app, read_csv, scrape_flights
 from flask import template_rendered
 from contextlib import contextmanager
 
@@ -93,3 +94,314 @@ def test_index_route(client):
         assert template.name == 'index.html'
         assert context['flight_options'] == []
         assert context['flight_headers'] == []
+
+
+def test_index_post_shows_flights_as_scraped(client, monkeypatch):
+    """
+    Test the search page shows the flights as scraped, unless a sort or filter is posted.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the search.
+    """
+    flights_dict = {
+        1: {"flight_numbers": ["AA 1"], "departure_time": "06:00", "main_cabin_price": "$179"},
+        2: {"flight_numbers": ["AA 2"], "departure_time": "1:10 PM", "main_cabin_price": "$99"},
+    }
+    monkeypatch.setattr("app.search_flights", lambda **params: flights_dict)
+    form = {"departure": "JFK", "arrival": "SFO", "departure_date": "2023-05-10", "return_date": "2023-05-15"}
+    with captured_templates(app) as templates:
+        client.post('/', data=form)
+        client.post('/', data=dict(form, sort="price"))
+    rows = templates[0][1]['flight_options']
+    assert [row[:3] for row in rows] == [[1, "AA 1", "06:00"], [2, "AA 2", "1:10 PM"]]
+    rows = templates[1][1]['flight_options']
+    assert [row[1] for row in rows] == ["AA 2", "AA 1"]
+
+
+# Test the background search job endpoints
+def test_search_job_routes(client, monkeypatch):
+    """
+    Test POST /search enqueues a job and its results can be fetched.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the job manager.
+    """
+    from search_jobs import SearchJobManager
+    flights_dict = {1: {"flight_numbers": ["AA 2", "AA 1441"], "departure_time": "06:00", "arrival_time": "08:05",
+                        "duration": "5h 5m", "main_cabin_price": "$179"}}
+    manager = SearchJobManager(lambda **params: flights_dict)
+    monkeypatch.setattr("app.search_jobs", manager)
+
+    response = client.post('/search', data={
+        "departure": "JFK", "arrival": "SFO",
+        "departure_date": "2023-05-10", "return_date": "2023-05-15"})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    manager.shutdown(wait=True)
+    response = client.get(f'/search/{job_id}/results')
+    assert response.status_code == 200
+    assert response.get_json()["flight_options"] == [[1, "AA 2, AA 1441", "06:00", "08:05", "5h 5m", "N/A", "N/A", "$179", "N/A"]]
+    assert response.get_json()["flights"] == [flights_dict[1]]
+    assert client.get(f'/search/{job_id}').get_json()["status"] == "done"
+
+
+def test_search_stream(client, monkeypatch):
+    """
+    Test a search job streams its phases and each flight as Server-Sent Events.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the job manager.
+    """
+    from search_jobs import SearchJobManager
+    flight = {"flight_numbers": ["AA 2"], "departure_time": "06:00", "main_cabin_price": "$179"}
+
+    def streaming_search(on_event, **params):
+        on_event("phase", {"phase": "fill_form", "status": "started"})
+        on_event("flight", {"flight_id": 1, "flight": flight})
+        return {1: flight}
+
+    manager = SearchJobManager(streaming_search, stream_events=True)
+    monkeypatch.setattr("app.search_jobs", manager)
+    response = client.post('/search', data={
+        "departure": "JFK", "arrival": "SFO",
+        "departure_date": "2023-05-10", "return_date": "2023-05-15"})
+    stream_url = response.get_json()["stream_url"]
+    manager.shutdown(wait=True)
+
+    response = client.get(stream_url)
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    events = [block.splitlines()[0] for block in body.strip().split("\n\n")]
+    assert events == ["event: headers", "event: status", "event: phase", "event: flight", "event: status"]
+    assert '"row": [1, "AA 2", "06:00", "N/A", "N/A", "N/A", "N/A", "$179", "N/A"]' in body
+    assert client.get('/search/unknown/stream').status_code == 404
+
+
+def test_retried_scrape_streams_once(monkeypatch):
+    """
+    Test only the first attempt of a scrape reports its events, so a retry
+    does not stream the same flights again.
+
+    args:
+        monkeypatch: pytest fixture to replace the scraper, scrape runner, fare store and metrics.
+    """
+    from unittest.mock import MagicMock
+    from selenium.common.exceptions import WebDriverException
+    from fare_store import FareStore
+    from hedged_search import HedgedSearch
+    callbacks = []
+
+    def make_flights_data(depart, arrive, departure_date, return_date, on_event=None, deadline=None):
+        callbacks.append(on_event)
+        attempt = MagicMock(flights_dict={1: {"flight_numbers": ["AA 2"]}}, timings={})
+        if len(callbacks) == 1:
+            attempt.search.side_effect = WebDriverException("Chrome crashed")
+        return attempt
+
+    monkeypatch.setattr("app.make_flights_data", make_flights_data)
+    monkeypatch.setattr("app.scrape_runner", HedgedSearch(retries=1, backoff=0.01))
+    monkeypatch.setattr("app.fare_store", FareStore(":memory:"))
+    monkeypatch.setattr("app.record_scrape", lambda *args, **kwargs: None)
+    app.config['EXPORT_CSV'] = False
+    on_event = MagicMock()
+    try:
+        flights_dict = scrape_flights("JFK", "SFO", "2023-05-10", "2023-05-15", on_event=on_event)
+    finally:
+        app.config['EXPORT_CSV'] = True
+
+    assert flights_dict == {1: {"flight_numbers": ["AA 2"]}}
+    assert callbacks == [on_event, None]
+
+
+def test_metrics_route(client, monkeypatch):
+    """
+    Test a search page request is counted and timed on /metrics, phase by phase.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the scraper, cache and fare store.
+    """
+    from fare_store import FareStore
+    from replay import ReplayDriver, synthetic_results_page
+    from result_cache import ResultCache
+    from web_scraper import FlightsData
+    driver = ReplayDriver([synthetic_results_page(3)])
+    monkeypatch.setattr("app.make_flights_data", lambda depart, arrive, departure_date, return_date, on_event=None,
+                        deadline=None:
+                        FlightsData(depart, arrive, departure_date, return_date, settle_time=0,
+                                    driver_factory=lambda: driver))
+    monkeypatch.setattr("app.result_cache", ResultCache())
+    monkeypatch.setattr("app.fare_store", FareStore(":memory:"))
+    app.config['EXPORT_CSV'] = False
+    form = {"departure": "JFK", "arrival": "SFO", "departure_date": "2023-05-10", "return_date": "2023-05-15"}
+    try:
+        client.post('/', data=form)
+        client.post('/', data=form)
+    finally:
+        app.config['EXPORT_CSV'] = True
+
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    for phase in ("driver_startup", "search_url", "results_ready", "scrape"):
+        assert f'flightsearch_phase_seconds_count{{phase="{phase}"}} 1' in body
+    assert 'flightsearch_scrapes_total{outcome="done"} 1' in body
+    assert 'flightsearch_cards_extracted_total 3' in body
+    assert 'flightsearch_index_phase_seconds_count{phase="render"}' in body
+    assert 'flightsearch_request_seconds_count{endpoint="index",status="200"}' in body
+
+
+def test_export_failure_is_logged(monkeypatch, caplog):
+    """
+    Test a failing background export is logged and counted instead of lost.
+
+    args:
+        monkeypatch: pytest fixture to replace the output manager.
+        caplog: pytest fixture capturing the log.
+    """
+    from unittest.mock import MagicMock
+    from app import export_failures_total, export_scrape
+    output_manager = MagicMock()
+    output_manager.export.side_effect = OSError("No space left on device")
+    monkeypatch.setattr("app.output_manager", output_manager)
+    failures = export_failures_total.value()
+
+    with pytest.raises(OSError):
+        export_scrape({}, "JFK", "SFO", "2023-05-10", "2023-05-15", "csv")
+    assert export_failures_total.value() == failures + 1
+    assert "No space left on device" in caplog.text
+
+
+def test_lazy_imports():
+    """
+    Test importing the app does not load BeautifulSoup, pyarrow or the Selenium wait stack.
+    """
+    import subprocess
+    import sys
+    script = ("import sys, app; print([name for name in ('bs4', 'pyarrow', 'selenium.webdriver.support.ui') "
+              "if name in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_fare_history_routes(client, monkeypatch):
+    """
+    Test the fare history endpoints answer from the fare store.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the fare store.
+    """
+    from fare_store import FareStore
+    store = FareStore(":memory:")
+    store.record("JFK", "SFO", "2023-05-10", "2023-05-15",
+                 {1: {"flight_numbers": ["AA 2"], "main_cabin_price": "$179"}}, scrape_time=100)
+    monkeypatch.setattr("app.fare_store", store)
+
+    response = client.get('/fares/history?departure=JFK&arrival=SFO&departure_date=2023-05-10')
+    assert [entry["min_price"] for entry in response.get_json()["history"]] == ["$179"]
+    response = client.get('/fares/cheapest?departure=JFK&arrival=SFO')
+    assert response.get_json()["flight"]["flight_numbers"] == ["AA 2"]
+    assert client.get('/fares/cheapest?departure=LAX&arrival=SFO').status_code == 404
+    assert client.get('/fares/history?departure=JFK').status_code == 400
+    assert client.get('/fares/cheapest?departure=JFK&arrival=SFO&cabin=premium').status_code == 400
+
+
+def test_search_job_errors(client):
+    """
+    Test /search rejects missing fields and unknown job ids.
+
+    args:
+        client: test client.
+    """
+    response = client.post('/search', data={"departure": "JFK"})
+    assert response.status_code == 400
+    assert client.get('/search/unknown').status_code == 404
+
+
+def test_batch_search_route(client, monkeypatch):
+    """
+    Test POST /search/batch fans a flexible-date search out and merges it.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the batch search.
+    """
+    from batch_search import BatchSearch
+    batch = BatchSearch(lambda depart, arrive, departure_date, return_date: {1: {"flight_numbers": ["AA 1"]}})
+    monkeypatch.setattr("app.batch_search", batch)
+
+    response = client.post('/search/batch', json={
+        "departure": "JFK", "arrival": "SFO",
+        "departure_date": "2023-05-10", "return_date": "2023-05-15", "flex_days": 1})
+    assert response.status_code == 202
+    results_url = response.get_json()["results_url"]
+
+    for _ in range(100):
+        response = client.get(results_url)
+        if response.status_code != 202:
+            break
+        time.sleep(0.01)
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [flight["departure_date"] for flight in data["flights"]] == ["2023-05-09", "2023-05-10", "2023-05-11"]
+    assert data["failures"] == {}
+
+    response = client.post('/search/batch', json={"departure": "JFK", "arrival": "SFO", "month": "May"})
+    assert response.status_code == 400
+    for flex_days in (-1, 16, 740000):
+        response = client.post('/search/batch', json={
+            "departure": "JFK", "arrival": "SFO", "departure_date": "2023-05-10", "flex_days": flex_days})
+        assert response.status_code == 400
+        assert "flex_days" in response.get_json()["error"]
+
+
+def test_search_results_sort_and_filter(client, monkeypatch):
+    """
+    Test the results of a search job can be sorted and filtered by cabin price and stops.
+
+    args:
+        client: test client.
+        monkeypatch: pytest fixture to replace the job manager.
+    """
+    from search_jobs import SearchJobManager
+    flights_dict = {
+        1: {"flight_numbers": ["AA 1"], "departure_time": "6:00 AM", "main_cabin_price": "$179"},
+        2: {"flight_numbers": ["AA 2"], "departure_time": "1:10 PM", "main_cabin_price": "$99"},
+        3: {"flight_numbers": ["AA 3"], "departure_time": "9:00 PM", "main_cabin_price": "$499"},
+    }
+    manager = SearchJobManager(lambda **params: flights_dict)
+    monkeypatch.setattr("app.search_jobs", manager)
+    job_id = client.post('/search', data={
+        "departure": "JFK", "arrival": "SFO",
+        "departure_date": "2023-05-10", "return_date": "2023-05-15"}).get_json()["job_id"]
+    manager.shutdown(wait=True)
+
+    response = client.get(f'/search/{job_id}/results?sort=price&max_price=200')
+    assert [flight["flight_numbers"] for flight in response.get_json()["flights"]] == [["AA 2"], ["AA 1"]]
+    assert client.get(f'/search/{job_id}/results?sort=airline').status_code == 400
+
+    flights_dict[1].update({"flight_numbers": ["AA 1", "AA 10"], "first_class_price": "$900"})
+    flights_dict[3]["first_class_price"] = "$650"
+    manager = SearchJobManager(lambda **params: flights_dict)
+    monkeypatch.setattr("app.search_jobs", manager)
+    job_id = client.post('/search', data={
+        "departure": "JFK", "arrival": "SFO",
+        "departure_date": "2023-05-10", "return_date": "2023-05-15"}).get_json()["job_id"]
+    manager.shutdown(wait=True)
+    response = client.get(f'/search/{job_id}/results?cabin=first_class&max_price=1000&sort=first_class_price')
+    assert [flight["flight_numbers"] for flight in response.get_json()["flights"]] == [["AA 3"], ["AA 1", "AA 10"]]
+    response = client.get(f'/search/{job_id}/results?max_stops=0&sort=stops')
+    assert [flight["stops"] for flight in response.get_json()["flights"]] == [0, 0]
+    assert client.get(f'/search/{job_id}/results?cabin=premium&max_price=100').status_code == 400
+
+    # the default order and cabin alone return the flights as scraped
+    flights_dict[4] = {"flight_numbers": ["AA 4"], "departure_time": "06:00", "main_cabin_price": "$179.00",
+                       "stops": "N/A"}
+    response = client.get(f'/search/{job_id}/results?order=asc&cabin=main_cabin')
+    assert response.get_json()["flights"] == list(flights_dict.values())
@@ -0,0 +1,139 @@
+'''
+This is the test file for batch_runner.py. Fake FlightsData objects stand
+in for the real scraper.
+
+Classes:
+    Test_BatchRunner
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from batch_runner import BatchRunner, read_jobs, to_flights_data_date
+from driver_pool import DriverPool
+from fare_store import FareStore
+from rate_limiter import RateLimiter
+from replay import ReplayDriver, synthetic_results_page
+from web_scraper import FlightsData
+
+
+class FakeFlightsData:
+    """
+    A FlightsData stand-in whose search() follows a script of outcomes.
+    """
+
+    def __init__(self, outcome):
+        """
+        Args: outcome: "ok", or an exception to raise.
+        """
+        self.outcome = outcome
+
+    def search(self):
+        """
+        Follow the scripted outcome.
+        """
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return {1: {"flight_numbers": ["AA 1"]}}
+
+
+class Test_BatchRunner(unittest.TestCase):
+    """
+    Test for read_jobs and the BatchRunner class in batch_runner.
+    """
+
+    def test_read_jobs(self):
+        """
+        Test jobs are read from CSV and JSON Lines files.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "jobs.csv")
+            with open(csv_path, "w") as file:
+                file.write("depart,arrive,departure_date,return_date\nJFK,SFO,2023-05-10,2023-05-15\n")
+            jsonl_path = os.path.join(directory, "jobs.jsonl")
+            with open(jsonl_path, "w") as file:
+                file.write('{"depart": "LAX", "arrive": "ORD", "departure_date": "08/20/2023"}\n\n')
+
+            self.assertEqual(read_jobs(csv_path), [{"depart": "JFK", "arrive": "SFO",
+                                                    "departure_date": "2023-05-10", "return_date": "2023-05-15"}])
+            self.assertEqual(read_jobs(jsonl_path)[0]["arrive"], "ORD")
+            self.assertEqual(to_flights_data_date("2023-05-10"), "05/10/2023")
+
+    def test_retries_and_streams(self):
+        """
+        Test a failing attempt is retried, each job writes one JSON line,
+        and only successful jobs are recorded in the fare history.
+        """
+        outcomes = {"JFK": [RuntimeError("grid missing"), "ok"], "LAX": [RuntimeError("boom")] * 2}
+        factory = lambda depart, *args, deadline: FakeFlightsData(outcomes[depart].pop(0))
+        sink = io.StringIO()
+        fare_store = FareStore(":memory:")
+        runner = BatchRunner(sink, parallelism=2, retries=1, backoff=0, flights_data_factory=factory,
+                             fare_store=fare_store)
+
+        all_succeeded = runner.run([{"depart": "JFK", "arrive": "SFO", "departure_date": "2023-05-10"},
+                                    {"depart": "LAX", "arrive": "ORD", "departure_date": "2023-05-10"}])
+
+        lines = {line["job"]["depart"]: line for line in map(json.loads, sink.getvalue().splitlines())}
+        self.assertFalse(all_succeeded)
+        self.assertEqual((lines["JFK"]["status"], lines["JFK"]["attempts"]), ("done", 2))
+        self.assertEqual(lines["JFK"]["flights"], [{"flight_numbers": ["AA 1"]}])
+        self.assertEqual((lines["LAX"]["status"], lines["LAX"]["error"]), ("failed", "boom"))
+        self.assertEqual(fare_store.stats(), {"flights": 1, "scrapes": 1, "routes": 1})
+
+    def test_bad_date_fails_without_retry(self):
+        """
+        Test a job with an unreadable date fails at once, without a scrape or a retry.
+        """
+        factory = lambda *args, deadline: self.fail("a job with a bad date was scraped")
+        sink = io.StringIO()
+        runner = BatchRunner(sink, retries=3, backoff=10, flights_data_factory=factory)
+
+        start = time.monotonic()
+        outcome = runner.run_job({"depart": "JFK", "arrive": "SFO", "departure_date": "10/05/23"})
+
+        self.assertEqual((outcome["status"], outcome["attempts"]), ("failed", 0))
+        self.assertIn("Unrecognized date", outcome["error"])
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(json.loads(sink.getvalue())["status"], "failed")
+
+    def test_default_factory_shares_rate_limiter(self):
+        """
+        Test the FlightsData of the default factory share the runner's rate limiter and driver pool.
+        """
+        rate_limiter = RateLimiter()
+        runner = BatchRunner(io.StringIO(), rate_limiter=rate_limiter)
+        first = runner._default_factory("JFK", "SFO", "05/10/2023", None, "one way")
+        second = runner._default_factory("LAX", "ORD", "05/10/2023", None, "one way")
+
+        self.assertIs(first.rate_limiter, rate_limiter)
+        self.assertIs(second.rate_limiter, rate_limiter)
+        self.assertIs(first.driver_pool, second.driver_pool)
+        first.driver_pool.shutdown()
+
+    def test_timeout(self):
+        """
+        Test the timeout bounds an attempt even while it waits for a free driver.
+        """
+        pool = DriverPool(lambda: ReplayDriver([synthetic_results_page(3)]), size=1)
+        busy_driver = pool.acquire()
+        runner = BatchRunner(io.StringIO(), retries=0, timeout=0.05, flights_data_factory=lambda *args, deadline:
+                             FlightsData(*args, driver_pool=pool, deadline=deadline))
+
+        start = time.monotonic()
+        outcome = runner.run_job({"depart": "JFK", "arrive": "SFO", "departure_date": "2023-05-10"})
+
+        self.assertEqual(outcome["status"], "failed")
+        self.assertIn("deadline", outcome["error"])
+        self.assertLess(time.monotonic() - start, 1)
+        pool.release(busy_driver)
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
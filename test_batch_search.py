@@ -0,0 +1,98 @@
+'''
+This is the test file for batch_search.py. A fake search function stands
+in for the real scraper.
+
+Classes:
+    Test_DatePairs
+    Test_BatchSearch
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import threading
+import time
+import unittest
+from batch_search import BatchSearch, flexible_date_pairs, weekend_date_pairs
+from flight_model import Flight
+
+
+class Test_DatePairs(unittest.TestCase):
+    """
+    Test for the date pair helpers in batch_search.
+    """
+
+    def test_flexible_date_pairs(self):
+        """
+        Test ± days shifts keep the length of stay (and cross month ends).
+        """
+        pairs = flexible_date_pairs("2023-05-30", "2023-06-02", days=2)
+        self.assertEqual(pairs, [("2023-05-28", "2023-05-31"), ("2023-05-29", "2023-06-01"),
+                                 ("2023-05-30", "2023-06-02"), ("2023-05-31", "2023-06-03"),
+                                 ("2023-06-01", "2023-06-04")])
+        self.assertEqual(flexible_date_pairs("2023-05-30", days=0), [("2023-05-30", None)])
+
+    def test_weekend_date_pairs(self):
+        """
+        Test every Friday-to-Sunday trip of a month.
+        """
+        self.assertEqual(weekend_date_pairs(2023, 9),
+                         [("2023-09-01", "2023-09-03"), ("2023-09-08", "2023-09-10"),
+                          ("2023-09-15", "2023-09-17"), ("2023-09-22", "2023-09-24"),
+                          ("2023-09-29", "2023-10-01")])
+
+
+class Test_BatchSearch(unittest.TestCase):
+    """
+    Test for BatchSearch class in batch_search.
+    """
+
+    def test_merges_and_reports_failures(self):
+        """
+        Test flights are tagged with their dates, merged in date order,
+        and failed dates are reported without stopping the batch.
+        """
+        def fake_search(depart, arrive, departure_date, return_date):
+            if departure_date == "2023-05-11":
+                raise RuntimeError("results grid missing")
+            return {1: {"flight_numbers": [f"AA {departure_date[-2:]}"]}}
+
+        events = []
+        batch = BatchSearch(fake_search, max_concurrency=3)
+        pairs = flexible_date_pairs("2023-05-11", "2023-05-15", days=1)
+        result = batch.run("JFK", "SFO", pairs, progress=lambda pair, status, error: events.append(status))
+        batch.shutdown()
+
+        self.assertEqual(list(result.flights), [
+            Flight(["AA 10"], None, None, None, departure_date="2023-05-10", return_date="2023-05-14"),
+            Flight(["AA 12"], None, None, None, departure_date="2023-05-12", return_date="2023-05-16"),
+        ])
+        self.assertEqual(result.failures, {("2023-05-11", "2023-05-15"): "results grid missing"})
+        self.assertEqual(result.to_dict()["progress"]["2023-05-11/2023-05-15"], "failed")
+        self.assertEqual(sorted(events), ["done", "done", "failed", "running", "running", "running"])
+
+    def test_concurrency_cap(self):
+        """
+        Test no more than max_concurrency searches run at once.
+        """
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_search(depart, arrive, departure_date, return_date):
+            with lock:
+                running.append(departure_date)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(departure_date)
+            return {}
+
+        batch = BatchSearch(slow_search, max_concurrency=2)
+        batch.run("JFK", "SFO", flexible_date_pairs("2023-05-10", days=3))
+        batch.shutdown()
+
+        self.assertEqual(max(peak), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+'''
+This is the test file for benchmarks.py, run on tiny pages so it stays fast.
+
+Classes:
+    Test_Benchmarks
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import json
+import os
+import tempfile
+import unittest
+from benchmarks import compare, main, run_suite
+
+
+class Test_Benchmarks(unittest.TestCase):
+    """
+    Test the benchmark suite and the comparison of runs.
+    """
+
+    def test_run_suite(self):
+        """
+        Test every benchmark reports wall time, peak memory and throughput.
+        """
+        run = run_suite(sizes=[5], repeat=1)
+        self.assertEqual([result["name"] for result in run["results"]],
+                         ["parse_page", "extract_info", "page_scrape_snapshot", "page_scrape_replay_stub",
+                          "process_prices", "export_to_csv", "read_csv", "render_index"])
+        for result in run["results"]:
+            self.assertEqual((result["page"], result["cards"]), ("synthetic-5", 5))
+            self.assertGreater(result["wall_median"], 0)
+            self.assertGreater(result["peak_bytes"], 0)
+            self.assertGreater(result["ops_per_sec"], 0)
+
+    def test_startup(self):
+        """
+        Test the cold start of the web app is measured in a fresh interpreter.
+        """
+        run = run_suite(sizes=[], repeat=1, startup=True)
+        self.assertEqual([(result["name"], result["page"]) for result in run["results"]],
+                         [("import_app", "startup"), ("first_get", "startup")])
+        for result in run["results"]:
+            self.assertGreater(result["wall_median"], 0)
+
+    def test_compare(self):
+        """
+        Test a benchmark slower than the threshold is flagged as a regression.
+        """
+        baseline = {"results": [{"name": "page_scrape_replay_stub", "page": "synthetic-10", "wall_median": 1.0},
+                                {"name": "read_csv", "page": "synthetic-10", "wall_median": 1.0}]}
+        current = {"results": [{"name": "page_scrape_replay_stub", "page": "synthetic-10", "wall_median": 1.5},
+                               {"name": "read_csv", "page": "synthetic-10", "wall_median": 1.1},
+                               {"name": "render_index", "page": "synthetic-10", "wall_median": 1.0}]}
+        comparison = compare(baseline, current, threshold=0.2)
+        self.assertEqual([(entry["name"], entry["regression"]) for entry in comparison],
+                         [("page_scrape_replay_stub", True), ("read_csv", False)])
+
+    def test_main_output(self):
+        """
+        Test the command line writes machine-readable results that can be compared with.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            self.assertEqual(main(["--sizes", "3", "--repeat", "1", "--only", "read_csv", "--output", output]), 0)
+            with open(output) as file:
+                run = json.load(file)
+            self.assertEqual(len(run["results"]), 1)
+            main(["--sizes", "3", "--repeat", "1", "--only", "read_csv", "--output", output, "--compare", output])
+            with open(output) as file:
+                self.assertEqual(len(json.load(file)["comparison"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+'''
+This is the test file for driver_pool.py. Fake drivers (MagicMock) are
+used so no real Chrome is started.
+
+Classes:
+    Test_DriverPool
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import threading
+import unittest
+from unittest.mock import MagicMock
+from selenium.common.exceptions import WebDriverException
+from driver_pool import DEFAULT_PAGE_LOAD_TIMEOUT, DriverPool
+
+
+class Test_DriverPool(unittest.TestCase):
+    """
+    Test for DriverPool class in driver_pool.
+    """
+
+    def setUp(self):
+        """
+        Create a pool whose factory returns fake drivers.
+        """
+        self.created = []
+
+        def factory():
+            driver = MagicMock()
+            driver.window_handles = ["main"]
+            self.created.append(driver)
+            return driver
+
+        self.pool = DriverPool(factory, size=2, max_uses=3)
+
+    def test_reuses_driver(self):
+        """
+        Test a released driver is reset and handed out again.
+        """
+        with self.pool.driver() as first:
+            pass
+        with self.pool.driver() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        first.delete_all_cookies.assert_called()
+        first.get.assert_called_with("about:blank")
+        first.quit.assert_not_called()
+
+    def test_reset_restores_timeout_and_drains_log(self):
+        """
+        Test a reset driver gets the default page load timeout back and its
+        performance log is read out, so the next search starts clean.
+        """
+        driver = self.pool.acquire()
+        driver.set_page_load_timeout(0.5)
+        self.pool.release(driver)
+
+        driver.set_page_load_timeout.assert_called_with(DEFAULT_PAGE_LOAD_TIMEOUT)
+        driver.get_log.assert_called_with("performance")
+
+        # a driver without performance logging is still reused
+        driver.get_log.side_effect = WebDriverException("log type 'performance' not found")
+        self.pool.release(self.pool.acquire())
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_recycles_after_max_uses(self):
+        """
+        Test a driver is quit and replaced after max_uses searches.
+        """
+        for _ in range(3):
+            with self.pool.driver():
+                pass
+        with self.pool.driver() as driver:
+            pass
+
+        self.created[0].quit.assert_called_once()
+        self.assertIsNot(driver, self.created[0])
+
+    def test_discards_crashed_driver(self):
+        """
+        Test a driver raising WebDriverException is not reused.
+        """
+        with self.assertRaises(WebDriverException):
+            with self.pool.driver():
+                raise WebDriverException("chrome not reachable")
+
+        self.created[0].quit.assert_called_once()
+        self.assertEqual(self.pool.stats()["live"], 0)
+
+    def test_bounded_size(self):
+        """
+        Test the pool never starts more than `size` drivers and times out.
+        """
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.05)
+
+        # a waiting caller gets the driver as soon as it is released
+        threading.Timer(0.05, self.pool.release, args=(first,)).start()
+        self.assertIs(self.pool.acquire(timeout=2), first)
+        self.pool.release(second)
+        self.assertEqual(len(self.created), 2)
+
+    def test_warm_and_shutdown(self):
+        """
+        Test warm starts idle drivers and shutdown quits them.
+        """
+        self.pool.warm()
+        self.assertEqual(self.pool.stats(), {"size": 2, "live": 2, "idle": 2})
+
+        self.pool.shutdown()
+        for driver in self.created:
+            driver.quit.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()
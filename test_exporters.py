@@ -0,0 +1,120 @@
+'''
+This is the test file for exporters.py.
+
+Classes:
+    Test_Exporters
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import csv
+import json
+import os
+import tempfile
+import unittest
+from exporters import export_flights, exporter_for_path, get_exporter, open_writer
+from flight_model import Flight, FlightTable
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+FLIGHTS_DICT = {
+    1: {"flight_numbers": ["AA 100"], "departure_time": "6:00 AM", "arrival_time": "8:05 AM",
+        "duration": "5h 5m", "basic_economy_price": "$129", "main_cabin_price": "$179",
+        "first_class_price": "$529"},
+    2: {"flight_numbers": ["AA 2", "AA 1441"], "departure_time": "1:10 PM", "arrival_time": "6:45 PM",
+        "duration": "8h 35m", "basic_economy_price": "N/A", "main_cabin_price": "$249",
+        "first_class_price": "$699"},
+}
+
+
+class Test_Exporters(unittest.TestCase):
+    """
+    Test the exporter registry and the streaming writers.
+    """
+
+    def setUp(self):
+        """
+        A temporary directory for the output files.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """
+        Remove the output files.
+        """
+        self.directory.cleanup()
+
+    def path(self, name):
+        """
+        Return the path of an output file in the temporary directory.
+        """
+        return os.path.join(self.directory.name, name)
+
+    def test_registry(self):
+        """
+        Test formats are found by name and by file extension.
+        """
+        self.assertEqual(exporter_for_path("JFKtoSFO.csv"), "csv")
+        self.assertEqual(exporter_for_path("archive.JSONL"), "jsonl")
+        self.assertEqual(exporter_for_path("archive.parquet"), "parquet")
+        with self.assertRaises(ValueError):
+            exporter_for_path("archive.xlsx")
+        with self.assertRaises(ValueError):
+            get_exporter("xlsx")
+
+    def test_csv_append(self):
+        """
+        Test CSV rows are appended per flight with a single header row and byte order mark.
+        """
+        path = self.path("flights.csv")
+        export_flights(FLIGHTS_DICT, path, context={"depart": "JFK"})
+        with open_writer(path, append=True, context={"depart": "LAX"}) as writer:
+            writer.write(Flight(["AA 7"], 1260, 1439, 359, main_cabin_cents=14900))
+
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row["depart"] for row in rows], ["JFK", "JFK", "LAX"])
+        self.assertEqual(rows[1]["flight_numbers"], "AA 2, AA 1441")
+        self.assertEqual(rows[1]["stops"], "1")
+        self.assertEqual(rows[1]["basic_economy_price"], "N/A")
+        self.assertEqual(rows[2]["departure_time"], "9:00 PM")
+        # a single byte order mark, at the start of the file, for Excel
+        with open(path, "rb") as file:
+            content = file.read()
+        self.assertTrue(content.startswith(b"\xef\xbb\xbf"))
+        self.assertEqual(content.count(b"\xef\xbb\xbf"), 1)
+
+    def test_jsonl_same_records(self):
+        """
+        Test a flights dictionary and a FlightTable of the same flights export the same lines.
+        """
+        export_flights(FLIGHTS_DICT, self.path("a.jsonl"))
+        export_flights(FlightTable.from_flights_dict(FLIGHTS_DICT), self.path("b.jsonl"))
+
+        with open(self.path("a.jsonl")) as a, open(self.path("b.jsonl")) as b:
+            lines = a.read().splitlines()
+            self.assertEqual(lines, b.read().splitlines())
+        flight = json.loads(lines[1])
+        self.assertEqual(flight["flight_numbers"], ["AA 2", "AA 1441"])
+        self.assertEqual(flight["fare_classes"], ["Main Cabin", "First Class"])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        """
+        Test Parquet files hold the typed columns, with nulls for missing fares.
+        """
+        import pyarrow.parquet
+        path = export_flights(FLIGHTS_DICT, self.path("flights.parquet"), context={"depart": "JFK"})
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column("main_cabin_cents").to_pylist(), [17900, 24900])
+        self.assertEqual(table.column("basic_economy_cents").to_pylist(), [12900, None])
+        self.assertEqual(table.column("depart").to_pylist(), ["JFK", "JFK"])
+        with self.assertRaises(ValueError):
+            open_writer(path, append=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
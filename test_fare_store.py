@@ -0,0 +1,81 @@
+'''
+This is the test file for fare_store.py. The store runs on an in-memory
+SQLite database.
+
+Classes:
+    Test_FareStore
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import unittest
+from fare_store import FareStore
+from flight_model import Flight
+
+
+def scrape(main_cabin_prices):
+    """
+    Build the flights dictionary of a scrape with one flight per main cabin price.
+    """
+    return {index: {"flight_numbers": [f"AA {index}"], "departure_time": "6:00 AM",
+                    "main_cabin_price": price, "first_class_price": "$900"}
+            for index, price in enumerate(main_cabin_prices, start=1)}
+
+
+class Test_FareStore(unittest.TestCase):
+    """
+    Test for FareStore class in fare_store.
+    """
+
+    def setUp(self):
+        """
+        Three scrapes of JFK-SFO on 2023-05-10 and one of another date.
+        """
+        self.store = FareStore(":memory:", batch_size=2)
+        self.store.record("jfk", "sfo", "05/10/2023", "05/15/2023", scrape(["$179", "$249", "N/A"]), scrape_time=100)
+        self.store.record("JFK", "SFO", "2023-05-10", "2023-05-15", scrape(["$199", "$149"]), scrape_time=200)
+        self.store.record("JFK", "SFO", "2023-05-10", "2023-05-15", scrape(["N/A"]), scrape_time=300)
+        self.store.record("JFK", "SFO", "2023-05-11", None, [Flight(["AA 7"], 360, 485, 305, main_cabin_cents=9900)],
+                          scrape_time=400)
+
+    def tearDown(self):
+        """
+        Close the database.
+        """
+        self.store.close()
+
+    def test_record(self):
+        """
+        Test every flight is stored, across batches, with the scrape normalized.
+        """
+        self.assertEqual(self.store.stats(), {"flights": 7, "scrapes": 4, "routes": 1})
+        self.assertEqual(self.store.record("JFK", "SFO", "2023-05-10", None, {}), 0)
+
+    def test_price_history(self):
+        """
+        Test the cheapest fare of each scrape, oldest first, skipping scrapes without a fare.
+        """
+        history = self.store.price_history("JFK", "SFO", "2023-05-10", "2023-05-15")
+        self.assertEqual([(entry["scrape_time"], entry["min_cents"], entry["flights"]) for entry in history],
+                         [(100, 17900, 2), (200, 14900, 2)])
+        self.assertEqual(history[1]["min_price"], "$149")
+        history = self.store.price_history("JFK", "SFO", "2023-05-10", cabin="first_class")
+        self.assertEqual(len(history), 3)
+        with self.assertRaises(ValueError):
+            self.store.price_history("JFK", "SFO", "2023-05-10", cabin="premium")
+
+    def test_cheapest_fare(self):
+        """
+        Test the cheapest fare ever seen, for a route or a single day.
+        """
+        cheapest = self.store.cheapest_fare("JFK", "SFO")
+        self.assertEqual((cheapest["flight_numbers"], cheapest["main_cabin_price"]), (["AA 7"], "$99"))
+        self.assertIsNone(cheapest["return_date"])
+        cheapest = self.store.cheapest_fare("JFK", "SFO", "2023-05-10")
+        self.assertEqual((cheapest["main_cabin_price"], cheapest["scrape_time"]), ("$149", 200))
+        self.assertIsNone(self.store.cheapest_fare("JFK", "SFO", "2023-05-10", since=250))
+        self.assertIsNone(self.store.cheapest_fare("LAX", "SFO"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+'''
+This is the test file for flight_model.py.
+
+Classes:
+    Test_Parsing
+    Test_FlightTable
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import unittest
+from flight_model import (Flight, FlightTable, parse_time, parse_duration, parse_price,
+                          format_time, format_duration, format_price)
+
+
+class Test_Parsing(unittest.TestCase):
+    """
+    Test the parse/format helpers in flight_model.
+    """
+
+    def test_parse_time(self):
+        """
+        Test clock times are converted to minutes since midnight.
+        """
+        self.assertEqual(parse_time("6:00 AM"), 360)
+        self.assertEqual(parse_time("12:05 am"), 5)
+        self.assertEqual(parse_time("11:59 PM"), 1439)
+        self.assertEqual(parse_time("18:05"), 1085)
+        self.assertIsNone(parse_time("N/A"))
+        self.assertEqual(format_time(1439), "11:59 PM")
+        self.assertEqual(format_time(5), "12:05 AM")
+
+    def test_parse_duration(self):
+        """
+        Test durations are converted to minutes.
+        """
+        self.assertEqual(parse_duration("5h 5m"), 305)
+        self.assertEqual(parse_duration("45m"), 45)
+        self.assertEqual(parse_duration("12h"), 720)
+        self.assertIsNone(parse_duration(""))
+        self.assertEqual(format_duration(305), "5h 5m")
+
+    def test_parse_price(self):
+        """
+        Test prices are converted to cents and "N/A" to None.
+        """
+        self.assertEqual(parse_price("$1,129"), 112900)
+        self.assertEqual(parse_price("$179.5"), 17950)
+        self.assertIsNone(parse_price("N/A"))
+        self.assertEqual(format_price(112900), "$1,129")
+        self.assertEqual(format_price(17950), "$179.50")
+
+    def test_stops_and_fare_classes(self):
+        """
+        Test stops default to the number of connections and fare classes list the cabins with a fare.
+        """
+        flight = Flight.from_dict({"flight_numbers": ["AA 2", "AA 1441"], "basic_economy_price": "N/A",
+                                   "main_cabin_price": "$249", "first_class_price": "$1,129"})
+        self.assertEqual(flight.stops, 1)
+        self.assertEqual(flight.fare_classes, ["Main Cabin", "First Class"])
+        self.assertEqual(flight.to_dict()["fare_classes"], ["Main Cabin", "First Class"])
+        self.assertEqual(Flight.from_dict({"flight_numbers": ["AA 2"], "stops": 1}).stops, 1)
+
+    def test_flight_round_trip(self):
+        """
+        Test a scraped flight survives Flight.from_dict/to_dict.
+        """
+        scraped = {"flight_numbers": ["AA 2", "AA 1441"], "departure_time": "1:10 PM",
+                   "arrival_time": "6:45 PM", "duration": "8h 35m", "main_cabin_price": "$249"}
+        flight = Flight.from_dict(scraped)
+
+        self.assertEqual(flight.flight_numbers, ("AA 2", "AA 1441"))
+        self.assertEqual((flight.departure_minutes, flight.duration_minutes, flight.main_cabin_cents),
+                         (790, 515, 24900))
+        self.assertIsNone(flight.first_class_cents)
+        self.assertFalse(hasattr(flight, "__dict__"))
+        for key, value in scraped.items():
+            self.assertEqual(flight.to_dict()[key], value)
+
+
+class Test_FlightTable(unittest.TestCase):
+    """
+    Test for FlightTable class in flight_model.
+    """
+
+    def setUp(self):
+        """
+        A table of three flights, one of them without a main cabin fare.
+        """
+        self.table = FlightTable([
+            Flight(["AA 1"], 360, 485, 305, main_cabin_cents=17900),
+            Flight(["AA 2"], 790, 1125, 515, main_cabin_cents=None),
+            Flight(["AA 3"], 60, 400, 340, main_cabin_cents=9900),
+        ])
+
+    def test_columns_and_rows(self):
+        """
+        Test columns are compact arrays and rows come back as Flight records.
+        """
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table.column("main_cabin_cents").typecode, "q")
+        self.assertEqual(self.table[1].flight_numbers, ("AA 2",))
+        self.assertIsNone(self.table[1].main_cabin_cents)
+
+    def test_sort_by(self):
+        """
+        Test sorting, with missing values last in both orders.
+        """
+        by_price = self.table.sort_by("main_cabin_cents")
+        self.assertEqual([f.flight_numbers[0] for f in by_price], ["AA 3", "AA 1", "AA 2"])
+        by_price_desc = self.table.sort_by("main_cabin_cents", reverse=True)
+        self.assertEqual([f.flight_numbers[0] for f in by_price_desc], ["AA 1", "AA 3", "AA 2"])
+        by_departure = self.table.sort_by("departure_minutes")
+        self.assertEqual([f.departure_minutes for f in by_departure], [60, 360, 790])
+
+    def test_filter(self):
+        """
+        Test filtering by a numeric range drops flights missing the value.
+        """
+        cheap = self.table.filter("main_cabin_cents", high=15000)
+        self.assertEqual([f.flight_numbers[0] for f in cheap], ["AA 3"])
+        morning = self.table.filter("departure_minutes", low=300, high=720)
+        self.assertEqual([f.flight_numbers[0] for f in morning], ["AA 1"])
+        self.assertEqual(len(self.table.filter("main_cabin_cents")), 3)
+
+    def test_flights_dict(self):
+        """
+        Test conversion from and to the page_scrape format.
+        """
+        table = FlightTable.from_flights_dict({1: {"flight_numbers": ["AA 1"], "departure_time": "6:00 AM",
+                                                   "main_cabin_price": "$179"}})
+        self.assertEqual(table.to_flights_dict()[1]["main_cabin_price"], "$179")
+        self.assertEqual(table.to_flights_dict()[1]["duration"], "N/A")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+'''
+This is the test file for hedged_search.py.
+
+Classes:
+    FakeAttempt
+    Test_LatencyTracker
+    Test_HedgedSearch
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import threading
+import unittest
+from selenium.common.exceptions import WebDriverException
+from hedged_search import HedgedSearch, LatencyTracker
+
+
+class FakeAttempt:
+    """
+    Stands in for a FlightsData: its search takes `seconds`, unless cancelled,
+    then raises `error` or returns its flights.
+    """
+
+    def __init__(self, seconds=0, error=None, flights=None):
+        self.seconds = seconds
+        self.error = error
+        self.flights_dict = {}
+        self.flights = flights or {1: {"flight_number": "AA 1"}}
+        self.cancelled = threading.Event()
+
+    def search(self):
+        if self.cancelled.wait(self.seconds):
+            raise WebDriverException("cancelled")
+        if self.error is not None:
+            raise self.error
+        self.flights_dict = self.flights
+        return self.flights_dict
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class Test_LatencyTracker(unittest.TestCase):
+    """
+    Test for LatencyTracker class in hedged_search.
+    """
+
+    def test_percentile(self):
+        """
+        Test percentiles are taken by nearest rank over the recent window only.
+        """
+        tracker = LatencyTracker(window=100)
+        self.assertIsNone(tracker.percentile(0.5))
+        for seconds in range(1, 201):
+            tracker.record(seconds)
+
+        self.assertEqual(len(tracker), 100)
+        self.assertEqual(tracker.percentile(0.5), 150)
+        self.assertEqual(tracker.percentile(0.95), 195)
+        self.assertEqual(tracker.percentile(1), 200)
+
+
+class Test_HedgedSearch(unittest.TestCase):
+    """
+    Test for HedgedSearch class in hedged_search.
+    """
+
+    def run_attempts(self, runner, attempts):
+        """
+        Runs a search whose attempts are taken in turn from `attempts`.
+
+        Returns: tuple: The winning attempt, and the (deadline, hedge) of each attempt made.
+        """
+        calls = []
+
+        def make_attempt(deadline, hedge):
+            calls.append((deadline, hedge))
+            return attempts[len(calls) - 1]
+
+        try:
+            return runner.run(make_attempt), calls
+        finally:
+            runner.shutdown()
+
+    def test_no_hedge_without_samples(self):
+        """
+        Test a search is not hedged before enough latencies were recorded.
+        """
+        runner = HedgedSearch(hedge_percentile=0.5, min_samples=5)
+        for _ in range(4):
+            runner.latencies.record(0.01)
+        attempt = FakeAttempt(seconds=0.1)
+        winner, calls = self.run_attempts(runner, [attempt])
+
+        self.assertIs(winner, attempt)
+        self.assertEqual(calls, [(None, False)])
+        self.assertEqual(runner.stats()["hedged"], 0)
+
+    def test_hedge_wins(self):
+        """
+        Test a search slower than the percentile is hedged, and the faster
+        hedge wins while the slow attempt is cancelled.
+        """
+        runner = HedgedSearch(hedge_percentile=0.9, min_samples=5)
+        for _ in range(5):
+            runner.latencies.record(0.05)
+        slow, fast = FakeAttempt(seconds=10), FakeAttempt(seconds=0)
+        winner, calls = self.run_attempts(runner, [slow, fast])
+
+        self.assertIs(winner, fast)
+        self.assertEqual([hedge for _, hedge in calls], [False, True])
+        self.assertTrue(slow.cancelled.is_set())
+        self.assertEqual(runner.stats()["hedged"], 1)
+        self.assertEqual(runner.stats()["hedge_wins"], 1)
+
+    def test_retry_transient_failure(self):
+        """
+        Test a WebDriver failure is retried, and an unexpected error is not.
+        """
+        runner = HedgedSearch(retries=2, backoff=0.01)
+        attempt = FakeAttempt()
+        winner, calls = self.run_attempts(runner, [FakeAttempt(error=WebDriverException("crashed")), attempt])
+        self.assertIs(winner, attempt)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(runner.stats()["retried"], 1)
+
+        runner = HedgedSearch(retries=2, backoff=0.01)
+        with self.assertRaises(ValueError):
+            self.run_attempts(runner, [FakeAttempt(error=ValueError("bad page")), FakeAttempt()])
+
+    def test_deadline(self):
+        """
+        Test a search past its deadline raises TimeoutError, without a retry
+        the remaining budget cannot fit, and its attempt is cancelled.
+        """
+        runner = HedgedSearch(deadline=0.1, retries=3, backoff=1)
+        attempt = FakeAttempt(seconds=10)
+        with self.assertRaises(TimeoutError):
+            self.run_attempts(runner, [attempt, FakeAttempt()])
+
+        self.assertTrue(attempt.cancelled.is_set())
+        self.assertEqual(runner.stats()["retried"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+'''
+This is the test file for metrics.py.
+
+Classes:
+    Test_Metrics
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import unittest
+from metrics import MetricsRegistry
+
+
+class Test_Metrics(unittest.TestCase):
+    """
+    Test for the counters, histograms and gauges of metrics.
+    """
+
+    def test_counter(self):
+        """
+        Test a counter adds up per label value and renders its samples.
+        """
+        registry = MetricsRegistry()
+        scrapes = registry.counter("scrapes_total", "Scrapes", ("outcome",))
+        scrapes.inc(outcome="done")
+        scrapes.inc(2, outcome="done")
+        scrapes.inc(outcome="failed")
+
+        self.assertEqual(scrapes.value(outcome="done"), 3)
+        self.assertIs(registry.counter("scrapes_total", "Scrapes", ("outcome",)), scrapes)
+        text = registry.render()
+        self.assertIn("# TYPE scrapes_total counter", text)
+        self.assertIn('scrapes_total{outcome="done"} 3', text)
+        self.assertIn('scrapes_total{outcome="failed"} 1', text)
+
+    def test_histogram(self):
+        """
+        Test a histogram counts observations in cumulative buckets, with sum and count.
+        """
+        registry = MetricsRegistry()
+        phases = registry.histogram("phase_seconds", "Phases", ("phase",), buckets=(1, 5))
+        phases.observe(0.5, phase="scrape")
+        phases.observe(3, phase="scrape")
+        phases.observe(10, phase="scrape")
+        with phases.time(phase="export"):
+            pass
+
+        self.assertEqual(phases.count(phase="scrape"), 3)
+        self.assertEqual(phases.count(phase="export"), 1)
+        text = registry.render()
+        self.assertIn('phase_seconds_bucket{phase="scrape",le="1"} 1', text)
+        self.assertIn('phase_seconds_bucket{phase="scrape",le="5"} 2', text)
+        self.assertIn('phase_seconds_bucket{phase="scrape",le="+Inf"} 3', text)
+        self.assertIn('phase_seconds_sum{phase="scrape"} 13.5', text)
+        self.assertIn('phase_seconds_count{phase="scrape"} 3', text)
+
+    def test_gauge(self):
+        """
+        Test a gauge reads its value when rendered, and label values are escaped.
+        """
+        registry = MetricsRegistry()
+        sizes = {"idle": 1}
+        registry.gauge("pool_size", "Pool size", lambda: sizes["idle"])
+        registry.gauge("jobs", "Jobs", lambda: {('say "hi"',): 2}, ("status",))
+        sizes["idle"] = 4
+
+        text = registry.render()
+        self.assertIn("# TYPE pool_size gauge\npool_size 4\n", text)
+        self.assertIn('jobs{status="say \\"hi\\""} 2', text)
+
+    def test_counter_func(self):
+        """
+        Test a count kept elsewhere is read when rendered and typed as a counter.
+        """
+        registry = MetricsRegistry()
+        counts = {"retry": 0}
+        registry.counter_func("attempts_total", "Attempts", lambda: {(reason,): count for reason, count
+                                                                     in counts.items()}, ("reason",))
+        counts["retry"] = 3
+
+        text = registry.render()
+        self.assertIn('# TYPE attempts_total counter\nattempts_total{reason="retry"} 3\n', text)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=3)
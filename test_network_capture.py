@@ -0,0 +1,165 @@
+'''
+This is the test file for network_capture.py.
+
+Classes:
+    CapturingDriver
+    Test_NetworkCapture
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import base64
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from selenium.common.exceptions import WebDriverException
+
+from network_capture import results_responses, response_payload, wait_for_payload, flights_from_payload
+from replay import ReplayDriver, synthetic_results_page
+from web_scraper import FlightsData
+
+PAYLOAD = {"slices": [
+    {"segments": [{"flight": {"carrierCode": "AA", "flightNumber": "2"}}],
+     "departureDateTime": "2023-05-10T06:00:00.000-04:00", "arrivalDateTime": "2023-05-10T09:05:00.000-07:00",
+     "durationInMinutes": 365, "stops": 0,
+     "pricingDetail": [{"productType": "BASIC_ECONOMY", "perPassengerDisplayTotal": {"amount": 98.4}},
+                       {"productType": "COACH", "perPassengerDisplayTotal": {"amount": 179.0}},
+                       {"productType": "FIRST", "productAvailable": False,
+                        "perPassengerDisplayTotal": {"amount": 529.0}}]},
+    {"segments": [{"flight": {"carrierCode": "AA", "flightNumber": "1441"}},
+                  {"flight": {"carrierCode": "AA", "flightNumber": "2197"}}],
+     "departureDateTime": "2023-05-10T18:30:00.000-04:00", "arrivalDateTime": "2023-05-11T00:10:00.000-07:00",
+     "durationInMinutes": 640,
+     "pricingDetail": [{"productType": "COACH", "perPassengerDisplayTotal": {"amount": 1129.0}}]},
+]}
+
+
+def log_entry(method, url="", request_id="1"):
+    """
+    Builds one performance log entry.
+    """
+    return {"message": json.dumps({"message": {
+        "method": method, "params": {"requestId": request_id, "response": {"url": url}}}})}
+
+
+class CapturingDriver(ReplayDriver):
+    """
+    A ReplayDriver that also serves a performance log and response bodies.
+    """
+
+    def __init__(self, pages, log, bodies):
+        super().__init__(pages)
+        self.log = list(log)
+        self.bodies = bodies
+
+    def get_log(self, log_type):
+        log, self.log = self.log, []
+        return log
+
+    def execute_cdp_cmd(self, command, params):
+        if params["requestId"] not in self.bodies:
+            raise WebDriverException("No resource with given identifier found")
+        return self.bodies[params["requestId"]]
+
+
+class Test_NetworkCapture(unittest.TestCase):
+    """
+    Test the network-capture extraction backend.
+    """
+
+    def test_flights_from_payload(self):
+        """
+        Test a payload maps to the page_scrape format, fares rounded up to dollars.
+        """
+        flights_dict = flights_from_payload(PAYLOAD)
+
+        self.assertEqual(flights_dict[1], {
+            "flight_numbers": ["AA 2"], "departure_time": "6:00 AM", "arrival_time": "9:05 AM",
+            "duration": "6h 5m", "stops": 0, "basic_economy_price": "$99", "main_cabin_price": "$179",
+            "first_class_price": "N/A", "fare_classes": ["Basic Economy", "Main Cabin"]})
+        self.assertEqual(flights_dict[2]["flight_numbers"], ["AA 1441", "AA 2197"])
+        self.assertEqual(flights_dict[2]["stops"], 1)
+        self.assertEqual(flights_dict[2]["arrival_time"], "12:10 AM")
+        self.assertEqual(flights_dict[2]["main_cabin_price"], "$1,129")
+        with self.assertRaises(ValueError):
+            flights_from_payload({"slices": [{"segments": []}]})
+
+    def test_responses_and_bodies(self):
+        """
+        Test only the results XHR is picked from the log, and bodies are decoded.
+        """
+        log = [log_entry("Network.requestWillBeSent", "https://www.aa.com/booking/api/search/itinerary"),
+               log_entry("Network.responseReceived", "https://www.aa.com/fonts/a.woff", "7"),
+               log_entry("Network.responseReceived", "https://www.aa.com/booking/api/search/itinerary", "9"),
+               {"message": "not json"}]
+        self.assertEqual(results_responses(log), ["9"])
+
+        body = base64.b64encode(json.dumps(PAYLOAD).encode()).decode()
+        driver = CapturingDriver(["<html></html>"], [], {"9": {"body": body, "base64Encoded": True},
+                                                        "8": {"body": "<html>", "base64Encoded": False}})
+        self.assertEqual(response_payload(driver, "9"), PAYLOAD)
+        self.assertIsNone(response_payload(driver, "8"))
+        self.assertIsNone(response_payload(driver, "missing"))
+        self.assertIsNone(wait_for_payload(ReplayDriver(["<html></html>"]), timeout=5))
+
+    @patch("web_scraper.time.sleep")
+    def test_network_extraction(self, mock_sleep):
+        """
+        Test a search reads the captured payload, and scrapes the page when nothing was captured.
+        """
+        log = [log_entry("Network.responseReceived", "https://www.aa.com/booking/api/search/itinerary", "9")]
+        driver = CapturingDriver([synthetic_results_page(3)], log, {"9": {"body": json.dumps(PAYLOAD)}})
+        events = []
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", extraction="network",
+                                   driver_factory=lambda: driver, on_event=lambda *event: events.append(event))
+
+        self.assertEqual(flights_data.search(), flights_from_payload(PAYLOAD))
+        self.assertIn("network_capture", flights_data.timings)
+        self.assertNotIn("results_ready", flights_data.timings)
+        self.assertEqual(len([event for event in events if event[0] == "flight"]), 2)
+
+        driver = CapturingDriver([synthetic_results_page(3)], [], {})
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", extraction="network",
+                                   driver_factory=lambda: driver, results_timeout=0, settle_time=0)
+        self.assertEqual(len(flights_data.search()), 3)
+        self.assertIn("results_ready", flights_data.timings)
+
+    @patch("web_scraper.time.sleep")
+    def test_network_fallback_budget(self, mock_sleep):
+        """
+        Test the rendered page is only waited for with what the capture left of results_timeout.
+        """
+        def slow_capture(driver, timeout, **kwargs):
+            threading.Event().wait(0.3)
+            return None
+
+        driver = CapturingDriver([synthetic_results_page(3)], [], {})
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", extraction="network",
+                                   driver_factory=lambda: driver, results_timeout=1, settle_time=0)
+        with patch("web_scraper.wait_for_payload", side_effect=slow_capture), \
+                patch.object(FlightsData, "wait_for_results", wraps=flights_data.wait_for_results) as mock_wait:
+            self.assertEqual(len(flights_data.search()), 3)
+        self.assertLessEqual(mock_wait.call_args.args[0], 0.7)
+
+    @patch("web_scraper.time.sleep")
+    def test_network_fallback_without_payload(self, mock_sleep):
+        """
+        Test the rendered page is scraped as soon as it shows without a matching response,
+        instead of polling the log for the whole results_timeout.
+        """
+        log = [log_entry("Network.responseReceived", "https://www.aa.com/booking/api/other", "9")]
+        driver = CapturingDriver([synthetic_results_page(3)], log, {})
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", extraction="network",
+                                   driver_factory=lambda: driver, results_timeout=30, settle_time=0)
+
+        start = time.monotonic()
+        self.assertEqual(len(flights_data.search()), 3)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertLess(flights_data.timings["network_capture"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=3)
@@ -0,0 +1,90 @@
+'''
+This is the test file for output_manager.py.
+
+Classes:
+    Test_OutputManager
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import os
+import tempfile
+import time
+import unittest
+from exporters import atomic_path
+from output_manager import OutputManager, STALE_TEMP_SECONDS
+
+FLIGHTS_DICT = {1: {"flight_numbers": ["AA 100"], "departure_time": "6:00 AM", "main_cabin_price": "$179"}}
+
+
+class Test_OutputManager(unittest.TestCase):
+    """
+    Test for OutputManager class and atomic_path in output_manager/exporters.
+    """
+
+    def setUp(self):
+        """
+        A manager writing under a temporary directory.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = OutputManager(os.path.join(self.directory.name, "exports"))
+
+    def tearDown(self):
+        """
+        Remove the output files.
+        """
+        self.directory.cleanup()
+
+    def test_unique_paths(self):
+        """
+        Test searches of the same route on different dates get different files,
+        and the same search in another date format gets the same file.
+        """
+        first = self.manager.export(FLIGHTS_DICT, "JFK", "SFO", "2023-05-10", "2023-05-15")
+        second = self.manager.export(FLIGHTS_DICT, "JFK", "SFO", "2023-05-11", "2023-05-15", "jsonl")
+        self.assertEqual(os.path.basename(first), "JFKtoSFO_2023-05-10_2023-05-15.csv")
+        self.assertEqual(os.path.basename(second), "JFKtoSFO_2023-05-11_2023-05-15.jsonl")
+        self.assertEqual(self.manager.path_for("jfk", "sfo", "05/10/2023", "05/15/2023"), first)
+        self.assertEqual(os.path.basename(self.manager.path_for("../JFK", "SFO", "2023-05-10")),
+                         "JFKtoSFO_2023-05-10.csv")
+        self.assertEqual(self.manager.stats()["files"], 2)
+
+    def test_atomic_path(self):
+        """
+        Test a failed write leaves the previous file untouched and no temporary file.
+        """
+        path = os.path.join(self.directory.name, "flights.csv")
+        with open(path, "w") as file:
+            file.write("previous")
+        with self.assertRaises(RuntimeError):
+            with atomic_path(path) as tmp_path:
+                with open(tmp_path, "w") as file:
+                    file.write("half")
+                raise RuntimeError("scrape failed")
+
+        with open(path) as file:
+            self.assertEqual(file.read(), "previous")
+        self.assertEqual(os.listdir(self.directory.name), ["flights.csv"])
+
+    def test_cleanup_quotas(self):
+        """
+        Test cleanup deletes files past the age quota, then the oldest files
+        beyond the size quota, and stale temporary files.
+        """
+        paths = [self.manager.export(FLIGHTS_DICT, "JFK", "SFO", f"2023-05-1{day}") for day in range(4)]
+        now = time.time()
+        for age, path in zip((7200, 300, 200, 100), paths):
+            os.utime(path, (now - age, now - age))
+        stale = os.path.join(self.manager.directory, ".old.csv.abc.tmp")
+        open(stale, "w").close()
+        os.utime(stale, (now - STALE_TEMP_SECONDS - 1,) * 2)
+
+        self.manager.max_age = 3600
+        self.manager.max_bytes = os.path.getsize(paths[0]) * 2
+        self.assertEqual(self.manager.cleanup(), 3)
+        self.assertEqual([path for _, _, path in self.manager.files()], paths[2:])
+        self.assertFalse(os.path.exists(stale))
+
+
+if __name__ == "__main__":
+    unittest.main()
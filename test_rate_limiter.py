@@ -0,0 +1,51 @@
+'''
+This is the test file for rate_limiter.py.
+
+Classes:
+    Test_RateLimiter
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import time
+import unittest
+from rate_limiter import RateLimiter
+
+
+class Test_RateLimiter(unittest.TestCase):
+    """
+    Test for RateLimiter class in rate_limiter.
+    """
+
+    def test_first_call_does_not_wait(self):
+        """
+        Test the first search starts right away.
+        """
+        limiter = RateLimiter(min_interval=10)
+        self.assertEqual(limiter.wait(), 0)
+
+    def test_spaces_out_calls(self):
+        """
+        Test consecutive searches are spaced by min_interval plus jitter.
+        """
+        limiter = RateLimiter(min_interval=0.05, jitter=0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait()
+        elapsed = time.monotonic() - start
+
+        self.assertTrue(0.1 <= elapsed <= 0.5)
+
+    def test_timeout(self):
+        """
+        Test a caller that cannot wait for the next slot fails without taking it.
+        """
+        limiter = RateLimiter(min_interval=0.2)
+        limiter.wait()
+        with self.assertRaises(TimeoutError):
+            limiter.wait(timeout=0.01)
+        self.assertLess(limiter.wait(), 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+'''
+This is the test file for replay.py: FlightsData runs complete searches
+against recorded pages, without Chrome or the network.
+
+Classes:
+    Test_Replay
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from replay import (RecordingDriver, ReplayDriver, load_snapshots, save_snapshots,
+                    synthetic_card, synthetic_page, synthetic_results_page)
+from driver_pool import DriverPool
+from web_scraper import FlightsData, RESULTS_GRID_SELECTOR
+
+
+def scroll_pages(cards, window):
+    """
+    Build the successive pages of a virtual list showing `window` cards at a
+    time, each scroll moving half a window.
+    """
+    return [synthetic_page(cards[start:start + window])
+            for start in range(0, max(len(cards) - window, 0) + 1, max(window // 2, 1))]
+
+
+class Test_Replay(unittest.TestCase):
+    """
+    Test the recording and replay backend.
+    """
+
+    def setUp(self):
+        """
+        Ten distinct flight cards.
+        """
+        self.cards = [synthetic_card([f"AA {number}"], "6:00 AM", "8:05 AM", "5h 5m", ["$99", "$179", "$529"])
+                      for number in range(10)]
+
+    @patch("web_scraper.time.sleep")
+    def test_replayed_search(self, mock_sleep):
+        """
+        Test a whole search (form, results wait, scrolling, extraction) runs on recorded pages.
+        """
+        driver = ReplayDriver(scroll_pages(self.cards, window=4))
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023",
+                                   driver_factory=lambda: driver, settle_time=0, direct_search=False)
+
+        flights_dict = flights_data.search()
+
+        self.assertEqual([flight["flight_numbers"] for flight in flights_dict.values()],
+                         [[f"AA {number}"] for number in range(10)])
+        self.assertEqual(driver.form_values["aa-leavingOn"], "05/10/2023")
+        self.assertTrue(driver.quit_called)
+
+    @patch("web_scraper.time.sleep")
+    def test_direct_search_url(self, mock_sleep):
+        """
+        Test a search opens its results from the search URL without the form,
+        and falls back to the form when the URL shows no flight card.
+        """
+        driver = ReplayDriver(scroll_pages(self.cards, window=4))
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023",
+                                   driver_factory=lambda: driver, settle_time=0)
+
+        self.assertEqual(len(flights_data.search()), 10)
+        self.assertTrue(driver.current_url.startswith("https://www.aa.com/booking/search?"))
+        self.assertIn("type=RoundTrip", driver.current_url)
+        self.assertIn("%22date%22%3A%222023-05-15%22", driver.current_url)
+        self.assertEqual(driver.form_values, {})
+        self.assertNotIn("fill_form", flights_data.timings)
+
+        one_way = FlightsData("JFK", "SFO", "05/10/2023", driver_factory=lambda: driver)
+        self.assertIn("type=OneWay", one_way.search_url())
+
+        driver = ReplayDriver(["<html></html>", synthetic_results_page(3)])
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023",
+                                   driver_factory=lambda: driver, direct_timeout=0, results_timeout=0)
+        self.assertFalse(flights_data.open_search_url())
+        with patch.object(FlightsData, "open_search_url", return_value=False), \
+                patch.object(FlightsData, "scrape_results", return_value={}):
+            flights_data.search()
+        self.assertEqual(driver.form_values["aa-leavingOn"], "05/10/2023")
+        self.assertIn("fill_form", flights_data.timings)
+
+    @patch("web_scraper.time.sleep")
+    def test_deadline(self, mock_sleep):
+        """
+        Test a search with a deadline bounds its page loads by it, and a
+        cancelled search raises TimeoutError instead of scraping.
+        """
+        driver = ReplayDriver(scroll_pages(self.cards, window=4))
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023",
+                                   driver_factory=lambda: driver, settle_time=0, deadline=30)
+
+        self.assertEqual(len(flights_data.search()), 10)
+        self.assertTrue(0 < driver.page_load_timeout <= 30)
+        self.assertIsNone(flights_data.deadline_at)
+
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023",
+                                   driver_factory=lambda: ReplayDriver([synthetic_results_page(3)]), deadline=30)
+        flights_data.cancel()
+        with self.assertRaises(TimeoutError):
+            flights_data.search()
+
+    @patch("web_scraper.time.sleep")
+    def test_cancel_pooled_search(self, mock_sleep):
+        """
+        Test cancelling a search quits its pooled driver and has the pool replace it,
+        while a cancel after the search leaves the returned driver alone.
+        """
+        drivers = []
+
+        def new_driver():
+            drivers.append(ReplayDriver([synthetic_results_page(3)]))
+            return drivers[-1]
+
+        pool = DriverPool(new_driver, size=1)
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", driver_pool=pool, settle_time=0)
+        with patch.object(pool, "release", wraps=pool.release) as mock_release:
+            self.assertEqual(len(flights_data.search()), 3)
+            flights_data.cancel()
+            self.assertEqual(mock_release.call_args.kwargs, {"discard": False})
+
+            flights_data = FlightsData("JFK", "SFO", "05/10/2023", "05/15/2023", driver_pool=pool, settle_time=0)
+            open_search_url = flights_data.open_search_url
+
+            def cancelled_open_search_url():
+                flights_data.cancel()
+                return open_search_url()
+
+            with patch.object(flights_data, "open_search_url", side_effect=cancelled_open_search_url):
+                with self.assertRaises(TimeoutError):
+                    flights_data.search()
+            self.assertEqual(mock_release.call_args.kwargs, {"discard": True})
+        self.assertTrue(drivers[-1].quit_called)
+        pool.shutdown()
+
+    def test_webdriver_and_snapshot_extraction_agree(self):
+        """
+        Test the WebDriver extraction and the snapshot extraction read the same flights.
+        """
+        driver = ReplayDriver([synthetic_results_page(25, seed=3)])
+        flights_data = FlightsData("JFK", "SFO", "05/10/2023", driver_factory=lambda: driver)
+
+        by_webdriver = flights_data.page_scrape(driver.find_elements("css selector", RESULTS_GRID_SELECTOR))
+        self.assertEqual(len(by_webdriver), 25)
+        self.assertEqual(by_webdriver, flights_data.page_scrape_snapshot())
+
+    def test_record_and_load(self):
+        """
+        Test RecordingDriver saves each new page once, and the snapshots load back in order.
+        """
+        live = MagicMock()
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = RecordingDriver(live, directory)
+            for page in ("<p>1</p>", "<p>1</p>", "<p>2</p>"):
+                live.page_source = page
+                self.assertEqual(recorder.page_source, page)
+            recorder.get("https://www.aa.com")
+            live.get.assert_called_once_with("https://www.aa.com")
+
+            self.assertEqual(load_snapshots(directory), ["<p>1</p>", "<p>2</p>"])
+            save_snapshots(["<p>3</p>"], os.path.join(directory, "other"))
+            self.assertEqual(ReplayDriver.from_directory(os.path.join(directory, "other")).page_source, "<p>3</p>")
+        with self.assertRaises(FileNotFoundError):
+            load_snapshots(directory)
+
+    def test_synthetic_page(self):
+        """
+        Test synthetic pages are reproducible and hold the requested number of cards.
+        """
+        self.assertEqual(synthetic_results_page(50, seed=1), synthetic_results_page(50, seed=1))
+        driver = ReplayDriver([synthetic_results_page(50, seed=1)])
+        self.assertEqual(len(driver.find_elements("css selector", RESULTS_GRID_SELECTOR)), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
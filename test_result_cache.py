@@ -0,0 +1,79 @@
+'''
+This is the test file for result_cache.py.
+
+Classes:
+    Test_ResultCache
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import tempfile
+import time
+import unittest
+from result_cache import ResultCache, make_cache_key
+
+
+class Test_ResultCache(unittest.TestCase):
+    """
+    Test for make_cache_key and the ResultCache class in result_cache.
+    """
+
+    def test_make_cache_key(self):
+        """
+        Test equivalent searches share one normalized key.
+        """
+        key1 = make_cache_key("jfk ", "sfo", "2023-05-10", "2023-05-15")
+        key2 = make_cache_key("JFK", "SFO", "05/10/2023", "05/15/2023", "Round  Trip")
+        self.assertEqual(key1, key2)
+        self.assertEqual(key1, ("JFK", "SFO", "2023-05-10", "2023-05-15", "round trip"))
+
+        with self.assertRaises(ValueError):
+            make_cache_key("JFK", "SFO", "tomorrow")
+
+    def test_hit_miss_and_ttl(self):
+        """
+        Test hits, misses and expiration of stale entries.
+        """
+        cache = ResultCache(ttl=0.05)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", ["flight"])
+        self.assertEqual(cache.get("key"), ["flight"])
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("key"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 2, 1))
+
+    def test_lru_eviction(self):
+        """
+        Test the least recently used entry is evicted by count and by size.
+        """
+        cache = ResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        cache = ResultCache(max_bytes=150)
+        cache.set("a", "x" * 100)
+        cache.set("b", "y" * 100)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_disk_backend(self):
+        """
+        Test entries on disk are loaded by a new cache (after a restart).
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            key = make_cache_key("JFK", "SFO", "2023-05-10", "2023-05-15")
+            ResultCache(directory=directory).set(key, (["h"], [["r"]]))
+
+            restarted = ResultCache(directory=directory)
+            self.assertEqual(restarted.get(key), (["h"], [["r"]]))
+
+
+if __name__ == "__main__":
+    unittest.main()
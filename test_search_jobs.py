@@ -0,0 +1,109 @@
+'''
+This is the test file for search_jobs.py. A fake search function stands in
+for the real scraper.
+
+Classes:
+    Test_SearchJobManager
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import threading
+import time
+import unittest
+from search_jobs import SearchJob, SearchJobManager, QueueFullError
+
+
+def wait_until_finished(job, timeout=2):
+    """
+    Poll a job until it is done or failed.
+    """
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class Test_SearchJobManager(unittest.TestCase):
+    """
+    Test for SearchJobManager class in search_jobs.
+    """
+
+    def test_job_result(self):
+        """
+        Test a submitted job runs in the background and keeps its result.
+        """
+        manager = SearchJobManager(lambda depart, arrive: f"{depart}-{arrive}")
+        job = manager.submit(depart="JFK", arrive="SFO")
+        wait_until_finished(job)
+
+        self.assertIs(manager.get(job.id), job)
+        self.assertEqual(job.status, SearchJob.DONE)
+        self.assertEqual(job.result, "JFK-SFO")
+        manager.shutdown()
+
+    def test_job_failure(self):
+        """
+        Test an exception in the search marks the job as failed.
+        """
+        def broken_search():
+            raise ValueError("no flights")
+
+        manager = SearchJobManager(broken_search)
+        job = manager.submit()
+        wait_until_finished(job)
+
+        self.assertEqual(job.status, SearchJob.FAILED)
+        self.assertEqual(job.error, "no flights")
+        manager.shutdown()
+
+    def test_stream_events(self):
+        """
+        Test the search function can stream events that readers wait for,
+        ending with the final status of the job.
+        """
+        def streaming_search(depart, on_event):
+            on_event("flight", {"flight_id": 1})
+            return depart
+
+        manager = SearchJobManager(streaming_search, stream_events=True)
+        job = manager.submit(depart="JFK")
+        wait_until_finished(job)
+
+        events = job.wait_events(0, timeout=1)
+        self.assertEqual([event for event, _ in events], ["status", "flight", "status"])
+        self.assertEqual(events[1][1], {"flight_id": 1})
+        self.assertEqual(events[-1][1]["status"], SearchJob.DONE)
+        self.assertEqual(job.wait_events(len(events), timeout=0.01), [])
+        manager.shutdown()
+
+    def test_queue_limit(self):
+        """
+        Test submissions are rejected once max_queue jobs are waiting.
+        """
+        release = threading.Event()
+        manager = SearchJobManager(lambda: release.wait(), max_workers=1, max_queue=1)
+        running = manager.submit()
+        while running.status != SearchJob.RUNNING:
+            time.sleep(0.01)
+        manager.submit()
+
+        with self.assertRaises(QueueFullError):
+            manager.submit()
+        release.set()
+        manager.shutdown(wait=True)
+
+    def test_ttl(self):
+        """
+        Test finished jobs are forgotten after the TTL.
+        """
+        manager = SearchJobManager(lambda: None, job_ttl=0)
+        job = manager.submit()
+        wait_until_finished(job)
+        time.sleep(0.01)
+
+        self.assertIsNone(manager.get(job.id))
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+'''
+This is the test file for single_flight.py.
+
+Classes:
+    Test_SingleFlight
+
+NAME: Xiaoti Hu
+SEMESTER: 2023 Spring
+'''
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+
+
+class Test_SingleFlight(unittest.TestCase):
+    """
+    Test for SingleFlight class in single_flight.
+    """
+
+    def test_coalesces_identical_calls(self):
+        """
+        Test concurrent calls with the same key run the function once.
+        """
+        group = SingleFlight()
+        calls = []
+
+        def slow_search(route):
+            calls.append(route)
+            time.sleep(0.1)
+            return f"flights for {route}"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(group.do, "JFK-SFO", slow_search, "JFK-SFO") for _ in range(5)]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(calls, ["JFK-SFO"])
+        self.assertEqual(results, ["flights for JFK-SFO"] * 5)
+        self.assertEqual(group.coalesced, 4)
+        self.assertEqual(group.in_flight(), 0)
+
+    def test_shares_errors_and_forgets_key(self):
+        """
+        Test waiting callers get the same error and later calls run again.
+        """
+        group = SingleFlight()
+        started = threading.Event()
+
+        def failing_search():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("chrome crashed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(group.do, "key", failing_search)
+            started.wait()
+            follower = executor.submit(group.do, "key", failing_search)
+            for future in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+        self.assertEqual(group.do("key", lambda: "retried"), "retried")
+
+    def test_shares_base_exceptions(self):
+        """
+        Test waiting callers see a SystemExit of the shared call instead of a None result.
+        """
+        group = SingleFlight()
+        started = threading.Event()
+
+        def exiting_search():
+            started.set()
+            time.sleep(0.05)
+            raise SystemExit(1)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(group.do, "key", exiting_search)
+            started.wait()
+            follower = executor.submit(group.do, "key", exiting_search)
+            for future in (leader, follower):
+                with self.assertRaises(SystemExit):
+                    future.result()
+        self.assertEqual(group.coalesced, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
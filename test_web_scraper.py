@@ -10,25 +10,40 @@ Classes:
 NAME: Xiaoti Hu
 SEMESTER: 2023 Spring
 '''
+import csv
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch, mock_open
-from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
-from unittest.mock import PropertyMock
-from web_scraper import FlightsData, DataExport
+from replay import ReplayDriver, synthetic_card, synthetic_page
+from web_scraper import FlightsData, DataExport, ResultsSettled
 import time
 
 
+def replay_flights_data(*pages):
+    """
+    Build a FlightsData for JFK-SFO on a ReplayDriver serving `pages`, instead of a real Chrome.
+    """
+    driver = ReplayDriver(pages or ["<html></html>"])
+    return FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15", driver_factory=lambda: driver)
+
+
+CARD_1 = synthetic_card(["AA 100"], "6:00 AM", "8:05 AM", "5h 5m", ["$129", "$179", "$529"])
+CARD_2 = synthetic_card(["AA 2", "AA 1441"], "1:10 PM", "6:45 PM", "8h 35m", ["$249", "$699"])
+CARD_3 = synthetic_card(["AA 7"], "9:00 PM", "11:59 PM", "5h 59m", ["$99", "$149", "$499"])
+RESULTS_PAGE = synthetic_page([CARD_1, CARD_2])
+
+
 class Test_FlightsData(unittest.TestCase):
     """
     Test for FlightsData class in the web_scraper.
 
-    Please note that page_scrape/run/get_flight_cards are
-    higher-level functions which combine multiple operations
-    and interaction with actual flight website. Testing these
-    functions require more libraries/ packages.
-    A better option is checking these function while running program.
+    The tests run on recorded or synthetic pages served by a ReplayDriver
+    (see replay.py), so they do not need Chrome; whole searches are tested
+    in test_replay.py.
     """
 
     def test_init(self):
@@ -36,17 +51,19 @@ class Test_FlightsData(unittest.TestCase):
         Test the __init__ in FlightsData class.
         """
         #Test 1
-        flights_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
+        flights_data1 = replay_flights_data()
 
         self.assertEqual(flights_data1.depart, "JFK")
         self.assertEqual(flights_data1.arrive, "SFO")
         self.assertEqual(flights_data1.departure_date, "2023-05-10")
         self.assertEqual(flights_data1.return_date, "2023-05-15")
-        self.assertIsInstance(flights_data1.driver, webdriver.Chrome)
+        self.assertIsInstance(flights_data1.driver, ReplayDriver)
         self.assertIsNotNone(flights_data1.wait)
+        self.assertIn("driver_startup", flights_data1.timings)
 
         # Test 2
-        flights_data2 = FlightsData("LAX", "ORD", "2023-08-20", "2023-08-23")
+        flights_data2 = FlightsData("LAX", "ORD", "2023-08-20", "2023-08-23",
+                                    driver_factory=lambda: ReplayDriver(["<html></html>"]))
 
         self.assertEqual(flights_data2.depart, "LAX")
         self.assertEqual(flights_data2.arrive, "ORD")
@@ -58,7 +75,7 @@ class Test_FlightsData(unittest.TestCase):
         """
         Test setup_driver by mock webdriver.Chrome.
         """
-        flights_data1 = FlightsData("SFO", "JFK", "2023-08-17", "2023-08-24")
+        flights_data1 = replay_flights_data()
         # Call the setup_driver function
         driver = flights_data1.setup_driver()
 
@@ -72,11 +89,29 @@ class Test_FlightsData(unittest.TestCase):
         # Check if the function returns the correct driver instance
         self.assertEqual(driver, mock_chrome.return_value)
 
+    @patch('web_scraper.webdriver.Chrome')
+    def test_setup_driver_lean(self, mock_chrome):
+        """
+        Test the lean profile runs headless, without images, and blocks fonts and trackers.
+        """
+        driver = FlightsData.setup_driver("lean")
+
+        options = mock_chrome.call_args.kwargs['options']
+        self.assertIn('--headless=new', options.arguments)
+        self.assertIn('--disable-gpu', options.arguments)
+        self.assertNotIn('--window-size=1920,1080', options.arguments)
+        self.assertEqual(options.experimental_options["prefs"]["profile.managed_default_content_settings.images"], 2)
+        blocked = driver.execute_cdp_cmd.call_args.args[1]["urls"]
+        self.assertIn("*.woff*", blocked)
+        self.assertIn("*://*google-analytics.com/*", blocked)
+        with self.assertRaises(ValueError):
+            FlightsData.setup_driver("tiny")
+
     def test_random_sleep(self):
         """
         Test the random_sleep for certain duration within defined range.
         """
-        flights_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
+        flights_data1 = replay_flights_data()
         min_sec = 1
         max_sec = 3
 
@@ -90,7 +125,7 @@ class Test_FlightsData(unittest.TestCase):
         """
         Test get_price returns the correct prices.
         """
-        flight_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
+        flight_data1 = replay_flights_data()
 
         # Test by mocked prices
         mock_prices = [MagicMock(text="$100"), MagicMock(text="$200"), MagicMock(text="$300")]
@@ -100,15 +135,16 @@ class Test_FlightsData(unittest.TestCase):
         # Test with an invalid index out of range
         self.assertEqual(flight_data1.get_price(mock_prices, 5), "N/A")
 
-    @patch("web_scraper.WebDriverWait")
-    @patch("web_scraper.webdriver.Chrome")
-    def test_fill_form(self, mock_chrome, mock_wait):
+    def test_fill_form(self):
         """
-        Test the fill_form with a mocked webdriver.Chrome and WebDriverWait.
+        Test the fill_form on a replayed page, and with a mocked driver.
         """
-        flights_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
+        flights_data1 = replay_flights_data()
+        flights_data1.fill_form("aa-leavingOn", "05/10/2023")
+        self.assertEqual(flights_data1.driver.form_values, {"aa-leavingOn": "05/10/2023"})
+
+        mock_chrome = MagicMock()
         flights_data1.driver = mock_chrome
-        flights_data1.wait = mock_wait
 
         # create a MagicMock object to replace the various attributes
         mock_input = MagicMock()
@@ -137,12 +173,95 @@ class Test_FlightsData(unittest.TestCase):
         # Assert that the mock was called exactly once
         mock_input.clear.assert_called_once()
 
+    def test_wait_for_results(self):
+        """
+        Test wait_for_results returns once the card count stops changing,
+        and times out when no card ever shows up.
+        """
+        flights_data1 = replay_flights_data(synthetic_page([CARD_1, CARD_2, CARD_3]))
+
+        result = flights_data1.wait_for_results(timeout=5, settle_time=0.02, poll_frequency=0.01)
+        self.assertEqual(len(result), 3)
+
+        flights_data1 = replay_flights_data()
+        with self.assertRaises(TimeoutException):
+            flights_data1.wait_for_results(timeout=0.05, settle_time=0.01, poll_frequency=0.01)
+
+    def test_results_settled(self):
+        """
+        Test the ResultsSettled condition restarts its window when the grid grows.
+        """
+        driver = MagicMock()
+        condition = ResultsSettled("div.card", settle_time=0)
+
+        driver.find_elements.return_value = []
+        self.assertFalse(condition(driver))
+        driver.find_elements.return_value = ["card"]
+        self.assertFalse(condition(driver))
+        self.assertEqual(condition(driver), ["card"])
+
+    def test_page_scrape_snapshot(self):
+        """
+        Test page_scrape_snapshot parses every card of one page source
+        into the page_scrape format.
+        """
+        flights_data1 = replay_flights_data(RESULTS_PAGE)
+
+        result = flights_data1.page_scrape_snapshot()
+
+        self.assertEqual(result, {
+            1: {"flight_numbers": ["AA 100"], "departure_time": "6:00 AM", "arrival_time": "8:05 AM",
+                "duration": "5h 5m", "stops": 0, "basic_economy_price": "$129", "main_cabin_price": "$179",
+                "first_class_price": "$529", "fare_classes": ["Basic Economy", "Main Cabin", "First Class"]},
+            2: {"flight_numbers": ["AA 2", "AA 1441"], "departure_time": "1:10 PM", "arrival_time": "6:45 PM",
+                "duration": "8h 35m", "stops": 1, "basic_economy_price": "N/A", "main_cabin_price": "$249",
+                "first_class_price": "$699", "fare_classes": ["Main Cabin", "First Class"]},
+        })
+        self.assertEqual(flights_data1.page_scrape_snapshot("<html></html>"), {})
+
+    def test_parse_page(self):
+        """
+        Test parse_page keeps only the results container and parses a page source once.
+        """
+        flights_data1 = replay_flights_data("<div id='header'>AA</div>" + RESULTS_PAGE)
+
+        bs = flights_data1.parse_page()
+        self.assertIsNone(bs.find(id="header"))
+        self.assertEqual(len(flights_data1.extract_info("flt-times-sm")), 4)
+        self.assertEqual(len(flights_data1.page_scrape_snapshot()), 2)
+        # the same snapshot is not parsed again
+        self.assertIs(flights_data1.parse_page(), bs)
+
+        # a page without the results container is parsed whole
+        self.assertEqual(flights_data1.parse_page("<p class='x'>home</p>").p.text, "home")
+
+    @patch("web_scraper.time.sleep")
+    def test_harvest_flights(self, mock_sleep):
+        """
+        Test harvest_flights scrolls the virtual list, keeps only new flights
+        and stops at the end of the list.
+        """
+        # each scroll renders a window of the list, overlapping the previous one
+        flights_data1 = replay_flights_data(synthetic_page([CARD_1, CARD_2]), synthetic_page([CARD_2, CARD_3]))
+        driver = flights_data1.driver
+
+        events = []
+        flights_data1.on_event = lambda event, data: events.append((event, data["flight_id"]))
+        result = flights_data1.harvest_flights()
+
+        self.assertEqual([flight["flight_numbers"] for flight in result.values()],
+                         [["AA 100"], ["AA 2", "AA 1441"], ["AA 7"]])
+        self.assertEqual(list(result), [1, 2, 3])
+        # every new flight is reported once, as soon as it is parsed
+        self.assertEqual(events, [("flight", 1), ("flight", 2), ("flight", 3)])
+        self.assertEqual(driver.index, len(driver.pages) - 1)
+
     def test_process_prices(self):
         """
         Test process_prices and see if function can get price in
         specific location and present "N/A" if not catch any info.
         """
-        flight_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
+        flight_data1 = replay_flights_data()
 
         # test 3 prices all existing
         mock_price1 = [MagicMock(text="$100"), MagicMock(text="$200"), MagicMock(text="$300")]
@@ -170,8 +289,6 @@ class Test_FlightsData(unittest.TestCase):
         Test 2 functions extract_info and find_text together
         with a simple HTML string.
         """
-        flights_data1 = FlightsData("JFK", "SFO", "2023-05-10", "2023-05-15")
-
         html_test = """
         <html>
             <body>
@@ -187,15 +304,13 @@ class Test_FlightsData(unittest.TestCase):
         self.assertEqual(result, "Test 1")
 
         # test for extract_info
-        with patch.object(webdriver.Chrome, "page_source", new_callable=PropertyMock) as mock_page_source:
-            mock_page_source.return_value = html_test
-
-            class_name = "test-class"
-            result = flights_data1.extract_info(class_name)
+        flights_data1 = replay_flights_data(html_test)
+        class_name = "test-class"
+        result = flights_data1.extract_info(class_name)
 
-            self.assertEqual(len(result), 2)
-            self.assertEqual(result[0].text.strip(), "Test 1")
-            self.assertEqual(result[1].text.strip(), "Test 2")
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].text.strip(), "Test 1")
+        self.assertEqual(result[1].text.strip(), "Test 2")
 
 
 class Test_DataExport(unittest.TestCase):
@@ -232,11 +347,16 @@ class Test_DataExport(unittest.TestCase):
 
     def test_export_to_csv(self):
         """
-        Test if the export_to_csv supported by DataFrame works as expected.
+        Test if export_to_csv writes one row per flight, with the search airports.
         """
-        with patch("pandas.DataFrame.to_csv") as mock_to_csv:
-            self.data_export.export_to_csv()
-            mock_to_csv.assert_called_once()
+        with tempfile.TemporaryDirectory() as directory:
+            self.data_export.file_name = os.path.join(directory, "test_file.csv")
+            self.assertEqual(self.data_export.export_to_csv(), self.data_export.file_name)
+            with open(self.data_export.file_name, newline='', encoding='utf-8-sig') as file:
+                rows = list(csv.DictReader(file))
+        self.assertEqual([row["departure_time"] for row in rows], ["6:00 AM", "2:00 PM"])
+        self.assertEqual([row["main_cabin_price"] for row in rows], ["$100", "$220"])
+        self.assertEqual(rows[0]["depart"], "LAX")
 
     def test_export_to_txt(self):
         """
@@ -1,8 +1,10 @@
 '''
 This Python file scrapes American Airlines flight data for a specified travel
-airports and dates, exporting data to a CSV or TXT file.
+airports and dates, exporting data to a file (CSV, JSON Lines, Parquet,
+Arrow, see exporters.py) or a TXT summary.
 
 Classes:
+    ResultsSettled
     FlightsData
     DataExport
 
@@ -11,30 +13,125 @@ SEMESTER: 2023 Spring
 '''
 
 import time
+import json
+import importlib.util
 import logging
 import random
+import threading
+import argparse
+from urllib.parse import urlencode
+from contextlib import contextmanager
 
-# Selenuim imports
+# Selenuim imports (selenium.webdriver itself loads Chrome support on first use)
 from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 # Other tools for web data scraping
-# pandas for csv exporting, beautifulsoup for data scrape
-import pandas as pd
-from bs4 import BeautifulSoup
+# exporters for the output files
+from exporters import export_flights
+from output_manager import OutputManager
+from network_capture import wait_for_payload, flights_from_payload
+from result_cache import normalize_date
+
+
+# The home page with the search form, and the results page a search URL opens directly
+HOME_URL = "https://www.aa.com/homePage.do"
+SEARCH_URL = "https://www.aa.com/booking/search"
+
+# lxml parses pages faster than the built-in parser, when installed
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# Only the results container is parsed, the rest of the page is never read
+RESULTS_CONTAINER_ID = "aa-content"
+
+# Chrome profiles of setup_driver: "default" is a regular desktop browser,
+# "lean" is headless and does not load what page_scrape never reads
+BROWSER_PROFILES = ("default", "lean")
+
+# The user agent of both profiles (headless Chrome would otherwise announce itself)
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/58.0.3029.110 Safari/537.36')
+
+# URL patterns the lean profile does not download: images, media and fonts
+BLOCKED_RESOURCE_PATTERNS = ("*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*",
+                             "*.mp4*", "*.webm*", "*.mp3*", "*.woff*", "*.ttf*", "*.otf*", "*.eot*")
+
+# Third-party ad, analytics and session-replay domains the lean profile does not contact
+BLOCKED_DOMAINS = ("doubleclick.net", "google-analytics.com", "googletagmanager.com", "googlesyndication.com",
+                   "googleadservices.com", "facebook.net", "facebook.com", "bing.com", "adobedtm.com",
+                   "demdex.net", "omtrdc.net", "everesttech.net", "quantummetric.com", "hotjar.com",
+                   "criteo.com", "tiktok.com", "nr-data.net", "qualtrics.com")
+
+# CSS selector of the flight cards inside the results grid
+RESULTS_GRID_SELECTOR = ("#aa-content > div > app-results-grid-desktop > div > virtual-scroller"
+                         " > div.scrollable-content > div.results-grid-container > div")
+
+# The virtual list that only renders the cards in the viewport
+SCROLLER_SELECTOR = "#aa-content > div > app-results-grid-desktop > div > virtual-scroller"
+
+# Scrolls the virtual list (or the page, if the list does not scroll itself)
+# by one step and returns true once it cannot move any further
+SCROLL_SCRIPT = """
+const scroller = document.querySelector(arguments[0]);
+const target = scroller && scroller.scrollHeight > scroller.clientHeight ? scroller : document.scrollingElement;
+const step = arguments[1] || target.clientHeight;
+const before = target.scrollTop;
+target.scrollTop = before + step;
+return target.scrollTop === before;
+"""
+
+# Cabins in the order their prices appear on a flight card, as
+# (key prefix in the flights dictionary, name shown to users)
+CABINS = (
+    ("basic_economy", "Basic Economy"),
+    ("main_cabin", "Main Cabin"),
+    ("first_class", "First Class"),
+)
+
+# CSS selectors of the fields inside a flight card, shared by the WebDriver
+# and the page-snapshot extraction
+ORIGIN_SELECTOR = "div.cell.large-3.origin"
+DESTINATION_SELECTOR = "div.cell.large-3.destination"
+DURATION_CELL_SELECTOR = "div.cell.large-4.pad-left-sm"
+PRICE_CELL_SELECTOR = "app-choose-flights-price-desktop"
+FLIGHT_NUMBER_SELECTOR = "span.connecting-flt-details.flight-number"
+TIME_SELECTOR = "div.flt-times-sm"
+DURATION_SELECTOR = "div.duration"
+PRICE_SELECTOR = "span.per-pax-amount.ng-star-inserted"
+
+
+class ResultsSettled:
+    """
+    An expected condition for WebDriverWait: the results grid is present and
+    its number of flight cards has not changed for `settle_time` seconds.
+    """
 
-# Define variables for origin, destination, and airline
-# (for future customization)
-global depart, arrive, departure_date, return_date, airline
+    def __init__(self, selector, settle_time):
+        """
+        Args:
+            selector (str): CSS selector of the flight cards.
+            settle_time (float): Seconds the card count must stay the same.
+        """
+        self.selector = selector
+        self.settle_time = settle_time
+        self._count = None
+        self._since = None
 
-'''
-depart = "SJC"
-arrive = "LAS"
-departure_date = "08/25/2023"
-return_date = "09/01/2023"
-'''
+    def __call__(self, driver):
+        """
+        Returns: list: The flight card elements once settled, otherwise False.
+        """
+        cards = driver.find_elements(By.CSS_SELECTOR, self.selector)
+        now = time.monotonic()
+        if len(cards) != self._count:
+            # the grid is still growing (or not there yet), restart the settle window
+            self._count = len(cards)
+            self._since = now
+            return False
+        if cards and now - self._since >= self.settle_time:
+            return cards
+        return False
 
 
 class FlightsData:
@@ -46,7 +143,11 @@ class FlightsData:
 
     def __init__(self, depart, arrive,
                  departure_date, return_date=None,
-                 trip_type="round trip", airline="AmericanAirline"):
+                 trip_type="round trip", airline="AmericanAirline",
+                 driver_pool=None, rate_limiter=None,
+                 results_timeout=60, settle_time=2.0, extraction="snapshot",
+                 max_scrolls=40, on_event=None, driver_factory=None,
+                 direct_search=True, direct_timeout=15, browser_profile="default", deadline=None):
         """
             Initializes the FlightsData class with the provided input data.
 
@@ -57,6 +158,32 @@ class FlightsData:
                 return_date (str, optional): The return date in MM/DD/YYYY format. Defaults to None.
                 trip_type (str, optional): The type of trip ("round trip" or "one way"). Defaults to "round trip".
                 airline (str, optional): The airline to scrape data for. Defaults to "AmericanAirline".
+                driver_pool (DriverPool, optional): Pool to borrow a warmed-up driver from while run()
+                            is searching. Defaults to None (start a dedicated Chrome now).
+                rate_limiter (RateLimiter, optional): Paces the start of searches. Defaults to None (no pacing).
+                results_timeout (float, optional): Overall seconds to wait for the results grid. Defaults to 60.
+                settle_time (float, optional): Seconds the number of flight cards must stay the same
+                            before the results are scraped. Defaults to 2.
+                extraction (str, optional): "snapshot" parses one copy of the page locally,
+                            "webdriver" queries every card field through WebDriver, "network" reads
+                            the results XHR from the performance log (see network_capture.py) and
+                            falls back to "snapshot" without it. Defaults to "snapshot".
+                max_scrolls (int, optional): Maximum scroll steps through the results list in
+                            snapshot mode. Defaults to 40.
+                on_event (callable, optional): Called with (event, data) while searching: a "phase"
+                            event when each phase starts and ends, and a "flight" event as soon
+                            as each flight is scraped. Defaults to None.
+                driver_factory (callable, optional): Creates the driver when no pool is given, e.g. a
+                            replay.ReplayDriver serving recorded pages. Defaults to setup_driver (Chrome).
+                direct_search (bool, optional): Open the results page straight from a search URL, and
+                            only fill the home page form if that fails. Defaults to True.
+                direct_timeout (float, optional): Seconds the search URL has to show a flight card
+                            before falling back to the form. Defaults to 15.
+                browser_profile (str, optional): The setup_driver profile of a dedicated Chrome
+                            (with a pool, the pool's factory decides). Defaults to "default".
+                deadline (float, optional): Seconds search() may take in all. Every wait (rate limit,
+                            driver pool, page loads, results) is cut to what is left, and a
+                            TimeoutError is raised once it is spent. Defaults to None (no deadline).
         """
         # self.price = price
         self.depart = depart
@@ -65,21 +192,76 @@ class FlightsData:
         self.return_date = return_date
         self.trip_type = trip_type
         self.airline = airline
-        self.driver = self.setup_driver()
-        self.wait = WebDriverWait(self.driver, 5)
+        self.driver_pool = driver_pool
+        self.rate_limiter = rate_limiter
+        self.results_timeout = results_timeout
+        self.settle_time = settle_time
+        if extraction not in ("snapshot", "webdriver", "network"):
+            raise ValueError(f"Unknown extraction mode: {extraction}")
+        self.extraction = extraction
+        self.max_scrolls = max_scrolls
+        self.on_event = on_event
+        self.direct_search = direct_search
+        self.direct_timeout = direct_timeout
+        self.deadline = deadline
+        # monotonic time the running search() must end by, and whether cancel() was called
+        self.deadline_at = None
+        self.cancelled = False
+        # guards self.driver between search() and cancel(), and whether the driver was quit
+        self._driver_lock = threading.Lock()
+        self._driver_quit = False
+        # seconds spent in each phase of the last run()
+        self.timings = {}
+        # flights scraped by the last run()
+        self.flights_dict = {}
+        # (page source, parsed tree) of the last page parsed, see parse_page
+        self.parsed_page = None
+        # with a pool, the driver is only borrowed for the duration of run()
+        self.driver = None
+        self.wait = None
+        if driver_pool is None:
+            from selenium.webdriver.support.ui import WebDriverWait
+            with self.timed("driver_startup"):
+                self.driver = driver_factory() if driver_factory else \
+                    self.setup_driver(browser_profile, capture_network=extraction == "network")
+            self.wait = WebDriverWait(self.driver, 5)
 
-    def setup_driver(self):
+    @staticmethod
+    def setup_driver(profile="default", capture_network=False):
         """
         Sets up the Selenium WebDriver with the necessary options.
 
+        Args: profile (str, optional): "default" for a regular 1920x1080 Chrome window,
+              "lean" for a headless Chrome without GPU or extensions, a smaller
+              viewport, and no images, media, fonts or third-party trackers.
+              The flights scraped are the same. Defaults to "default".
+              capture_network (bool, optional): Record the performance log read by the
+              "network" extraction. Defaults to False.
+
         Returns: webdriver.Chrome(A configured Selenium WebDriver).
+
+        Raises: ValueError: If the profile is unknown.
         """
+        if profile not in BROWSER_PROFILES:
+            raise ValueError(f"Unknown browser profile {profile}, use one of: {', '.join(BROWSER_PROFILES)}")
         options = webdriver.ChromeOptions()
         # hidden the webdriver info
-        options.add_argument(
-            'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36')
-        options.add_argument('--window-size=1920,1080')
+        options.add_argument(f'user-agent={USER_AGENT}')
+        if capture_network:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if profile == "default":
+            options.add_argument('--window-size=1920,1080')
+            return webdriver.Chrome(options=options)
+
+        for argument in ('--headless=new', '--disable-gpu', '--disable-extensions', '--mute-audio',
+                         '--window-size=1280,800'):
+            options.add_argument(argument)
+        # images are skipped by Chrome itself, media and fonts by the blocklist below
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
         driver = webdriver.Chrome(options=options)
+        blocked = list(BLOCKED_RESOURCE_PATTERNS) + [f"*://*{domain}/*" for domain in BLOCKED_DOMAINS]
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
         return driver
 
     def random_sleep(self, min_sec, max_sec):
@@ -114,7 +296,6 @@ class FlightsData:
             original_input.clear()
             original_input.click()
             original_input.send_keys(client_input)
-            self.random_sleep(1, 3)
 
         except Exception as e:
             # Log an error message and the exception details
@@ -134,10 +315,34 @@ class FlightsData:
         Returns: A list of all elements that match the specified CSS
                  class name and container tag.
         """
-        # creates a BeautifulSoup object by parsing the HTML content of the webpage.
-        # in this case, the built-in Python "html.parser" is used.
-        bs = BeautifulSoup(self.driver.page_source, "html.parser")
-        return bs.find_all(container, class_=classname)
+        # the parsed page is shared by every call on the same page source
+        return self.parse_page().find_all(container, class_=classname)
+
+    def parse_page(self, page_source=None):
+        """
+        Parses a page source with BeautifulSoup (lxml when installed), keeping
+        only the results container when the page has one. The last page
+        parsed is remembered, so several lookups on the same snapshot parse
+        it only once.
+
+        Args:
+            page_source (str, optional): HTML to parse. Defaults to the driver's current page.
+
+        Returns: BeautifulSoup: The parsed page.
+        """
+        if page_source is None:
+            page_source = self.driver.page_source
+        if self.parsed_page is not None and self.parsed_page[0] == page_source:
+            return self.parsed_page[1]
+
+        # beautifulsoup for data scrape, imported on first use to keep the app's start fast
+        from bs4 import BeautifulSoup, SoupStrainer
+        bs = BeautifulSoup(page_source, HTML_PARSER, parse_only=SoupStrainer(id=RESULTS_CONTAINER_ID))
+        if not bs.contents:
+            # no results container (e.g. the home page), parse the whole page
+            bs = BeautifulSoup(page_source, HTML_PARSER)
+        self.parsed_page = (page_source, bs)
+        return bs
 
     def get_price(self, prices, index):
         """
@@ -180,16 +385,111 @@ class FlightsData:
 
         Returns: list: A list of all flight card elements.
         """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         # 'WebDriverWait' object with a 5 seconds to wait for a specific
         # condition to be satisfied before interacting with them in the script.
         # helps the script to be more robust and prevent failures
         # due to slow-loading elements.
-        wait = WebDriverWait(self.driver, 5)
+        wait = WebDriverWait(self.driver, self.time_left(5))
         return wait.until(EC.presence_of_all_elements_located(
-            (By.CSS_SELECTOR,
-             "#aa-content > div > app-results-grid-desktop > div > virtual-scroller > div.scrollable-content > div.results-grid-container > div")
+            (By.CSS_SELECTOR, RESULTS_GRID_SELECTOR)
         ))
 
+    def wait_for_results(self, timeout=None, settle_time=None, poll_frequency=0.5):
+        """
+        Waits until the results grid is present and its number of flight
+        cards stays the same for the settle window, instead of sleeping
+        for a fixed time.
+
+        Args:
+            timeout (float, optional): Overall deadline in seconds. Defaults to self.results_timeout.
+            settle_time (float, optional): Settle window in seconds. Defaults to self.settle_time.
+            poll_frequency (float, optional): Seconds between two checks. Defaults to 0.5.
+
+        Returns: list: The flight card elements.
+
+        Raises: TimeoutException: If the grid did not settle before the deadline.
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        timeout = self.time_left(self.results_timeout if timeout is None else timeout)
+        settle_time = self.settle_time if settle_time is None else settle_time
+        wait = WebDriverWait(self.driver, timeout, poll_frequency=poll_frequency)
+        return wait.until(ResultsSettled(RESULTS_GRID_SELECTOR, settle_time))
+
+    @contextmanager
+    def timed(self, phase):
+        """
+        Context manager that records the seconds spent in a phase of run() into
+        self.timings, and reports the start and end of the phase to on_event.
+
+        Args: phase (str): Name of the phase.
+
+        Raises: TimeoutError: If the search deadline has passed or the search was cancelled.
+        """
+        self.time_left()
+        self.notify("phase", {"phase": phase, "status": "started"})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = time.perf_counter() - start
+            self.notify("phase", {"phase": phase, "status": "done", "seconds": round(self.timings[phase], 3)})
+
+    def time_left(self, timeout=None):
+        """
+        Cuts a wait to what is left of the search deadline.
+
+        Args: timeout (float, optional): The seconds the wait would take without
+              a deadline. Defaults to None (no limit).
+
+        Returns: float or None: The seconds the wait may take.
+
+        Raises: TimeoutError: If the deadline has passed or the search was cancelled.
+        """
+        if self.cancelled:
+            raise TimeoutError(f"Search {self.depart}-{self.arrive} was cancelled")
+        if self.deadline_at is None:
+            return timeout
+        left = self.deadline_at - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"Search {self.depart}-{self.arrive} exceeded its {self.deadline} second deadline")
+        return left if timeout is None else min(timeout, left)
+
+    def cancel(self):
+        """
+        Stops a running search from another thread, e.g. the slower of two
+        hedged attempts: its next wait raises TimeoutError, and its driver is
+        quit so that a hung page load returns at once (a pooled driver is
+        then replaced by the pool).
+        """
+        with self._driver_lock:
+            self.cancelled = True
+            if self.driver is None or self._driver_quit:
+                return
+            # quit under the lock, so the search cannot hand the driver back in the meantime
+            self._driver_quit = True
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logging.warning(f"Could not quit the driver of a cancelled search: {e}")
+
+    def notify(self, event, data):
+        """
+        Passes an event to the on_event callback, if any. A failing callback
+        is logged and never interrupts the search.
+
+        Args:
+            event (str): The event name ("phase" or "flight").
+            data (dict): The event data.
+        """
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, data)
+        except Exception as e:
+            logging.warning(f"Search event callback failed: {e}")
+
     def extract_flight_details(self, flight_card):
         """
         Extracts flight details from a flight card.
@@ -203,24 +503,55 @@ class FlightsData:
                   (flight, departure_time, arrival_time, duration, price_element).
             """
         # find sub-field in each flight card
-        origin = flight_card.find_element(By.CSS_SELECTOR, "div.cell.large-3.origin")
-        destination = flight_card.find_element(By.CSS_SELECTOR, "div.cell.large-3.destination")
-        duration_element = flight_card.find_element(By.CSS_SELECTOR, "div.cell.large-4.pad-left-sm")
-        price_element = flight_card.find_element(By.CSS_SELECTOR, "app-choose-flights-price-desktop")
+        origin = flight_card.find_element(By.CSS_SELECTOR, ORIGIN_SELECTOR)
+        destination = flight_card.find_element(By.CSS_SELECTOR, DESTINATION_SELECTOR)
+        duration_element = flight_card.find_element(By.CSS_SELECTOR, DURATION_CELL_SELECTOR)
+        price_element = flight_card.find_element(By.CSS_SELECTOR, PRICE_CELL_SELECTOR)
 
         # extract targeted information from related fields,
         # the connection flights will contain more than 1 flight number
         # so here we create a list for all flight numbers.
-        flights = flight_card.find_elements(By.CSS_SELECTOR, "span.connecting-flt-details.flight-number")
+        flights = flight_card.find_elements(By.CSS_SELECTOR, FLIGHT_NUMBER_SELECTOR)
         flight = [number.text for number in flights]
 
         # extract text by locating CSS_SELECTORs
-        departure_time = origin.find_element(By.CSS_SELECTOR, "div.flt-times-sm").text
-        arrival_time = destination.find_element(By.CSS_SELECTOR, "div.flt-times-sm").text
-        duration = duration_element.find_element(By.CSS_SELECTOR, "div.duration").text
+        departure_time = origin.find_element(By.CSS_SELECTOR, TIME_SELECTOR).text
+        arrival_time = destination.find_element(By.CSS_SELECTOR, TIME_SELECTOR).text
+        duration = duration_element.find_element(By.CSS_SELECTOR, DURATION_SELECTOR).text
 
         return flight, departure_time, arrival_time, duration, price_element
 
+    @staticmethod
+    def tag_text(tag):
+        """
+        Returns the text of a BeautifulSoup tag the way WebDriver reports it:
+        stripped, with inner whitespace collapsed.
+
+        Args: tag (Tag): The tag to read.
+
+        Returns: str: The normalized text.
+        """
+        return " ".join(tag.get_text(" ").split())
+
+    def extract_card_details(self, card):
+        """
+        Extracts flight details from a flight card parsed by BeautifulSoup,
+        the page-snapshot counterpart of extract_flight_details.
+
+        Args:
+            card (Tag): The flight card to extract flight details from.
+
+        Returns:
+            tuple: (flight, departure_time, arrival_time, duration, prices),
+                   where prices is the list of price tags of the card.
+        """
+        flight = [self.tag_text(number) for number in card.select(FLIGHT_NUMBER_SELECTOR)]
+        departure_time = self.tag_text(card.select_one(f"{ORIGIN_SELECTOR} {TIME_SELECTOR}"))
+        arrival_time = self.tag_text(card.select_one(f"{DESTINATION_SELECTOR} {TIME_SELECTOR}"))
+        duration = self.tag_text(card.select_one(f"{DURATION_CELL_SELECTOR} {DURATION_SELECTOR}"))
+        prices = card.select(f"{PRICE_CELL_SELECTOR} {PRICE_SELECTOR}")
+        return flight, departure_time, arrival_time, duration, prices
+
     def process_prices(self, prices):
         """
         Extract price for different class from lists of price elements.
@@ -267,64 +598,385 @@ class FlightsData:
         for flight_card in flight_card_elements:
             # unpack tuple
             flight, departure_time, arrival_time, duration, price_element = self.extract_flight_details(flight_card)
-            prices = price_element.find_elements(By.CSS_SELECTOR, "span.per-pax-amount.ng-star-inserted")
-            basic_economy_price, main_cabin_price, first_class_price = self.process_prices(prices)
-
-            flights_dict[flight_id] = {
-                "flight_numbers": flight,
-                "departure_time": departure_time,
-                "arrival_time": arrival_time,
-                "duration": duration,
-                "main_cabin_price": main_cabin_price,
-            }
+            prices = price_element.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR)
+            flights_dict[flight_id] = self.build_flight(flight, departure_time, arrival_time, duration, prices)
+            self.notify("flight", {"flight_id": flight_id, "flight": flights_dict[flight_id]})
             flight_id += 1
 
         return flights_dict
 
-    def run(self):
+    def page_scrape_snapshot(self, page_source=None):
         """
-        Runs the entire process of scraping flight data from the specified URL and exporting it to a CSV file.
+        Scrapes flight data from a single snapshot of the web page: the page
+        source is fetched once and every flight card is parsed locally with
+        BeautifulSoup, instead of several WebDriver round-trips per card.
+
+        Args:
+            page_source (str, optional): HTML to parse. Defaults to the driver's current page.
 
         Returns:
-            str: The name of the generated CSV file. (for flask  in app.py)
+            dict: The scraped flight data, in the same format as page_scrape.
+        """
+        bs = self.parse_page(page_source)
+
+        flights_dict = {}
+        for flight_id, card in enumerate(bs.select(RESULTS_GRID_SELECTOR), start=1):
+            flight, departure_time, arrival_time, duration, prices = self.extract_card_details(card)
+            flights_dict[flight_id] = self.build_flight(flight, departure_time, arrival_time, duration, prices)
+
+        return flights_dict
+
+    @staticmethod
+    def flight_key(flight):
+        """
+        Identifies a flight across snapshots of the results list.
+
+        Args: flight (dict): A flight from the scraped data.
+
+        Returns: tuple: (flight numbers, departure time, arrival time)
+        """
+        return tuple(flight["flight_numbers"]), flight["departure_time"], flight["arrival_time"]
+
+    def harvest_flights(self, max_scrolls=None, scroll_step=None, render_wait=0.3):
+        """
+        Scrapes the whole results list. The list is a virtual scroller that
+        only renders the cards in the viewport, so it is scrolled step by
+        step and only newly rendered flights are added, until the end of the
+        list is reached and nothing new appears (or max_scrolls is reached).
+        Each new flight is reported to on_event as soon as its snapshot is parsed.
+
+        Args:
+            max_scrolls (int, optional): Maximum scroll steps. Defaults to self.max_scrolls.
+            scroll_step (int, optional): Pixels per step. Defaults to the viewport height.
+            render_wait (float, optional): Seconds to let new cards render after a step. Defaults to 0.3.
+
+        Returns:
+            dict: The scraped flight data, in the same format as page_scrape.
+        """
+        max_scrolls = self.max_scrolls if max_scrolls is None else max_scrolls
+        flights_dict = {}
+        seen = set()
+
+        for scroll in range(max_scrolls + 1):
+            new_flights = 0
+            for flight in self.page_scrape_snapshot().values():
+                key = self.flight_key(flight)
+                if key not in seen:
+                    seen.add(key)
+                    flights_dict[len(flights_dict) + 1] = flight
+                    self.notify("flight", {"flight_id": len(flights_dict), "flight": flight})
+                    new_flights += 1
+
+            # a long list must not scroll past the search deadline
+            self.time_left()
+            if scroll == max_scrolls:
+                logging.warning(f"Stopped harvesting after {max_scrolls} scrolls, the results may be incomplete")
+                break
+            at_end = self.driver.execute_script(SCROLL_SCRIPT, SCROLLER_SELECTOR, scroll_step)
+            if at_end and not new_flights:
+                break
+            time.sleep(render_wait)
+
+        return flights_dict
+
+    def build_flight(self, flight, departure_time, arrival_time, duration, prices):
+        """
+        Builds the dictionary stored for one flight in the scraped data: all
+        cabin prices, the cabins with an available fare, and the number of
+        stops (one less than the number of connecting flight numbers).
+
+        Args:
+            flight (list): The flight numbers.
+            departure_time (str): The departure time.
+            arrival_time (str): The arrival time.
+            duration (str): The flight duration.
+            prices (list): The price elements of the flight card.
+
+        Returns: dict: The flight information.
+        """
+        basic_economy_price, main_cabin_price, first_class_price = self.process_prices(prices)
+        cabin_prices = (basic_economy_price, main_cabin_price, first_class_price)
+        return {
+            "flight_numbers": flight,
+            "departure_time": departure_time,
+            "arrival_time": arrival_time,
+            "duration": duration,
+            "stops": max(len(flight) - 1, 0),
+            "basic_economy_price": basic_economy_price,
+            "main_cabin_price": main_cabin_price,
+            "first_class_price": first_class_price,
+            "fare_classes": [name for (_, name), price in zip(CABINS, cabin_prices) if price != "N/A"],
+        }
+
+    def network_scrape(self):
+        """
+        Reads the flights from the results XHR captured in the performance
+        log, without waiting for the cards to render.
+
+        Returns:
+            dict: The flight data in the page_scrape format, or {} if no usable
+                  payload was captured (the rendered page is scraped instead).
+        """
+        with self.timed("network_capture"):
+            payload = wait_for_payload(self.driver, self.time_left(self.results_timeout),
+                                       rendered=lambda driver: driver.find_elements(By.CSS_SELECTOR,
+                                                                                    RESULTS_GRID_SELECTOR))
+            try:
+                flights_dict = flights_from_payload(payload) if payload is not None else {}
+            except ValueError as e:
+                logging.warning(e)
+                flights_dict = {}
+        for flight_id, flight in flights_dict.items():
+            self.notify("flight", {"flight_id": flight_id, "flight": flight})
+        return flights_dict
+
+    def scrape_results(self):
+        """
+        Scrapes the results page with the configured extraction mode. The
+        snapshot mode harvests the whole virtual results list and falls back
+        to WebDriver queries if it finds no card.
+
+        Returns:
+            dict: The scraped flight data.
+        """
+        if self.extraction in ("snapshot", "network"):
+            flights_dict = self.harvest_flights()
+            if flights_dict:
+                return flights_dict
+            logging.warning("No flight card found in the page snapshot, querying WebDriver instead")
+        return self.page_scrape()
+
+    def search(self):
+        """
+        Runs the search on the website and returns the scraped flights in
+        memory, without writing any file. When a driver pool was given, a
+        driver is borrowed for the search and handed back afterwards instead
+        of being quit.
+
+        Returns:
+            dict: The scraped flight data, in the format built by page_scrape.
+
+        Raises:
+            TimeoutError: If the search ran past its deadline or was cancelled.
+        """
+        # a dedicated driver is started (and timed) by __init__, for this search
+        self.timings = {phase: seconds for phase, seconds in self.timings.items() if phase == "driver_startup"}
+        if self.deadline is not None:
+            self.deadline_at = time.monotonic() + self.deadline
+        try:
+            return self._search()
+        finally:
+            self.deadline_at = None
+
+    def pace(self):
+        """
+        Waits for the rate limiter, if any, within the search deadline.
+        """
+        # politeness pacing happens once per search, not per field,
+        # and before a pooled driver is borrowed
+        if self.rate_limiter is not None:
+            with self.timed("rate_limit"):
+                self.rate_limiter.wait(self.time_left())
+
+    def _search(self):
+        """
+        Paces the search, takes a driver and scrapes, see search().
+
+        Returns:
+            dict: The scraped flight data.
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        if self.driver_pool is None:
+            try:
+                self.pace()
+                self.flights_dict = self._scrape()
+            finally:
+                # Close the driver after finishing, unless cancel() already did
+                with self._driver_lock:
+                    quit_driver = not self._driver_quit
+                    self._driver_quit = True
+                if quit_driver:
+                    self.driver.quit()
+            return self.flights_dict
+
+        self.pace()
+        # borrowing may wait for a free driver or start a new Chrome
+        with self.timed("acquire_driver"):
+            try:
+                driver = self.driver_pool.acquire(self.time_left())
+            except TimeoutError:
+                # a wait cut short by the deadline is reported as the deadline
+                self.time_left()
+                raise
+        with self._driver_lock:
+            self.driver = driver
+            self._driver_quit = False
+        crashed = False
+        try:
+            self.wait = WebDriverWait(driver, 5)
+            self.flights_dict = self._scrape()
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            # once self.driver is cleared, cancel() can no longer quit the driver
+            # handed back to the pool; one it already quit is replaced
+            with self._driver_lock:
+                self.driver = None
+                self.wait = None
+                discard = crashed or self._driver_quit
+            self.driver_pool.release(driver, discard=discard)
+        return self.flights_dict
+
+    def run(self, file_format="csv", output_manager=None):
+        """
+        Runs the entire process of scraping flight data from the specified URL and exporting it to a file.
+
+        Args:
+            file_format (str, optional): A format registered in exporters. Defaults to "csv".
+            output_manager (OutputManager, optional): Where the file is written.
+                            Defaults to an OutputManager writing under "exports".
+
+        Returns:
+            str: The path of the generated file, unique to the route and dates.
             """
-        # Navigate to the URL
-        url = "https://www.aa.com/homePage.do"
+        scraped_data = self.search()
+
+        # export the flights, atomically, to a path of their own
+        with self.timed("export"):
+            if output_manager is None:
+                output_manager = OutputManager()
+            file_name = output_manager.export(scraped_data, self.depart, self.arrive,
+                                              self.departure_date, self.return_date, file_format)
 
+        return file_name
+
+    def search_url(self):
+        """
+        Builds the URL of the results page of this search, the same one the
+        home page form leads to.
+
+        Returns:
+            str: The search URL.
+        """
+        round_trip = bool(self.return_date) and self.trip_type != "one way"
+        slices = [{"orig": self.depart, "origNearby": False, "dest": self.arrive, "destNearby": False,
+                   "date": normalize_date(self.departure_date)}]
+        if round_trip:
+            slices.append({"orig": self.arrive, "origNearby": False, "dest": self.depart, "destNearby": False,
+                           "date": normalize_date(self.return_date)})
+        query = {
+            "locale": "en_US",
+            "pax": 1,
+            "adult": 1,
+            "type": "RoundTrip" if round_trip else "OneWay",
+            "searchType": "Revenue",
+            "cabin": "",
+            "carriers": "ALL",
+            "slices": json.dumps(slices, separators=(",", ":")),
+        }
+        return f"{SEARCH_URL}?{urlencode(query)}"
+
+    def open_search_url(self):
+        """
+        Opens the results page straight from the search URL, skipping the
+        home page and the form.
+
+        Returns:
+            bool: True once a flight card is shown, False if the page did not
+                  show one within direct_timeout (the form should be used instead).
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        with self.timed("search_url"):
+            self.limit_page_load()
+            try:
+                self.driver.get(self.search_url())
+                WebDriverWait(self.driver, self.time_left(self.direct_timeout)).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_GRID_SELECTOR)))
+                return True
+            except (WebDriverException, ValueError) as e:
+                logging.warning(f"Search URL of {self.depart}-{self.arrive} showed no results, "
+                                f"filling the form instead: {e}")
+                return False
+
+    def limit_page_load(self):
+        """
+        Cuts the page load timeout of the driver to what is left of the
+        search deadline, so a hung page load cannot outlive the search.
+        """
+        if self.deadline_at is not None:
+            self.driver.set_page_load_timeout(self.time_left())
+
+    def submit_form(self):
+        """
+        Loads the home page, fills the search form and submits it.
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         # locate and fill the form
-        self.driver.get(url)
-        self.wait.until(EC.visibility_of_element_located((By.ID, 'flightSearchForm.button.reSubmit')))
+        with self.timed("page_load"):
+            self.limit_page_load()
+            self.driver.get(HOME_URL)
+            WebDriverWait(self.driver, self.time_left(5)).until(
+                EC.visibility_of_element_located((By.ID, 'flightSearchForm.button.reSubmit')))
 
         # Fill the form
-        self.fill_form('reservationFlightSearchForm.originAirport', self.depart)
-        self.fill_form('reservationFlightSearchForm.destinationAirport', self.arrive)
-        self.fill_form('aa-leavingOn', self.departure_date)
-        self.fill_form('aa-returningFrom', self.return_date)
+        with self.timed("fill_form"):
+            self.fill_form('reservationFlightSearchForm.originAirport', self.depart)
+            self.fill_form('reservationFlightSearchForm.destinationAirport', self.arrive)
+            self.fill_form('aa-leavingOn', self.departure_date)
+            self.fill_form('aa-returningFrom', self.return_date)
 
         # Click the search button to submit the form
-        search_button = self.wait.until(EC.element_to_be_clickable((By.ID, 'flightSearchForm.button.reSubmit')))
-        search_button.click()
-        # Adjust sleep time as needed
-        self.random_sleep(30, 50)
+        with self.timed("submit"):
+            search_button = WebDriverWait(self.driver, self.time_left(5)).until(
+                EC.element_to_be_clickable((By.ID, 'flightSearchForm.button.reSubmit')))
+            search_button.click()
 
-        # Scrape data from the page
-        scraped_data = self.page_scrape()
+    def _scrape(self):
+        """
+        Opens the results page, from the search URL or else through the
+        search form, and scrapes it.
 
-        # export csv file
-        csv_name = f"{self.depart}to{self.arrive}.csv"
-        data_exporter = DataExport(csv_name, scraped_data)
-        data_exporter.export_to_csv()
+        Returns:
+            dict: The scraped flight data.
+        """
+        if not (self.direct_search and self.open_search_url()):
+            self.submit_form()
+
+        results_timeout = self.results_timeout
+        if self.extraction == "network":
+            capture_start = time.monotonic()
+            flights_dict = self.network_scrape()
+            if flights_dict:
+                logging.info(f"Search {self.depart}-{self.arrive} timings: {self.timings}")
+                return flights_dict
+            logging.warning("No results payload captured, scraping the rendered page instead")
+            # the capture and the rendered page share one results_timeout
+            results_timeout = max(results_timeout - (time.monotonic() - capture_start), 0)
+
+        # Wait until the results grid has finished rendering
+        with self.timed("results_ready"):
+            try:
+                self.wait_for_results(results_timeout)
+            except TimeoutException:
+                # the grid may still be usable, page_scrape raises if nothing is there
+                logging.warning(f"Results grid did not settle within {self.results_timeout} seconds")
 
-        # Close the driver after finishing
-        self.driver.quit()
+        # Scrape data from the page
+        with self.timed("scrape"):
+            scraped_data = self.scrape_results()
+        logging.info(f"Search {self.depart}-{self.arrive} timings: {self.timings}")
 
-        return csv_name
+        return scraped_data
 
 
 class DataExport:
     """
     This class handle the exporting of flight data int various formats.
-    Currently supports exporting to CSV and TXT files.
+    Supports every format registered in exporters (CSV, JSON Lines, Parquet,
+    Arrow) and a TXT summary.
     The class takes a file_name and a flights_dict as input arguments.
     """
 
@@ -335,29 +987,44 @@ class DataExport:
 
         Args: file_name: str, name of the output file
               flights_dict: private dictionary containing flight information
-                            (prevent unexpected changes)
+                            (prevent unexpected changes), either the flights as
+                            built by page_scrape, or a dictionary with "depart",
+                            "arrive", "departure_date", "return_date" and those "flights"
         """
         self.file_name = file_name
         self._flights_dict = flights_dict
 
-    def export_to_csv(self):
+    def flights(self):
+        """
+        Returns: the flight dictionaries to export, in order
         """
-        Exports flight data to a CSV file using the provided file_name.
+        if "flights" in self._flights_dict:
+            return list(self._flights_dict["flights"].values())
+        return list(self._flights_dict.values())
 
-        return: str, the file path of the exported CSV file, or None if an exception occurs
+    def export(self, file_format=None, append=False):
         """
-        try:
-            # Convert the dictionary to a Pandas DataFrame
-            df = pd.DataFrame(self._flights_dict)
+        Exports flight data with a writer from the exporters registry,
+        one flight at a time.
 
-            # Create the file path for the CSV file using the provided file name
-            file_path = f"{self.file_name}"
+        Args: file_format: str, a registered format, defaults to the file extension
+              append: bool, add to the file instead of replacing it
 
-            # Export the DataFrame to a CSV file with the specified file path,
-            # including the index and encoding
-            df.to_csv(file_path, index=True, encoding='utf-8-sig')
+        return: str, the file path of the exported file
+        """
+        context = {key: self._flights_dict[key] for key in ("depart", "arrive") if key in self._flights_dict}
+        return export_flights(self.flights(), self.file_name, file_format, append, context)
 
-            return file_path
+    def export_to_csv(self):
+        """
+        Exports flight data to a CSV file using the provided file_name: one
+        row per flight (UTF-8 with a byte order mark), see exporters.CsvWriter.
+
+        return: str, the file path of the exported CSV file, or None if an exception occurs
+        """
+        try:
+            # Stream one row per flight, without building a DataFrame
+            return self.export("csv")
         except OSError as e:
             print(f"Error was found when exporting to CSV: {e}")
             return 'None'
@@ -369,20 +1036,17 @@ class DataExport:
         return: None
         """
         try:
-            # Retrieve departure, arrival airports, and departure and return dates from the flight data dictionary
-            depart = self._flights_dict["depart"]
-            arrive = self._flights_dict["arrive"]
-            departure_date = self._flights_dict["departure_date"]
-            return_date = self._flights_dict["return_date"]
-
             # Open the file
             with open(self.file_name, "w") as file:
-                # Write the header information
-                file.write(f"This is flights info from {depart} ({departure_date}) to {arrive}({return_date}):")
-                file.write("\n")
+                # Write the header information, when the search details were given
+                if "depart" in self._flights_dict:
+                    file.write(f"This is flights info from {self._flights_dict['depart']} "
+                               f"({self._flights_dict.get('departure_date')}) to {self._flights_dict['arrive']}"
+                               f"({self._flights_dict.get('return_date')}):")
+                    file.write("\n")
 
-                # Loop through the flight data in the "flights" dictionary
-                for flight in self._flights_dict["flights"].values():
+                # Loop through the flights
+                for flight in self.flights():
                     file.write(
                         f"Departure Time: {flight['departure_time']} | Arrival Time: {flight['arrival_time']} | "
                         f"Main Cabin Price: {flight['main_cabin_price']} ")
@@ -396,5 +1060,32 @@ class DataExport:
 
 
 if __name__ == "__main__":
-    flights_data = FlightsData(depart, arrive, departure_date, return_date)
-    flights_data.run()
+    # Single search from the command line, e.g.
+    # python web_scraper.py SJC LAS 08/25/2023 09/01/2023
+    # (use batch_runner.py to scrape a file of searches)
+    # --record DIR saves the result pages, --replay DIR scrapes them again offline
+    parser = argparse.ArgumentParser(description="Scrape American Airlines flights for one search.")
+    parser.add_argument("depart", help="departure airport")
+    parser.add_argument("arrive", help="arrival airport")
+    parser.add_argument("departure_date", help="departure date in MM/DD/YYYY format")
+    parser.add_argument("return_date", nargs="?", help="return date in MM/DD/YYYY format")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--record", metavar="DIR", help="save every results page snapshot to DIR")
+    backend.add_argument("--replay", metavar="DIR", help="scrape the snapshots saved in DIR instead of the website")
+    parser.add_argument("--profile", choices=BROWSER_PROFILES, default="default", help="Chrome profile")
+    args = parser.parse_args()
+
+    driver_factory = None
+    settle_time = 2.0
+    if args.record:
+        from replay import RecordingDriver
+        driver_factory = lambda: RecordingDriver(FlightsData.setup_driver(args.profile), args.record)
+    elif args.replay:
+        from replay import ReplayDriver
+        driver_factory = lambda: ReplayDriver.from_directory(args.replay)
+        settle_time = 0
+
+    flights_data = FlightsData(args.depart, args.arrive, args.departure_date, args.return_date,
+                               driver_factory=driver_factory, settle_time=settle_time,
+                               browser_profile=args.profile)
+    print(flights_data.run())